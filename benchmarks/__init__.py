@@ -0,0 +1 @@
+"""Бенчмарки PDF Extract Processor"""
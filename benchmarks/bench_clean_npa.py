@@ -0,0 +1,77 @@
+"""
+Бенчмарк: очистка НПА для RAG - строка целиком против потока строк из файла
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_clean_npa
+"""
+
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from pdf_extract_processor.rag_tools.rag_processor import clean_npa_for_rag, iter_clean_npa_for_rag
+
+PAGE_COUNTS = (100, 1000, 5000)
+LINES_PER_PAGE = 40
+
+
+def _make_text(pages: int, rng: random.Random) -> str:
+    """Текст в формате извлечения: служебный заголовок, разделители страниц, артефакты OCR"""
+    parts = ["# Извлеченный текст из PDF\n\n**Файл:** doc.pdf\n**Качество:** 0.91\n**Метод:** ocr\n\n---\n\n",
+             "МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ РОССИЙСКОЙ ФЕДЕРАЦИИ\n\nПРИКАЗ\n\n"]
+    for page in range(1, pages + 1):
+        parts.append(f"--- Страница {page} ---\n")
+        for i in range(LINES_PER_PAGE):
+            r = rng.random()
+            if r < 0.05:
+                parts.append("АБ\n")
+            elif r < 0.08:
+                parts.append("..\n")
+            elif r < 0.15:
+                parts.append(f"{i}. Утвердить  прилагаемый порядок.\n")
+            else:
+                parts.append("в соответствии с пунктом 5 статьи 12 Федерального закона   о лицензировании\n")
+        parts.append("\n")
+    return "".join(parts)
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def _clean_file(path: str):
+    with open(path, encoding='utf-8') as source:
+        for _ in iter_clean_npa_for_rag(source):
+            pass
+
+
+def main():
+    rng = random.Random(42)
+    print("📊 clean_npa_for_rag: время и пик памяти (tracemalloc)")
+    print("=" * 72)
+    print(f"{'Страниц':>8}{'Текст, МБ':>11}{'строка, с':>11}{'пик, МБ':>10}{'поток, с':>11}{'пик, МБ':>10}")
+
+    for pages in PAGE_COUNTS:
+        text = _make_text(pages, rng)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.md', delete=False) as f:
+            f.write(text)
+            path = f.name
+        try:
+            string_time, string_peak = _measure(lambda: clean_npa_for_rag(text))
+            stream_time, stream_peak = _measure(lambda: _clean_file(path))
+        finally:
+            os.unlink(path)
+        print(f"{pages:>8}{len(text.encode('utf-8')) / 1e6:>11.1f}{string_time:>11.2f}{string_peak:>10.1f}"
+              f"{stream_time:>11.2f}{stream_peak:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
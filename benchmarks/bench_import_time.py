@@ -0,0 +1,75 @@
+"""
+Бенчмарк холодного старта: импорт пакета с ленивыми движками
+против немедленной загрузки всех установленных движков (прежнее поведение)
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_import_time
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+REPEATS = 5
+
+# Импорт процессора + извлечение текстового слоя не загружают движки
+LAZY_SNIPPET = """
+import pdf_extract_processor.improved_processor
+"""
+
+# Прежнее поведение: все движки импортируются вместе с модулем
+EAGER_SNIPPET = """
+import pdf_extract_processor.improved_processor
+from pdf_extract_processor.engines import get_engine, is_engine_available, registered_engines
+for name in registered_engines():
+    if is_engine_available(name):
+        get_engine(name)
+"""
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+{snippet}
+elapsed = time.perf_counter() - start
+from pdf_extract_processor.engines import loaded_engines
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'engines': loaded_engines(),
+}}))
+"""
+
+
+def _run(snippet: str) -> dict:
+    """Один холодный запуск интерпретатора"""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", PROBE.format(snippet=snippet)],
+                            cwd=repo_root, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _measure(snippet: str) -> dict:
+    runs = [_run(snippet) for _ in range(REPEATS)]
+    return min(runs, key=lambda r: r['seconds'])
+
+
+def main():
+    print("📊 Холодный старт пакета (лучшее из", REPEATS, "запусков)")
+    print("=" * 60)
+
+    lazy = _measure(LAZY_SNIPPET)
+    eager = _measure(EAGER_SNIPPET)
+
+    for title, result in (("Ленивые движки", lazy), ("Все движки сразу", eager)):
+        print(f"{title:<18} {result['seconds'] * 1000:>8.0f} мс  "
+              f"RSS {result['max_rss_mb']:>6.0f} МБ  модулей {result['modules']:>5}")
+        print(f"{'':<18} движки: {', '.join(result['engines']) or '—'}")
+
+    print(f"\n⚡ Выигрыш: {(eager['seconds'] - lazy['seconds']) * 1000:.0f} мс, "
+          f"{eager['max_rss_mb'] - lazy['max_rss_mb']:.0f} МБ RSS на процесс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Бенчмарк: отпечатки MinHash и поиск почти дубликатов по LSH на синтетическом потоке документов
+
+Треть документов - копии уже встреченных: повторный скан (шум OCR) или новая
+обложка. Документы - сканы: текст страниц-проб приходит из OCR. Выводятся время проверки на документ, полнота
+и число ложных совпадений.
+
+Запуск из корня репозитория (число документов - аргумент, по умолчанию 5000):
+    python -m benchmarks.bench_near_duplicates 20000
+"""
+
+import random
+import sys
+import time
+
+from pdf_extract_processor.near_duplicates import NearDuplicateDetector
+
+DEFAULT_DOCUMENTS = 5000
+DUPLICATE_SHARE = 0.33
+PAGES = (3, 12)
+WORDS_PER_PAGE = 250
+VOCABULARY = 20000
+OCR_NOISE = 0.03  # Доля слов с ошибкой распознавания в повторном скане
+
+
+class _ScanSession:
+    """Скан как список текстов страниц (интерфейс PDFDocumentSession, без текстового слоя)"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def get_text(self, page_num: int) -> str:
+        return ""
+
+
+def _page(vocabulary, rng: random.Random) -> str:
+    return " ".join(rng.choices(vocabulary, k=WORDS_PER_PAGE))
+
+
+def _rescan(pages, rng: random.Random):
+    def noisy(word):
+        return word[:-1] + "з" if rng.random() < OCR_NOISE else word
+    return [" ".join(noisy(word) for word in page.split()) for page in pages]
+
+
+def _copy(pages, vocabulary, rng: random.Random):
+    if rng.randrange(2) == 0:
+        return _rescan(pages, rng)
+    return [_page(vocabulary, rng)] + pages[1:]  # Другая обложка
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DOCUMENTS
+    rng = random.Random(42)
+    vocabulary = [f"слово{i}" for i in range(VOCABULARY)]
+    detector = NearDuplicateDetector()
+
+    originals = []
+    expected = found = false_matches = 0
+    elapsed = 0.0
+    for i in range(count):
+        if originals and rng.random() < DUPLICATE_SHARE:
+            source, pages = rng.choice(originals)
+            pages = _copy(pages, vocabulary, rng)
+            expected += 1
+        else:
+            source, pages = None, [_page(vocabulary, rng) for _ in range(rng.randint(*PAGES))]
+
+        start = time.perf_counter()
+        match = detector.check(str(i), detector.fingerprint(_ScanSession(pages), pages.__getitem__))
+        elapsed += time.perf_counter() - start
+
+        if source is None:
+            originals.append((str(i), pages))
+            false_matches += match is not None
+        elif match is not None:
+            found += 1
+
+    print(f"📊 Почти дубликаты: {count:,} документов, копий {expected:,}")
+    print("=" * 60)
+    print(f"LSH: {detector.index.bands} полос x {detector.index.rows} строк")
+    print(f"Проверка: {elapsed / count * 1000:.2f} мс/документ")
+    print(f"Полнота: {found / max(1, expected):.3f} ({found}/{expected})")
+    print(f"Ложных совпадений: {false_matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Бенчмарк: страниц в секунду для движков OCR
+
+pytesseract запускает процесс tesseract на каждую страницу, tesserocr держит
+модели загруженными. Разница заметнее всего на коротких страницах.
+
+Запуск из корня репозитория (нужен tesseract с языками rus и eng):
+    python -m benchmarks.bench_ocr_engines
+"""
+
+import time
+
+import fitz
+
+from pdf_extract_processor.engines import is_engine_available
+from pdf_extract_processor.ocr_engines import PytesseractEngine, TesserocrEngine
+from pdf_extract_processor.utils.image_buffers import render_page, pixmap_to_pil
+
+LANG = 'rus+eng'
+CONFIG = '--psm 6 --oem 3'
+SCALE = 2.5
+PAGES = 20
+# Строк текста на странице: короткие (штамп, подпись) и полные страницы
+LINE_COUNTS = (3, 40)
+
+
+def _make_images(lines: int) -> list:
+    """Рендеры страниц с текстом заданной длины"""
+    doc = fitz.open()
+    images = []
+    for i in range(PAGES):
+        page = doc.new_page()
+        for j in range(lines):
+            page.insert_text((50, 60 + j * 18), f"Prikaz No {i}-{j}: nastoyashchiy prikaz vstupaet v silu.",
+                             fontsize=11)
+        images.append(pixmap_to_pil(render_page(page, SCALE)))
+    doc.close()
+    return images
+
+
+def _available_engines() -> list:
+    engines = []
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        engines.append(PytesseractEngine())
+    except Exception as e:
+        print(f"⚠️ pytesseract пропущен: {e}")
+
+    if is_engine_available('tesserocr'):
+        engines.append(TesserocrEngine())
+    else:
+        print("⚠️ tesserocr не установлен: pip install tesserocr")
+    return engines
+
+
+def _pages_per_second(engine, images) -> float:
+    engine.image_to_string(images[0], LANG, CONFIG)  # прогрев: загрузка моделей
+    start = time.perf_counter()
+    for image in images:
+        engine.image_to_string(image, LANG, CONFIG)
+    return len(images) / (time.perf_counter() - start)
+
+
+def main():
+    engines = _available_engines()
+    if not engines:
+        print("❌ Нет доступных движков OCR")
+        return
+
+    print(f"📊 Движки OCR: страниц в секунду ({PAGES} страниц, масштаб {SCALE}, {LANG})")
+    print("=" * 60)
+    print(f"{'Строк':>6}" + "".join(f"{engine.name:>18}" for engine in engines))
+
+    for lines in LINE_COUNTS:
+        images = _make_images(lines)
+        rates = [_pages_per_second(engine, images) for engine in engines]
+        print(f"{lines:>6}" + "".join(f"{rate:>18.2f}" for rate in rates))
+
+    for engine in engines:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
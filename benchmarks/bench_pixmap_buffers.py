@@ -0,0 +1,92 @@
+"""
+Бенчмарк: PNG round-trip против прямого доступа к pix.samples
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_pixmap_buffers
+"""
+
+import time
+from io import BytesIO
+
+import cv2
+import fitz
+import numpy as np
+from PIL import Image
+
+from pdf_extract_processor.utils.image_buffers import render_page, pixmap_to_array, pixmap_to_pil
+
+SCALES = (2.0, 2.5)
+REPEATS = 10
+
+
+def _make_page() -> fitz.Document:
+    """Страница A4 с плотным текстом"""
+    doc = fitz.open()
+    page = doc.new_page()
+    line = "1. Настоящий приказ вступает в силу со дня его официального опубликования."
+    for i in range(60):
+        page.insert_text((40, 40 + i * 12.5), line, fontsize=9, fontname="helv")
+    return doc
+
+
+# Каждый вариант возвращает объём буферов (байт), созданных сверх самого пиксмапа
+
+def _gray_png(page, scale):
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+    png = pix.tobytes("png")
+    img = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_GRAYSCALE)
+    return len(png) + img.nbytes
+
+
+def _gray_direct(page, scale):
+    pix = render_page(page, scale, gray=True)
+    img = pixmap_to_array(pix)  # массив используется, пока жив pix
+    return 0 if np.shares_memory(img, np.frombuffer(pix.samples_mv, np.uint8)) else img.nbytes
+
+
+def _rgb_png(page, scale):
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+    png = pix.tobytes("png")
+    decoded = Image.open(BytesIO(png))
+    image = decoded.convert("RGB")
+    return len(png) + 2 * image.width * image.height * 3
+
+
+def _rgb_direct(page, scale):
+    image = pixmap_to_pil(render_page(page, scale))
+    return image.width * image.height * 3  # одна копия внутри PIL
+
+
+def _measure(func, page, scale):
+    """Среднее время (мс) и объём промежуточных буферов (МБ) на страницу"""
+    func(page, scale)  # прогрев
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        extra_bytes = func(page, scale)
+    elapsed_ms = (time.perf_counter() - start) / REPEATS * 1000
+
+    return elapsed_ms, extra_bytes / 1024 / 1024
+
+
+def main():
+    doc = _make_page()
+    page = doc[0]
+
+    print("📊 PNG round-trip против pix.samples (на страницу)")
+    print("=" * 70)
+    print(f"{'Режим':<12}{'Масштаб':>8}{'PNG, мс':>10}{'Прямой, мс':>12}{'PNG, МБ':>10}{'Прямой, МБ':>12}")
+
+    for name, png_func, direct_func in (("gray/NumPy", _gray_png, _gray_direct),
+                                         ("RGB/PIL", _rgb_png, _rgb_direct)):
+        for scale in SCALES:
+            png_ms, png_mb = _measure(png_func, page, scale)
+            direct_ms, direct_mb = _measure(direct_func, page, scale)
+            print(f"{name:<12}{scale:>8.1f}{png_ms:>10.1f}{direct_ms:>12.1f}{png_mb:>10.2f}{direct_mb:>12.2f}")
+
+    print("\nПамять - промежуточные буферы сверх пиксмапа (байты PNG и декодированные копии).")
+    doc.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Бенчмарк: пакетная постобработка PremiumPostProcessor по числу процессов
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_premium_batch
+"""
+
+import os
+import random
+import time
+
+from pdf_extract_processor.postprocessing.premium_processor import PremiumPostProcessor
+
+DOCUMENTS = 5000
+LINES_PER_DOCUMENT = 200
+CHUNK_SIZE = 64
+
+_WORDS = ("приказ", "министерства", "здравоохранения", "соответствии", "пунктом",
+          "лицензирования", "деятельности", "статья", "пункт", "федерации")
+# Ошибки OCR из словаря безопасных исправлений: ~1% слов
+_ERRORS = ("ЗДРАВООХРАНЕНЯ", "соответствипунктом", "пнадзору")
+
+
+def _word(rng: random.Random) -> str:
+    return rng.choice(_ERRORS) if rng.random() < 0.01 else rng.choice(_WORDS)
+
+
+def _make_document(rng: random.Random) -> str:
+    lines = []
+    for _ in range(LINES_PER_DOCUMENT):
+        r = rng.random()
+        if r < 0.1:
+            lines.append("")
+        elif r < 0.15:
+            lines.append("## СТРАНЦА " + str(rng.randint(1, 99)))
+        else:
+            lines.append("  " + " ".join(_word(rng) for _ in range(rng.randint(3, 20))) + ".")
+    return "\n".join(lines)
+
+
+def main():
+    rng = random.Random(42)
+    documents = [_make_document(rng) for _ in range(DOCUMENTS)]
+    total_mb = sum(len(document) for document in documents) / 1e6
+
+    print(f"📊 PremiumPostProcessor: {DOCUMENTS} документов, {total_mb:.1f} млн символов")
+    print("=" * 50)
+    print(f"{'Процессов':>10}{'Время, с':>12}{'Док/с':>12}")
+
+    cpu_count = os.cpu_count() or 1
+    for workers in sorted({1, 2, 4, cpu_count}):
+        if workers > cpu_count:
+            continue
+        processor = PremiumPostProcessor({'workers': workers, 'chunk_size': CHUNK_SIZE})
+        start = time.perf_counter()
+        count = sum(1 for _ in processor.iter_batch_process(documents))
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>10}{elapsed:>12.2f}{count / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
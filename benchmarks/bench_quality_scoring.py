@@ -0,0 +1,85 @@
+"""
+Бенчмарк: оценка качества по рендерам 2x первых двух страниц
+против пакетной оценки миниатюр всех страниц
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_quality_scoring
+"""
+
+import time
+
+import cv2
+import fitz
+import numpy as np
+
+from pdf_extract_processor.document_session import PDFDocumentSession
+from pdf_extract_processor.quality_scoring import ThumbnailQualityScorer
+from pdf_extract_processor.utils.image_buffers import render_page, pixmap_to_array
+
+PAGE_COUNTS = (2, 10, 30, 100)
+REPEATS = 3
+
+
+def _make_scanned_pdf(path: str, pages: int):
+    """Скан: страницы - растровые изображения текста (часть размыта)"""
+    source = fitz.open()
+    page = source.new_page()
+    line = "1. Nastoyashchiy prikaz vstupaet v silu so dnya ego ofitsialnogo opublikovaniya."
+    for i in range(50):
+        page.insert_text((40, 50 + i * 15), line, fontsize=10)
+    pix = render_page(page, 2.0, gray=True)
+    sharp = pixmap_to_array(pix).copy()
+    blurred = cv2.GaussianBlur(sharp, (9, 9), 3)
+    images = [cv2.imencode('.png', image)[1].tobytes() for image in (sharp, blurred)]
+
+    doc = fitz.open()
+    for i in range(pages):
+        new_page = doc.new_page()
+        new_page.insert_image(new_page.rect, stream=images[i % 2])
+    doc.save(path)
+
+
+def _legacy_two_pages(session: PDFDocumentSession):
+    """Прежняя оценка: рендер 2x, лапласиан и гистограмма OpenCV, первые 2 страницы"""
+    scores = []
+    for page_num in range(min(2, session.page_count)):
+        pix = render_page(session.get_page(page_num), 2, gray=True)
+        img = pixmap_to_array(pix)
+        laplacian_var = cv2.Laplacian(img, cv2.CV_64F).var()
+        hist = cv2.calcHist([np.ascontiguousarray(img)], [0], None, [256], [0, 256])
+        scores.append((laplacian_var, hist.std(), img.mean()))
+    return scores
+
+
+def _measure(func, session) -> float:
+    func(session)  # прогрев
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func(session)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main(tmp_dir: str = "/tmp"):
+    scorer = ThumbnailQualityScorer()
+
+    print("📊 Оценка качества: 2 страницы в 2x против миниатюр всех страниц")
+    print("=" * 70)
+    print(f"{'Страниц':>8}{'2 стр. 2x, мс':>16}{'Все миниатюры, мс':>20}{'мс/стр.':>10}")
+
+    for pages in PAGE_COUNTS:
+        path = f"{tmp_dir}/bench_quality_{pages}.pdf"
+        _make_scanned_pdf(path, pages)
+        with PDFDocumentSession(path) as session:
+            legacy_ms = _measure(_legacy_two_pages, session)
+            batch_ms = _measure(scorer.score_document, session)
+            quality_map = scorer.score_document(session)
+        print(f"{pages:>8}{legacy_ms:>16.1f}{batch_ms:>20.1f}{batch_ms / pages:>10.2f}")
+
+    print("\nКарта качества (последний документ, первые 4 страницы; чётные - размытые):")
+    for page in quality_map[:4]:
+        print(f"   стр. {page.page_number}: {page.score:.3f} (резкость {page.sharpness:.3f}, "
+              f"контраст {page.contrast:.3f}) -> {page.method}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Бенчмарк: индексация и задержка поиска BM25 на синтетическом корпусе фрагментов
+
+Запуск из корня репозитория (число фрагментов - аргумент, по умолчанию 200 000):
+    python -m benchmarks.bench_search_index 1000000
+"""
+
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from pdf_extract_processor.rag_tools.search_index import BM25Index
+
+DEFAULT_DOCUMENTS = 200_000
+SEGMENT_SIZE = 250_000
+WORDS_PER_CHUNK = (80, 250)
+VOCABULARY = 50_000
+QUERIES = 200
+
+_SYLLABLES = ("ли", "цен", "зи", "ро", "ва", "ни", "е", "фар", "ма", "це", "вти", "чес", "кой", "дея",
+              "тель", "нос", "ти", "при", "каз", "мед", "ор", "га", "за", "ций", "про", "пуск", "ном")
+_ENDINGS = ("", "а", "ы", "ой", "ого", "ию", "ями", "ость")
+
+
+def _make_vocabulary(rng: random.Random) -> list:
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _documents(count: int, vocabulary: list, rng: random.Random):
+    # Частоты слов по закону Ципфа, как в естественном тексте
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    for i in range(count):
+        words = rng.choices(vocabulary, weights, k=rng.randint(*WORDS_PER_CHUNK))
+        text = " ".join(word + rng.choice(_ENDINGS) for word in words)
+        yield f"doc{i // 20}.pdf#{i % 20}", text, {'document': f"doc{i // 20}.pdf"}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DOCUMENTS
+    rng = random.Random(42)
+    vocabulary = _make_vocabulary(rng)
+    index_dir = tempfile.mkdtemp(prefix="bm25_bench_")
+
+    try:
+        print(f"📊 BM25: {count:,} фрагментов")
+        print("=" * 60)
+        start = time.perf_counter()
+        index = BM25Index(index_dir)
+        index.add_documents(_documents(count, vocabulary, rng), segment_size=SEGMENT_SIZE)
+        print(f"Индексация: {time.perf_counter() - start:.1f}с")
+
+        start = time.perf_counter()
+        index = BM25Index(index_dir)
+        print(f"Открытие индекса: {(time.perf_counter() - start) * 1000:.0f} мс")
+
+        for terms in (1, 3, 6):
+            # Запросы из слов средней частоты и из самых частых
+            for label, pool in (("средние", vocabulary[100:5000]), ("частые", vocabulary[:50])):
+                latencies = []
+                for _ in range(QUERIES):
+                    query = " ".join(rng.sample(pool, terms))
+                    start = time.perf_counter()
+                    index.search(query, top_k=10, with_text=False)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                latencies.sort()
+                print(f"{terms} терм. ({label:>7}): p50 {latencies[len(latencies) // 2]:6.2f} мс, "
+                      f"p95 {latencies[int(len(latencies) * 0.95)]:6.2f} мс")
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
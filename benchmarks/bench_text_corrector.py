@@ -0,0 +1,90 @@
+"""
+Бенчмарк: последовательные str.replace по словарю против одного прохода MultiReplacer
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_text_corrector
+"""
+
+import random
+import time
+
+from pdf_extract_processor.improved_processor import ImprovedTextCorrector
+from pdf_extract_processor.utils.multi_replace import MultiReplacer
+
+DICTIONARY_SIZES = (10, 100, 1000, 5000)
+TEXT_CHARS = 1_000_000
+REPEATS = 3
+
+_ALPHABET = "АБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЩЫЭЮЯ"
+# Типичные замены OCR: кириллица -> похожие латиница/цифры
+_CONFUSIONS = {"И": "Й", "О": "0", "З": "3", "С": "C", "Е": "E", "Р": "P", "Н": "H"}
+
+
+def _make_dictionary(size: int, rng: random.Random) -> dict:
+    """Словарь ошибка -> исправление из случайных слов с одной подменой символа"""
+    dictionary = {}
+    while len(dictionary) < size:
+        word = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(5, 12)))
+        positions = [i for i, char in enumerate(word) if char in _CONFUSIONS]
+        if not positions:
+            continue
+        i = rng.choice(positions)
+        dictionary[word[:i] + _CONFUSIONS[word[i]] + word[i + 1:]] = word
+    return dictionary
+
+
+def _make_text(dictionary: dict, rng: random.Random) -> str:
+    """Текст документа, где ~2% слов - ошибки из словаря"""
+    errors = list(dictionary)
+    words = []
+    length = 0
+    while length < TEXT_CHARS:
+        if rng.random() < 0.02:
+            word = rng.choice(errors)
+        else:
+            word = "".join(rng.choice(_ALPHABET.lower()) for _ in range(rng.randint(2, 10)))
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def _legacy(text: str, dictionary: dict) -> str:
+    for wrong, right in dictionary.items():
+        text = text.replace(wrong, right)
+    return text
+
+
+def _measure(func, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func(*args)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main():
+    rng = random.Random(42)
+
+    print(f"📊 Исправления OCR: текст {TEXT_CHARS:,} символов")
+    print("=" * 72)
+    print(f"{'Словарь':>8}{'replace, мс':>14}{'один проход, мс':>18}{'компиляция, мс':>17}{'Совпадает':>12}")
+
+    for size in DICTIONARY_SIZES:
+        dictionary = _make_dictionary(size, rng)
+        text = _make_text(dictionary, rng)
+
+        start = time.perf_counter()
+        replacer = MultiReplacer(dictionary)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        legacy_ms = _measure(_legacy, text, dictionary)
+        single_ms = _measure(replacer.apply, text)
+        same = _legacy(text, dictionary) == replacer.apply(text)
+        print(f"{size:>8}{legacy_ms:>14.1f}{single_ms:>18.1f}{compile_ms:>17.1f}{str(same):>12}")
+
+    corrector = ImprovedTextCorrector()
+    sample = "МИНЙСТЕРСТВО ЗДРАВОХРАНЕНИЯ РОССИИСКОЙ ФЕДЕРАЦИИ ПР1КАЗ от 12.О5.2О11 № 3О4 " * 20000
+    print(f"\nImprovedTextCorrector ({len(sample):,} символов): {_measure(corrector.improved_fix, sample):.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
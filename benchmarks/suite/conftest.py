@@ -0,0 +1,61 @@
+"""
+Общие данные набора: синтетические PDF создаются один раз за запуск
+"""
+
+import pytest
+
+from benchmarks import synthetic_npa
+from pdf_extract_processor.improved_processor import ImprovedAdvancedPDFExtractProcessor
+
+
+def _tesseract_available() -> bool:
+    """Tesseract с языками rus и eng - через pytesseract или tesserocr"""
+    languages = {'rus', 'eng'}
+    try:
+        import pytesseract
+        if languages <= set(pytesseract.get_languages()):
+            return True
+    except Exception:
+        pass
+    try:
+        import tesserocr
+        return languages <= set(tesserocr.get_languages()[1])
+    except Exception:
+        return False
+
+
+requires_ocr = pytest.mark.skipif(not _tesseract_available(), reason="нужен tesseract с языками rus и eng")
+
+
+@pytest.fixture(scope="session")
+def pdf_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("synthetic_npa")
+
+
+@pytest.fixture(scope="session")
+def text_pdf(pdf_dir):
+    return synthetic_npa.text_pdf(str(pdf_dir / "npa_text.pdf"), pages=10)
+
+
+@pytest.fixture(scope="session")
+def scanned_pdf(pdf_dir):
+    return synthetic_npa.scanned_pdf(str(pdf_dir / "npa_scan.pdf"), pages=3)
+
+
+@pytest.fixture(scope="session")
+def mixed_pdf(pdf_dir):
+    return synthetic_npa.mixed_pdf(str(pdf_dir / "npa_mixed.pdf"), pages=6)
+
+
+@pytest.fixture(scope="session")
+def processor():
+    """Процессор без кэша и дедупликации: измеряется сама обработка"""
+    processor = ImprovedAdvancedPDFExtractProcessor()
+    yield processor
+    processor.close()
+
+
+@pytest.fixture(scope="session")
+def ocr_text():
+    """Текст в формате вывода процессора с типичными ошибками OCR, 10 страниц"""
+    return synthetic_npa.processor_output(seed=7, pages=10, ocr_errors=True)
@@ -0,0 +1,32 @@
+"""
+Бенчмарки анализа качества и извлечения текста на синтетических PDF
+"""
+
+import pytest
+
+from pdf_extract_processor.main_processor import PDFQualityAnalyzer
+
+from .conftest import requires_ocr
+
+
+@pytest.mark.parametrize("kind", ["text", "scan", "mixed"])
+def bench_quality_analyzer(benchmark, request, kind):
+    """Текстовый документ решается по текстовому слою, скан - по миниатюрам страниц"""
+    pdf_path = request.getfixturevalue(f"{'scanned' if kind == 'scan' else kind}_pdf")
+    analyzer = PDFQualityAnalyzer()
+    level, confidence, method = benchmark(analyzer.analyze_pdf_quality, pdf_path)
+    assert method
+
+
+def bench_extract_text_simple(benchmark, processor, text_pdf):
+    text = benchmark(processor._extract_text_simple, text_pdf)
+    assert "Страница 10" in text
+
+
+@requires_ocr
+@pytest.mark.parametrize("kind", ["scan", "mixed"])
+def bench_extract_text_ocr_improved(benchmark, request, processor, kind):
+    """OCR медленный: фиксированное число повторов вместо калибровки"""
+    pdf_path = request.getfixturevalue(f"{'scanned' if kind == 'scan' else kind}_pdf")
+    text = benchmark.pedantic(processor._extract_text_ocr_improved, args=(pdf_path,), rounds=3, iterations=1)
+    assert text
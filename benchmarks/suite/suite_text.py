@@ -0,0 +1,23 @@
+"""
+Бенчмарки коррекции и очистки текста
+"""
+
+from pdf_extract_processor.improved_processor import ImprovedTextCorrector
+from pdf_extract_processor.postprocessing.premium_processor import process_any_text_to_premium_fixed
+from pdf_extract_processor.rag_tools.rag_processor import clean_npa_for_rag
+
+
+def bench_improved_fix(benchmark, ocr_text):
+    corrector = ImprovedTextCorrector()
+    corrected = benchmark(corrector.improved_fix, ocr_text)
+    assert "ПР1КАЗ" not in corrected
+
+
+def bench_premium_fixed(benchmark, ocr_text):
+    result = benchmark(process_any_text_to_premium_fixed, ocr_text)
+    assert result
+
+
+def bench_clean_npa_for_rag(benchmark, ocr_text):
+    result = benchmark(clean_npa_for_rag, ocr_text, "synthetic.pdf")
+    assert result
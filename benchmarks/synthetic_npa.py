@@ -0,0 +1,188 @@
+"""
+Генератор синтетических PDF нормативно-правовых актов для бенчмарков
+
+Страницы трёх видов:
+    text  - текстовый слой (как у документов из СПС)
+    scan  - растровое изображение страницы с шумом, размытием и перекосом (как у сканов)
+    blank - пустая страница
+Смешанный документ - текстовое сопроводительное письмо со сканированными приложениями.
+Кириллица выводится встроенным шрифтом PyMuPDF (cjk), системные шрифты не нужны.
+
+Пример набора файлов:
+    python -m benchmarks.synthetic_npa ./synthetic_pdfs
+"""
+
+import io
+import os
+import random
+import sys
+from typing import List, Optional, Sequence
+
+import fitz
+
+from pdf_extract_processor.engines import get_engine
+
+PAGE_TEXT = 'text'
+PAGE_SCAN = 'scan'
+PAGE_BLANK = 'blank'
+
+_AUTHORITIES = (
+    "МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ РОССИЙСКОЙ ФЕДЕРАЦИИ",
+    "ПРАВИТЕЛЬСТВО РОССИЙСКОЙ ФЕДЕРАЦИИ",
+    "ФЕДЕРАЛЬНАЯ СЛУЖБА ПО НАДЗОРУ В СФЕРЕ ЗДРАВООХРАНЕНИЯ",
+)
+_DOCUMENT_TYPES = ("ПРИКАЗ", "ПОСТАНОВЛЕНИЕ", "РАСПОРЯЖЕНИЕ")
+_SUBJECTS = (
+    "лицензирования фармацевтической деятельности",
+    "организации оказания медицинской помощи",
+    "государственного контроля качества лекарственных средств",
+    "ведения реестра медицинских организаций",
+)
+_CLAUSE_OPENINGS = (
+    "Утвердить прилагаемый Порядок",
+    "Установить, что органы исполнительной власти субъектов Российской Федерации обеспечивают",
+    "Признать утратившими силу приказы Министерства в части",
+    "Контроль за исполнением настоящего приказа возложить на заместителя Министра в части",
+    "Настоящий приказ вступает в силу по истечении десяти дней после дня его официального опубликования в части",
+)
+_SENTENCES = (
+    "в соответствии с пунктом 5 статьи 12 Федерального закона от 4 мая 2011 г. № 99-ФЗ",
+    "с учётом требований к оснащению медицинских организаций",
+    "при условии соблюдения лицензионных требований",
+    "в порядке, установленном законодательством Российской Федерации",
+    "на основании заявления соискателя лицензии и прилагаемых к нему документов",
+)
+# Типичные ошибки распознавания (как в словаре ImprovedTextCorrector)
+_OCR_ERRORS = {
+    "МИНИСТЕРСТВО": "МИНЙСТЕРСТВО",
+    "ПРИКАЗ": "ПР1КАЗ",
+    "2011": "2О11",
+    "РОССИЙСКОЙ": "РОССИИСКОЙ",
+    "Федерального": "Федеральнoго",
+}
+
+_PAGE_RECT = fitz.paper_rect("a4")
+_MARGIN = 56
+
+
+def npa_text(seed: int = 0, clauses: int = 30, ocr_errors: bool = False) -> str:
+    """Текст НПА: орган, тип документа, реквизиты, заголовок и нумерованные пункты"""
+    rng = random.Random(seed)
+    lines = [
+        rng.choice(_AUTHORITIES), "",
+        rng.choice(_DOCUMENT_TYPES), "",
+        f"от {rng.randint(1, 28)} мая {rng.randint(2005, 2024)} г. № {rng.randint(1, 999)}н", "",
+        f"Об утверждении Порядка {rng.choice(_SUBJECTS)}", "",
+    ]
+    for number in range(1, clauses + 1):
+        sentences = ", ".join(rng.choice(_SENTENCES) for _ in range(rng.randint(1, 3)))
+        lines.append(f"{number}. {rng.choice(_CLAUSE_OPENINGS)} {rng.choice(_SUBJECTS)} {sentences}.")
+        if rng.random() < 0.3:
+            lines.append(f"{number}.1. Подпункт {rng.choice(_SENTENCES)}.")
+    lines += ["", "Министр", "М.А. Мурашко"]
+    text = "\n".join(lines)
+
+    if ocr_errors:
+        for right, wrong in _OCR_ERRORS.items():
+            text = text.replace(right, wrong)
+    return text
+
+
+def processor_output(seed: int = 0, pages: int = 10, ocr_errors: bool = True) -> str:
+    """Текст в формате вывода процессора (заголовок и разделители страниц) - вход очистки для RAG"""
+    parts = ["# Извлеченный текст\n\n**Файл:** synthetic.pdf\n**Качество:** good\n"
+             "**Метод:** ocr_simple\n**Уверенность:** 0.870\n\n---\n\n"]
+    for page in range(pages):
+        parts.append(f"--- Страница {page + 1} ---\n{npa_text(seed + page, 12, ocr_errors)}\n\n")
+    return "".join(parts)
+
+
+def _insert_text(page: fitz.Page, text: str, fontsize: float = 10.5):
+    rect = fitz.Rect(_MARGIN, _MARGIN, _PAGE_RECT.width - _MARGIN, _PAGE_RECT.height - _MARGIN)
+    writer = fitz.TextWriter(page.rect)
+    writer.fill_textbox(rect, text, font=fitz.Font("cjk"), fontsize=fontsize)
+    writer.write_text(page)
+
+
+def _scanned_image(text: str, rng: random.Random, dpi: int, noise: float, blur: float, skew: float) -> bytes:
+    """JPEG скана: рендер текстовой страницы с поворотом, размытием и шумом"""
+    np = get_engine('numpy')
+    Image = get_engine('pil')
+    from PIL import ImageFilter
+
+    source = fitz.open()
+    page = source.new_page(width=_PAGE_RECT.width, height=_PAGE_RECT.height)
+    _insert_text(page, text)
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    source.close()
+
+    if skew:
+        image = image.rotate(rng.uniform(-skew, skew), resample=Image.BICUBIC, fillcolor=255)
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    if noise:
+        pixels = np.asarray(image, dtype=np.float32)
+        generator = np.random.default_rng(rng.randrange(1 << 30))
+        pixels += generator.normal(0, 255 * noise, pixels.shape)
+        # Соль и перец: пыль и точки на скане
+        specks = generator.random(pixels.shape)
+        pixels[specks < noise / 20] = 0
+        pixels[specks > 1 - noise / 20] = 255
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def build_pdf(path: str, page_kinds: Sequence[str], seed: int = 0, dpi: int = 150,
+              noise: float = 0.08, blur: float = 0.8, skew: float = 1.5) -> str:
+    """PDF из страниц заданных видов (text / scan / blank); возвращает путь"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for number, kind in enumerate(page_kinds):
+        page = doc.new_page(width=_PAGE_RECT.width, height=_PAGE_RECT.height)
+        text = npa_text(seed * 1000 + number, clauses=8)
+        if kind == PAGE_TEXT:
+            _insert_text(page, text)
+        elif kind == PAGE_SCAN:
+            page.insert_image(page.rect, stream=_scanned_image(text, rng, dpi, noise, blur, skew))
+        elif kind != PAGE_BLANK:
+            raise ValueError(f"Неизвестный вид страницы: {kind}")
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Шрифт cjk велик: в файл попадают только использованные глифы
+    doc.subset_fonts()
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return path
+
+
+def text_pdf(path: str, pages: int = 10, seed: int = 0) -> str:
+    return build_pdf(path, [PAGE_TEXT] * pages, seed)
+
+
+def scanned_pdf(path: str, pages: int = 3, seed: int = 0, **distortion) -> str:
+    """Скан: distortion - noise, blur, skew, dpi (см. build_pdf)"""
+    return build_pdf(path, [PAGE_SCAN] * pages, seed, **distortion)
+
+
+def mixed_pdf(path: str, pages: int = 6, seed: int = 0, kinds: Optional[List[str]] = None) -> str:
+    """Сопроводительное письмо текстом, приложения - сканы, в конце пустая страница"""
+    if kinds is None:
+        text_pages = max(1, pages // 3)
+        kinds = [PAGE_TEXT] * text_pages + [PAGE_SCAN] * (pages - text_pages - 1) + [PAGE_BLANK]
+    return build_pdf(path, kinds, seed)
+
+
+def main():
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else "synthetic_pdfs"
+    for path in (text_pdf(os.path.join(output_dir, "npa_text.pdf")),
+                 scanned_pdf(os.path.join(output_dir, "npa_scan.pdf")),
+                 mixed_pdf(os.path.join(output_dir, "npa_mixed.pdf"))):
+        print(f"✅ {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
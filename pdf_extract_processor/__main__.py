@@ -0,0 +1,5 @@
+"""Запуск CLI: python -m pdf_extract_processor"""
+
+from .cli import main
+
+main()
@@ -0,0 +1,118 @@
+"""
+Адаптивное разрешение рендера для OCR
+
+Высота строк текста оценивается по дешёвому рендеру низкого разрешения,
+затем страница рендерится в минимальном масштабе, при котором глифы
+достигают целевой высоты в пикселях. При низкой уверенности OCR страница
+повторно распознаётся в более высоком разрешении.
+"""
+
+import fitz
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .engines import get_engine
+from .utils.image_buffers import render_page, pixmap_to_array
+
+# Распознавание готового рендера: (текст, средняя уверенность 0-100)
+Recognizer = Callable[[fitz.Pixmap], Tuple[str, float]]
+
+
+class AdaptiveRenderPolicy:
+    """Выбор масштаба рендера страницы по оценке высоты текста"""
+
+    def __init__(self, target_glyph_px: float = 30.0, probe_scale: float = 1.0,
+                 min_scale: float = 1.0, max_scale: float = 4.0, line_percentile: float = 25.0,
+                 min_confidence: float = 70.0, escalation_factor: float = 1.5, max_escalations: int = 1):
+        # Высота строки (от верха заглавных до низа выносных) в пикселях, удобная для Tesseract
+        self.target_glyph_px = target_glyph_px
+        self.probe_scale = probe_scale
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        # Нижний перцентиль высот строк: мелкие сноски важнее крупных заголовков
+        self.line_percentile = line_percentile
+        self.min_confidence = min_confidence
+        self.escalation_factor = escalation_factor
+        self.max_escalations = max_escalations
+
+    @property
+    def settings(self) -> Dict:
+        return {
+            'target_glyph_px': self.target_glyph_px,
+            'probe_scale': self.probe_scale,
+            'min_scale': self.min_scale,
+            'max_scale': self.max_scale,
+            'line_percentile': self.line_percentile,
+            'min_confidence': self.min_confidence,
+            'escalation_factor': self.escalation_factor,
+            'max_escalations': self.max_escalations
+        }
+
+    def estimate_line_height(self, page: fitz.Page) -> Optional[float]:
+        """Характерная высота строки текста в пунктах PDF (None - текст не найден)"""
+        pix = render_page(page, self.probe_scale, gray=True)
+        heights = _text_line_heights(pixmap_to_array(pix))
+        del pix
+        if not heights:
+            return None
+
+        np = get_engine('numpy')
+        return float(np.percentile(heights, self.line_percentile)) / self.probe_scale
+
+    def choose_scale(self, page: fitz.Page, fallback_scale: float) -> float:
+        """Минимальный масштаб, при котором строки достигают целевой высоты"""
+        line_height = self.estimate_line_height(page)
+        if not line_height:
+            return fallback_scale
+        scale = self.target_glyph_px / line_height
+        return round(min(self.max_scale, max(self.min_scale, scale)), 2)
+
+    def escalation_scales(self, scale: float) -> List[float]:
+        """Масштабы повторного распознавания при низкой уверенности"""
+        scales = []
+        for _ in range(self.max_escalations):
+            next_scale = round(min(self.max_scale, scale * self.escalation_factor), 2)
+            if next_scale <= scale:
+                break
+            scales.append(next_scale)
+            scale = next_scale
+        return scales
+
+    def recognize(self, page: fitz.Page, pix: fitz.Pixmap, scale: float,
+                  recognizer: Recognizer, gray: bool = False) -> Tuple[str, float, bool]:
+        """
+        OCR рендера с эскалацией разрешения (повторные рендеры - в цветовом пространстве gray).
+        Возвращает (текст, итоговый масштаб, была ли эскалация).
+        """
+        text, confidence = recognizer(pix)
+        best_scale = scale
+        escalated = False
+
+        for next_scale in self.escalation_scales(scale):
+            if confidence >= self.min_confidence:
+                break
+            escalated = True
+            next_pix = render_page(page, next_scale, gray)
+            next_text, next_confidence = recognizer(next_pix)
+            del next_pix
+            if next_confidence > confidence:
+                text, confidence, best_scale = next_text, next_confidence, next_scale
+
+        return text, best_scale, escalated
+
+
+def _text_line_heights(gray) -> List[int]:
+    """Высоты строк текста по горизонтальной проекции тёмных пикселей"""
+    np = get_engine('numpy')
+    height, width = gray.shape
+    if height == 0 or width == 0:
+        return []
+
+    ink_rows = (gray < 128).sum(axis=1) > max(1, width // 500)
+    # Границы последовательностей строк с чернилами
+    edges = np.diff(np.concatenate(([0], ink_rows.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    runs = ends - starts
+
+    # Отбрасываем линии-разделители и крупные иллюстрации
+    return [int(run) for run in runs if 2 <= run <= height // 10]
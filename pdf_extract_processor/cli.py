@@ -0,0 +1,673 @@
+"""
+Консольный интерфейс пакетной обработки (без Google Colab)
+
+    pdf-extract process ./входящие "архив/**/*.pdf" -o ./результат --workers 8
+    pdf-extract shard plan ./сборник.pdf -j /mnt/общая/сборник   # один большой PDF по частям
+
+Файлы обрабатываются параллельной очередью задач, результаты пишутся на диск,
+а манифест контрольных точек позволяет продолжить прерванный запуск.
+"""
+
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import click
+
+from .columnar_export import EXPORT_FORMATS, export_jsonl_outputs
+from .memory_budget import MEMORY_BUDGET_ENV
+from .metrics import ProcessingMetrics
+from .near_duplicates import DocumentFingerprint, DuplicateMatch, NearDuplicateDetector
+from .ocr_engines import OCR_ENGINE_ENV, OCR_ENGINE_NAMES
+from .profiling import (PROFILE_DIR_ENV, PROFILE_MEMORY_ENV, PROFILE_TOP_ENV, DocumentProfiler, merge_profile_indexes,
+                        worker_index_name)
+from .rag_tools.chunker import NPAChunker
+from .sharding import DEFAULT_LEASE_SECONDS, DEFAULT_SHARD_PAGES, ShardJob, work_shards
+
+CHECKPOINT_FILENAME = '.checkpoint.jsonl'
+FINGERPRINTS_FILENAME = '.fingerprints.jsonl'
+DEDUP_CHOICES = ('skip', 'link')
+
+# Задача очереди: (путь к PDF, путь результата, формат)
+BatchTask = Tuple[str, str, str]
+
+_OUTPUT_SUFFIXES = {
+    'markdown': '_processed.md',
+    'jsonl': '_processed.jsonl',
+}
+
+# Процессор, созданный один раз в каждом процессе-воркере
+_WORKER_PROCESSOR = None
+_WORKER_QUIET = True
+
+
+def collect_input_files(inputs: Iterable[str], recursive: bool = True) -> List[Tuple[str, str]]:
+    """
+    Разворачивание каталогов, glob-шаблонов и путей к файлам.
+    Возвращает пары (абсолютный путь, относительный путь для вывода) без повторов.
+    Относительный путь считается от каталога или от неизменяемой части шаблона;
+    если два файла дают один путь результата, выбрасывается ValueError.
+    """
+    collected = {}
+
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*') if recursive else os.path.join(item, '*')
+            for path in glob.glob(pattern, recursive=recursive):
+                if path.lower().endswith('.pdf') and os.path.isfile(path):
+                    collected.setdefault(os.path.abspath(path), os.path.relpath(path, item))
+        elif os.path.isfile(item):
+            collected.setdefault(os.path.abspath(item), os.path.basename(item))
+        else:
+            root = _glob_root(item)
+            for path in glob.glob(item, recursive=True):
+                if path.lower().endswith('.pdf') and os.path.isfile(path):
+                    collected.setdefault(os.path.abspath(path), os.path.relpath(path, root))
+
+    _check_output_collisions(collected)
+    return sorted(collected.items())
+
+
+def _glob_root(pattern: str) -> str:
+    """Каталог до первого компонента шаблона со спецсимволами glob"""
+    root = []
+    for part in os.path.normpath(pattern).split(os.sep)[:-1]:
+        if glob.has_magic(part):
+            break
+        root.append(part)
+    if not root:
+        return '.'
+    # Абсолютный шаблон начинается с пустого компонента
+    return os.sep.join(root) or os.sep
+
+
+def _check_output_collisions(collected: Dict[str, str]):
+    """Два входных файла с одним путём результата перезаписали бы друг друга"""
+    by_output: Dict[str, str] = {}
+    for path, relative in sorted(collected.items()):
+        key = os.path.normcase(os.path.splitext(os.path.normpath(relative))[0])
+        if key in by_output:
+            raise ValueError(f"Файлы {by_output[key]} и {path} дают один и тот же путь результата "
+                             f"({relative}); передайте их общим каталогом или шаблоном")
+        by_output[key] = path
+
+
+def output_path_for(relative_path: str, output_dir: str, fmt: str) -> str:
+    """Путь результата с сохранением структуры входного каталога"""
+    stem = os.path.splitext(relative_path)[0]
+    return os.path.join(output_dir, stem + _OUTPUT_SUFFIXES[fmt])
+
+
+class CheckpointManifest:
+    """
+    Манифест контрольных точек: JSONL, одна строка на завершённый файл.
+    Файл считается готовым, если последняя запись успешна и размер/mtime не изменились.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Недописанная строка после аварийного завершения
+                self.entries[entry['path']] = entry
+
+    @staticmethod
+    def _fingerprint(path: str) -> Dict:
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def is_done(self, path: str) -> bool:
+        entry = self.entries.get(path)
+        if not entry or entry.get('status') not in ('success', 'duplicate'):
+            return False
+        try:
+            fingerprint = self._fingerprint(path)
+        except OSError:
+            return False
+        return entry.get('size') == fingerprint['size'] and entry.get('mtime') == fingerprint['mtime']
+
+    def record(self, path: str, result: Dict):
+        """Запись результата с немедленным сбросом на диск"""
+        entry = {'path': path, 'finished_at': datetime.now().isoformat(timespec='seconds')}
+        try:
+            entry.update(self._fingerprint(path))
+        except OSError:
+            pass
+        entry.update(result)
+
+        self.entries[path] = entry
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def _init_cli_worker(ocr_workers: int, cache_dir: Optional[str], quiet: bool, hybrid: bool = False,
+                     adaptive_dpi: bool = False, ocr_engine: Optional[str] = None,
+                     profile_dir: Optional[str] = None, profile_top: int = 5,
+                     memory_budget_mb: Optional[float] = None, profile_memory: bool = False):
+    """Один процессор на процесс-воркер"""
+    global _WORKER_PROCESSOR, _WORKER_QUIET
+    from .improved_processor import ImprovedAdvancedPDFExtractProcessor
+
+    _WORKER_QUIET = quiet
+    with _maybe_silenced(quiet):
+        _WORKER_PROCESSOR = ImprovedAdvancedPDFExtractProcessor(ocr_workers=ocr_workers, cache_dir=cache_dir,
+                                                                hybrid_routing=hybrid, adaptive_dpi=adaptive_dpi,
+                                                                ocr_engine=ocr_engine,
+                                                                memory_budget_mb=memory_budget_mb)
+    # Свой список профилей у каждого воркера; после пакета списки сливаются
+    _WORKER_PROCESSOR.profiler = (DocumentProfiler(profile_dir, profile_top, profile_memory,
+                                                   index_name=worker_index_name(os.getpid()))
+                                  if profile_dir else None)
+
+
+def _maybe_silenced(quiet: bool):
+    """Подавление построчного вывода процессора в воркерах"""
+    return contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+
+
+def _process_file_task(task: Tuple[str, str, str]) -> Dict:
+    """Обработка одного файла в воркере"""
+    file_path, output_path, fmt = task
+    # Пишем во временный файл: недописанный результат не примется за готовый
+    tmp_path = output_path + '.part'
+    start = time.time()
+    try:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with _maybe_silenced(_WORKER_QUIET):
+            summary = _WORKER_PROCESSOR.process_file_streaming(file_path, tmp_path, fmt)
+        os.replace(tmp_path, output_path)
+
+        return {
+            'status': 'success',
+            'output': output_path,
+            'pages': summary['pages_written'],
+            'characters': summary['characters'],
+            'method': summary['extraction_method'],
+            'seconds': round(time.time() - start, 3),
+            'cpu_seconds': round(summary['metrics']['cpu_seconds'], 3),
+            # Замеры стадий для итогов пакета; в манифест не пишутся
+            'metrics': summary['metrics']
+        }
+    except Exception as e:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        return {'status': 'error', 'error': str(e), 'seconds': round(time.time() - start, 3)}
+
+
+def _fingerprint_task(file_path: str) -> Optional[Dict]:
+    """Отпечаток файла для поиска почти дубликатов (в воркере)"""
+    try:
+        with _maybe_silenced(_WORKER_QUIET):
+            fingerprint = _WORKER_PROCESSOR.fingerprint_document(file_path)
+    except Exception:
+        return None
+    return fingerprint.to_dict() if fingerprint is not None else None
+
+
+class FingerprintStore:
+    """
+    Отпечатки обработанных оригиналов (JSONL рядом с манифестом контрольных точек):
+    копии документов из прошлых запусков распознаются без повторного чтения оригиналов.
+    """
+
+    def __init__(self, path: str, settings: Dict):
+        self.path = path
+        self.settings = settings
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    # Отпечатки с другими настройками несравнимы
+                    if entry.get('settings') == settings:
+                        self.entries[entry['path']] = entry['fingerprint']
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, path: str, fingerprint: Dict):
+        self.entries[path] = fingerprint
+        self._file.write(json.dumps({'path': path, 'settings': self.settings, 'fingerprint': fingerprint}) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class BatchMetrics:
+    """
+    Замеры стадий пакета: записи документов из воркеров агрегируются, JSON и
+    текстовый файл Prometheus переписываются после каждого документа.
+    """
+
+    def __init__(self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        self.metrics = ProcessingMetrics()
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+
+    def add(self, result: Dict, record: Optional[Dict]):
+        if record is None:
+            # Дубликаты и ошибки воркера: только статус и время
+            record = {'status': result['status'], 'wall_seconds': result.get('seconds', 0.0)}
+        self.metrics.add_document(record)
+        if self.json_path:
+            self.metrics.write_json(self.json_path)
+        if self.prometheus_path:
+            self.metrics.write_prometheus(self.prometheus_path)
+
+
+def _split_near_duplicates(pending: List[BatchTask], manifest: CheckpointManifest, store: FingerprintStore,
+                           detector: NearDuplicateDetector, workers: int,
+                           initargs: Tuple) -> Tuple[List[BatchTask], List[Tuple[BatchTask, Dict, DuplicateMatch]], Dict]:
+    """
+    Отпечатки файлов очереди (параллельно, до извлечения) и разбиение очереди
+    на оригиналы и почти дубликаты. Оригиналом считается первый файл группы
+    или документ, обработанный в прошлых запусках.
+    """
+    for path, fingerprint in store.entries.items():
+        entry = manifest.entries.get(path)
+        if entry and entry.get('status') == 'success':
+            detector.add(path, DocumentFingerprint.from_dict(fingerprint))
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_cli_worker,
+                             initargs=initargs) as executor:
+        fingerprints = list(executor.map(_fingerprint_task, [task[0] for task in pending]))
+
+    originals, duplicates, by_path = [], [], {}
+    for task, fingerprint in zip(pending, fingerprints):
+        if fingerprint is not None:
+            by_path[task[0]] = fingerprint
+        match = detector.check(task[0], DocumentFingerprint.from_dict(fingerprint)) if fingerprint else None
+        if match is None:
+            originals.append(task)
+        else:
+            duplicates.append((task, fingerprint, match))
+
+    click.echo(f"🔁 Почти дубликатов: {len(duplicates)} из {len(pending)} "
+               f"(проверка {time.time() - start:.1f}с)")
+    return originals, duplicates, by_path
+
+
+def _resolve_duplicates(duplicates: List[Tuple[BatchTask, Dict, DuplicateMatch]],
+                        manifest: CheckpointManifest, stats: Dict, dedup: str,
+                        metrics: Optional[BatchMetrics] = None) -> List[BatchTask]:
+    """
+    Запись почти дубликатов без извлечения: skip - только отметка в манифесте,
+    link - копия результата оригинала. Возвращает дубликаты, чей оригинал не обработан.
+    """
+    retry = []
+    for task, fingerprint, match in duplicates:
+        original = manifest.entries.get(match.original)
+        if not original or original.get('status') != 'success':
+            retry.append(task)
+            continue
+
+        result = {'status': 'duplicate', 'duplicate_of': match.original, 'similarity': match.similarity,
+                  'seconds': 0.0}
+        if dedup == 'link':
+            output_path = task[1]
+            try:
+                os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+                shutil.copyfile(original['output'], output_path + '.part')
+                os.replace(output_path + '.part', output_path)
+            except OSError:
+                # Результат оригинала недоступен - дубликат обрабатывается сам
+                retry.append(task)
+                continue
+            result.update(output=output_path, pages=original.get('pages'), characters=original.get('characters'),
+                          method=original.get('method'))
+
+        # Оценка: время извлечения оригинала на страницу (текстовый слой OCR не требует)
+        saved = 0.0
+        if original.get('method') != 'text_extraction' and original.get('pages'):
+            saved = original['seconds'] / original['pages'] * fingerprint['pages']
+        stats['ocr_seconds_saved'] += saved
+        result['ocr_seconds_saved'] = round(saved, 1)
+        _record_result(manifest, stats, task[0], result, metrics)
+    return retry
+
+
+def _run_queue(pending: List[BatchTask], manifest: CheckpointManifest, stats: Dict,
+               workers: int, initargs: Tuple, store: Optional[FingerprintStore] = None,
+               fingerprints: Optional[Dict] = None, metrics: Optional[BatchMetrics] = None):
+    """Очередь задач извлечения: пул пересоздаётся после аварийного завершения воркера"""
+    queue = list(reversed(pending))
+    # Ограничение задач в полёте: очередь не материализуется в пуле целиком
+    max_in_flight = max(1, workers) * 2
+
+    def finish(task: BatchTask, result: Dict):
+        _record_result(manifest, stats, task[0], result, metrics)
+        # Отпечаток сохраняется только для успешно извлечённых оригиналов
+        if store is not None and result['status'] == 'success' and task[0] in fingerprints:
+            store.record(task[0], fingerprints[task[0]])
+
+    while queue:
+        with ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_cli_worker,
+                                 initargs=initargs) as executor:
+            in_flight = {}
+            try:
+                while queue or in_flight:
+                    while queue and len(in_flight) < max_in_flight:
+                        task = queue.pop()
+                        in_flight[executor.submit(_process_file_task, task)] = task
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        finish(in_flight.pop(future), result)
+            except BrokenProcessPool as e:
+                # Воркер погиб (например, OOM): пул пересоздаётся. Задачи, завершившиеся
+                # до сбоя, записываются со своим результатом, остальные - ошибкой
+                for future, task in in_flight.items():
+                    if future.done() and not future.cancelled() and future.exception() is None:
+                        finish(task, future.result())
+                    else:
+                        finish(task, {'status': 'error', 'error': f"Воркер завершился аварийно: {e}"})
+
+
+def run_batch(files: List[Tuple[str, str]], output_dir: str, fmt: str = 'markdown',
+              workers: int = 1, ocr_workers: int = 1, cache_dir: Optional[str] = None,
+              checkpoint_path: Optional[str] = None, quiet: bool = True, hybrid: bool = False,
+              adaptive_dpi: bool = False, ocr_engine: Optional[str] = None, dedup: Optional[str] = None,
+              metrics_json: Optional[str] = None, metrics_prometheus: Optional[str] = None,
+              profile_dir: Optional[str] = None, profile_top: int = 5,
+              memory_budget_mb: Optional[float] = None, profile_memory: bool = False) -> Dict:
+    """
+    Пакетная обработка через очередь задач с контрольными точками.
+    dedup: skip / link - почти дубликаты находятся до извлечения и не распознаются повторно.
+    metrics_json / metrics_prometheus: файлы замеров стадий (JSON и textfile Prometheus).
+    profile_dir: дампы cProfile и отчёты памяти profile_top самых медленных документов
+    (profile_memory - с отслеживанием памяти Python через tracemalloc).
+    memory_budget_mb: предел RSS каждого воркера вместе с его процессами OCR.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = checkpoint_path or os.path.join(output_dir, CHECKPOINT_FILENAME)
+    manifest = CheckpointManifest(checkpoint_path)
+
+    pending = [(path, output_path_for(rel, output_dir, fmt), fmt)
+               for path, rel in files if not manifest.is_done(path)]
+    stats = {'total': len(files), 'skipped': len(files) - len(pending), 'success': 0, 'failed': 0,
+             'duplicates': 0, 'ocr_seconds_saved': 0.0}
+
+    click.echo(f"📋 Файлов: {stats['total']}, уже обработано: {stats['skipped']}, в очереди: {len(pending)}")
+    start = time.time()
+    initargs = (ocr_workers, cache_dir, quiet, hybrid, adaptive_dpi, ocr_engine, profile_dir, profile_top,
+                memory_budget_mb, profile_memory)
+    store = None
+    metrics = BatchMetrics(metrics_json, metrics_prometheus)
+
+    try:
+        if dedup and pending:
+            detector = NearDuplicateDetector()
+            store = FingerprintStore(os.path.join(os.path.dirname(checkpoint_path) or '.', FINGERPRINTS_FILENAME),
+                                     detector.settings)
+            originals, duplicates, fingerprints = _split_near_duplicates(pending, manifest, store, detector,
+                                                                         workers, initargs)
+            _run_queue(originals, manifest, stats, workers, initargs, store, fingerprints, metrics)
+            # Дубликаты, чей оригинал извлечь не удалось, обрабатываются обычным порядком
+            retry = _resolve_duplicates(duplicates, manifest, stats, dedup, metrics)
+            _run_queue(retry, manifest, stats, workers, initargs, store, fingerprints, metrics)
+        else:
+            _run_queue(pending, manifest, stats, workers, initargs, metrics=metrics)
+    finally:
+        manifest.close()
+        if store is not None:
+            store.close()
+
+    stats['seconds'] = round(time.time() - start, 1)
+    stats['ocr_seconds_saved'] = round(stats['ocr_seconds_saved'], 1)
+    click.echo(f"\n✅ Успешно: {stats['success']}  ❌ Ошибок: {stats['failed']}  "
+               f"⏭️ Пропущено: {stats['skipped']}  ⏱️ {stats['seconds']}с")
+    if dedup:
+        click.echo(f"🔁 Почти дубликатов: {stats['duplicates']}, сэкономлено OCR ~{stats['ocr_seconds_saved']}с")
+    if profile_dir:
+        profiles = merge_profile_indexes(profile_dir, profile_top)
+        if profiles:
+            slowest = profiles[0]
+            click.echo(f"🔬 Профили {len(profiles)} самых медленных документов: {profile_dir} "
+                       f"(самый медленный {os.path.basename(slowest['source'])}, {slowest['wall_seconds']}с)")
+    if metrics.metrics.stage_wall:
+        throughput = metrics.metrics.throughput()
+        click.echo(f"📊 {throughput['pages_per_second']} стр/с на воркер, "
+                   f"CPU {throughput['cpu_seconds_per_page']}с/стр")
+        # Документы обрабатываются параллельно: время стадий - сумма по воркерам, а не доли времени пакета
+        click.echo(f"   Стадии (сумма по воркерам): {metrics.metrics.summary_line()}")
+    stats['metrics'] = metrics.metrics.to_dict()
+    return stats
+
+
+def _record_result(manifest: CheckpointManifest, stats: Dict, path: str, result: Dict,
+                   metrics: Optional[BatchMetrics] = None):
+    record = result.pop('metrics', None)
+    manifest.record(path, result)
+    if metrics is not None:
+        metrics.add(result, record)
+    if result['status'] == 'success':
+        stats['success'] += 1
+        click.echo(f"✅ {path} → {result['output']} ({result['pages']} стр., {result['seconds']}с)")
+    elif result['status'] == 'duplicate':
+        stats['duplicates'] += 1
+        click.echo(f"🔁 {path} ≈ {result['duplicate_of']} (сходство {result['similarity']:.2f})")
+    else:
+        stats['failed'] += 1
+        click.echo(f"❌ {path}: {result.get('error')}")
+
+
+@click.group()
+def cli():
+    """PDF Extract Processor - пакетная обработка PDF из командной строки"""
+
+
+@cli.command('process')
+@click.argument('inputs', nargs=-1, required=True)
+@click.option('-o', '--output-dir', required=True, type=click.Path(file_okay=False),
+              help='Каталог для результатов')
+@click.option('-f', '--format', 'fmt', type=click.Choice(sorted(_OUTPUT_SUFFIXES)), default='markdown',
+              show_default=True, help='Формат вывода')
+@click.option('-w', '--workers', type=int, default=os.cpu_count() or 1, show_default=True,
+              help='Число процессов очереди задач (по файлам)')
+@click.option('--ocr-workers', type=int, default=1, show_default=True,
+              help='Процессов OCR на один файл (0 - по числу ядер)')
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=None,
+              help='Каталог кэша извлечения')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), default=None,
+              help=f'Манифест контрольных точек (по умолчанию OUTPUT_DIR/{CHECKPOINT_FILENAME})')
+@click.option('--recursive/--no-recursive', default=True, show_default=True,
+              help='Обходить подкаталоги')
+@click.option('--hybrid', is_flag=True, help='Постраничный выбор между текстовым слоем и OCR')
+@click.option('--adaptive-dpi', is_flag=True, help='Масштаб рендера OCR по высоте текста страницы')
+@click.option('--ocr-engine', type=click.Choice(OCR_ENGINE_NAMES), default=None,
+              help=f'Движок OCR (по умолчанию ${OCR_ENGINE_ENV} или auto)')
+@click.option('--dedup', type=click.Choice(DEDUP_CHOICES), default=None,
+              help='Почти дубликаты: skip - не извлекать, link - копия результата оригинала')
+@click.option('--metrics-json', type=click.Path(dir_okay=False), default=None,
+              help='Файл JSON с замерами стадий (счётчики и гистограммы)')
+@click.option('--metrics-prom', type=click.Path(dir_okay=False), default=None,
+              help='Текстовый файл Prometheus для textfile collector (*.prom)')
+@click.option('--profile-dir', type=click.Path(file_okay=False), default=None, envvar=PROFILE_DIR_ENV,
+              help=f'Профилирование: дампы cProfile (snakeviz) и отчёты памяти (или ${PROFILE_DIR_ENV})')
+@click.option('--profile-top', type=int, default=5, show_default=True, envvar=PROFILE_TOP_ENV,
+              help='Сколько самых медленных документов профилировать')
+@click.option('--profile-memory', is_flag=True, envvar=PROFILE_MEMORY_ENV,
+              help=f'Профилирование памяти Python через tracemalloc, заметно медленнее (или ${PROFILE_MEMORY_ENV})')
+@click.option('--memory-budget', 'memory_budget', type=float, default=None, envvar=MEMORY_BUDGET_ENV,
+              help=f'Предел RSS на воркер в МБ, вместе с процессами OCR (или ${MEMORY_BUDGET_ENV})')
+@click.option('-v', '--verbose', is_flag=True, help='Показывать постраничный вывод процессора')
+def process_command(inputs, output_dir, fmt, workers, ocr_workers, cache_dir, checkpoint, recursive, hybrid,
+                    adaptive_dpi, ocr_engine, dedup, metrics_json, metrics_prom, profile_dir, profile_top,
+                    profile_memory, memory_budget, verbose):
+    """Обработка PDF: INPUTS - каталоги, glob-шаблоны или файлы"""
+    try:
+        files = collect_input_files(inputs, recursive)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if not files:
+        raise click.ClickException("PDF файлы не найдены")
+
+    stats = run_batch(files, output_dir, fmt, workers, ocr_workers, cache_dir, checkpoint,
+                      quiet=not verbose, hybrid=hybrid, adaptive_dpi=adaptive_dpi, ocr_engine=ocr_engine,
+                      dedup=dedup, metrics_json=metrics_json, metrics_prometheus=metrics_prom,
+                      profile_dir=profile_dir, profile_top=profile_top, memory_budget_mb=memory_budget,
+                      profile_memory=profile_memory)
+    if stats['failed']:
+        raise SystemExit(1)
+
+
+def collect_jsonl_outputs(inputs: Iterable[str]) -> List[Tuple[str, str]]:
+    """
+    JSONL результаты `process -f jsonl` в каталогах или по путям.
+    Возвращает пары (имя исходного документа, путь к JSONL).
+    """
+    suffix = _OUTPUT_SUFFIXES['jsonl']
+    collected = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            for path in glob.glob(os.path.join(item, '**', '*' + suffix), recursive=True):
+                relative = os.path.relpath(path, item)
+                collected.setdefault(os.path.abspath(path), relative[:-len(suffix)] + '.pdf')
+        elif os.path.isfile(item):
+            name = os.path.basename(item)
+            document = name[:-len(suffix)] + '.pdf' if name.endswith(suffix) else name
+            collected.setdefault(os.path.abspath(item), document)
+    return sorted((document, path) for path, document in collected.items())
+
+
+@cli.command('export')
+@click.argument('inputs', nargs=-1, required=True)
+@click.option('-o', '--output-dir', required=True, type=click.Path(file_okay=False),
+              help='Каталог для pages.* и chunks.*')
+@click.option('-f', '--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='parquet',
+              show_default=True, help='Колоночный формат')
+@click.option('--row-group-size', type=int, default=10000, show_default=True,
+              help='Строк в группе (row group)')
+@click.option('--max-chunk-chars', type=int, default=2000, show_default=True,
+              help='Максимальная длина фрагмента')
+@click.option('--overlap-chars', type=int, default=200, show_default=True,
+              help='Перекрытие фрагментов длинного пункта')
+def export_command(inputs, output_dir, fmt, row_group_size, max_chunk_chars, overlap_chars):
+    """Выгрузка JSONL результатов (process -f jsonl) в Parquet/Arrow для векторной БД"""
+    documents = collect_jsonl_outputs(inputs)
+    if not documents:
+        raise click.ClickException(f"Файлы *{_OUTPUT_SUFFIXES['jsonl']} не найдены")
+
+    start = time.time()
+    summary = export_jsonl_outputs(documents, output_dir, fmt, row_group_size,
+                                   NPAChunker(max_chunk_chars, overlap_chars))
+    click.echo(f"✅ Документов: {summary['documents']}, страниц: {summary['pages']}, "
+               f"фрагментов: {summary['chunks']} ({time.time() - start:.1f}с)")
+    click.echo(f"   {summary['pages_path']}\n   {summary['chunks_path']}")
+
+
+@cli.group('shard')
+def shard_group():
+    """Один большой PDF по диапазонам страниц: воркеры на разных машинах, задание на общей ФС"""
+
+
+@shard_group.command('plan')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('-j', '--job-dir', required=True, type=click.Path(file_okay=False),
+              help='Каталог задания на общей файловой системе')
+@click.option('--shard-pages', type=int, default=DEFAULT_SHARD_PAGES, show_default=True,
+              help='Страниц в шарде')
+@click.option('--adaptive-dpi', is_flag=True, help='Масштаб рендера OCR по высоте текста страницы')
+@click.option('--ocr-engine', type=click.Choice(OCR_ENGINE_NAMES), default=None,
+              help=f'Движок OCR (по умолчанию ${OCR_ENGINE_ENV} или auto)')
+def shard_plan_command(source, job_dir, shard_pages, adaptive_dpi, ocr_engine):
+    """Разбиение SOURCE на шарды; настройки OCR задания общие для всех воркеров"""
+    job = ShardJob.create(source, job_dir, shard_pages, {'adaptive_dpi': adaptive_dpi, 'ocr_engine': ocr_engine})
+    click.echo(f"🧩 {job.manifest['source']}: {job.manifest['page_count']} стр., "
+               f"{len(job.shards)} шардов по {job.manifest['shard_pages']} стр. → {job_dir}")
+
+
+@shard_group.command('work')
+@click.argument('job_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--source', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Путь к исходному PDF на этой машине, если он смонтирован иначе')
+@click.option('--max-shards', type=int, default=None, help='Обработать не больше N шардов')
+@click.option('--lease', type=float, default=DEFAULT_LEASE_SECONDS, show_default=True,
+              help='Через сколько секунд без прогресса захват шарда считается брошенным')
+@click.option('--ocr-workers', type=int, default=1, show_default=True,
+              help='Процессов OCR на шард (0 - по числу ядер)')
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=None,
+              help='Каталог кэша извлечения')
+@click.option('--memory-budget', 'memory_budget', type=float, default=None, envvar=MEMORY_BUDGET_ENV,
+              help=f'Предел RSS воркера в МБ, вместе с процессами OCR (или ${MEMORY_BUDGET_ENV})')
+@click.option('-v', '--verbose', is_flag=True, help='Показывать постраничный вывод процессора')
+def shard_work_command(job_dir, source, max_shards, lease, ocr_workers, cache_dir, memory_budget, verbose):
+    """Обработка свободных шардов задания JOB_DIR, пока они есть"""
+    from .improved_processor import ImprovedAdvancedPDFExtractProcessor
+
+    job = ShardJob(job_dir)
+    options = job.options
+    with _maybe_silenced(not verbose):
+        processor = ImprovedAdvancedPDFExtractProcessor(ocr_workers=ocr_workers, cache_dir=cache_dir,
+                                                        adaptive_dpi=options.get('adaptive_dpi', False),
+                                                        ocr_engine=options.get('ocr_engine'),
+                                                        memory_budget_mb=memory_budget)
+    try:
+        with _maybe_silenced(not verbose):
+            stats = work_shards(job, processor, source, max_shards, lease)
+    finally:
+        processor.close()
+    click.echo(f"✅ Шардов: {stats['shards']} ({stats['pages']} стр.)  ❌ Ошибок: {stats['failed']}  "
+               f"⏱️ {stats['seconds']}с")
+    if stats['failed']:
+        raise SystemExit(1)
+
+
+@shard_group.command('status')
+@click.argument('job_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--lease', type=float, default=DEFAULT_LEASE_SECONDS, show_default=True,
+              help='Срок аренды шарда в секундах')
+def shard_status_command(job_dir, lease):
+    """Готовность шардов задания"""
+    counts = ShardJob(job_dir).status(lease)
+    click.echo(f"🧩 Шардов: {counts['total']}  ✅ готово: {counts['done']}  ⚙️ в работе: {counts['claimed']}  "
+               f"⚠️ брошено: {counts['stale']}  ⏳ ожидает: {counts['pending']}")
+
+
+@shard_group.command('merge')
+@click.argument('job_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('-o', '--output', required=True, type=click.Path(dir_okay=False), help='Файл результата')
+@click.option('-f', '--format', 'fmt', type=click.Choice(sorted(_OUTPUT_SUFFIXES)), default='markdown',
+              show_default=True, help='Формат вывода')
+def shard_merge_command(job_dir, output, fmt):
+    """Сборка результата документа из готовых шардов с исходной нумерацией страниц"""
+    try:
+        summary = ShardJob(job_dir).merge(output, fmt)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✅ {summary['output_path']}: {summary['pages_written']} стр., {summary['characters']:,} символов, "
+               f"страниц с ошибкой OCR: {summary['page_errors']}")
+
+
+def main():
+    cli()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Колоночная выгрузка корпуса для загрузки в векторную БД
+
+Страницы и фрагменты документов пишутся в Parquet или Arrow IPC группами строк
+(row groups): в памяти держится только текущая группа, а задания эмбеддингов
+читают нужные столбцы корпуса целиком, не разбирая Markdown.
+
+    pages.parquet  - текст страницы с номером, методом и метаданными документа
+    chunks.parquet - фрагменты NPAChunker с метаданными документа
+"""
+
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .engines import get_engine
+from .rag_tools.chunker import NPAChunker
+from .streaming import PageResult
+from .utils.text_stream import iter_lines
+
+EXPORT_FORMATS = ('parquet', 'arrow')
+_FILE_SUFFIXES = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Метаданные документа, повторяемые в каждой строке обеих таблиц
+DOCUMENT_COLUMNS: List[Tuple[str, str]] = [
+    ('document', 'string'),
+    ('source_file', 'string'),
+    ('quality_level', 'string'),
+    ('extraction_method', 'string'),
+    ('confidence', 'float32'),
+]
+
+PAGE_COLUMNS: List[Tuple[str, str]] = DOCUMENT_COLUMNS + [
+    ('page_number', 'int32'),
+    ('page_method', 'string'),
+    ('cache_hit', 'bool'),
+    ('char_count', 'int32'),
+    ('text', 'string'),
+]
+
+CHUNK_COLUMNS: List[Tuple[str, str]] = DOCUMENT_COLUMNS + [
+    ('chunk_id', 'string'),
+    ('chunk_index', 'int32'),
+    ('body', 'string'),
+    ('document_type', 'string'),
+    ('clause', 'string'),
+    ('clause_part', 'int32'),
+    ('char_count', 'int32'),
+    ('token_estimate', 'int32'),
+    ('text', 'string'),
+]
+
+
+def _arrow_schema(columns: List[Tuple[str, str]]):
+    pa = get_engine('pyarrow')
+    types = {'string': pa.string(), 'float32': pa.float32(), 'int32': pa.int32(), 'bool': pa.bool_()}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+class ColumnarTableWriter:
+    """Таблица с фиксированной схемой: строки копятся и сбрасываются группой"""
+
+    def __init__(self, path: str, columns: List[Tuple[str, str]], fmt: str = 'parquet',
+                 row_group_size: int = 10000, compression: str = 'zstd'):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+        self.path = path
+        self.columns = columns
+        self.fmt = fmt
+        self.row_group_size = max(1, row_group_size)
+        self.compression = compression
+        self.schema = _arrow_schema(columns)
+        self.rows_written = 0
+        self.row_groups = 0
+        self._rows: List[Dict] = []
+        self._writer = None
+        self._sink = None
+
+    @property
+    def row_count(self) -> int:
+        """Строк записано и ожидает сброса"""
+        return self.rows_written + len(self._rows)
+
+    def write_row(self, row: Dict):
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Запись накопленных строк одной группой"""
+        if not self._rows:
+            return
+        pd = get_engine('pandas')
+        pa = get_engine('pyarrow')
+
+        frame = pd.DataFrame(self._rows, columns=[name for name, _ in self.columns])
+        table = pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        self._rows = []
+
+        if self._writer is None:
+            self._open()
+        if self.fmt == 'parquet':
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+        self.rows_written += table.num_rows
+        self.row_groups += 1
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if self.fmt == 'parquet':
+            parquet = get_engine('pyarrow_parquet')
+            self._writer = parquet.ParquetWriter(self.path, self.schema, compression=self.compression)
+        else:
+            ipc = get_engine('pyarrow_ipc')
+            self._sink = open(self.path, 'wb')
+            options = ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = ipc.new_file(self._sink, self.schema, options=options)
+
+    def close(self):
+        self.flush()
+        if self._writer is None:
+            # Пустая таблица: файл со схемой, чтобы читатели не различали этот случай
+            self._open()
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CorpusExporter:
+    """
+    Выгрузка документов в две таблицы (страницы и фрагменты) за один проход
+    по страницам каждого документа.
+    """
+
+    def __init__(self, output_dir: str, fmt: str = 'parquet', row_group_size: int = 10000,
+                 chunker: Optional[NPAChunker] = None, compression: str = 'zstd'):
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.chunker = chunker or NPAChunker()
+        suffix = _FILE_SUFFIXES.get(fmt, '')
+        self.pages = ColumnarTableWriter(os.path.join(output_dir, 'pages' + suffix), PAGE_COLUMNS,
+                                         fmt, row_group_size, compression)
+        self.chunks = ColumnarTableWriter(os.path.join(output_dir, 'chunks' + suffix), CHUNK_COLUMNS,
+                                          fmt, row_group_size, compression)
+        self.documents = 0
+
+    def add_document(self, document: str, pages: Iterable[PageResult], metadata: Optional[Dict] = None):
+        """
+        Страницы документа и его фрагменты. metadata: source_file, quality_level,
+        extraction_method, confidence (как у process_file_streaming).
+        """
+        base = _document_row(document, metadata or {})
+
+        def page_lines() -> Iterator[str]:
+            # Строки страниц идут в очистку и разбиение, а сами страницы - в таблицу страниц
+            for page in pages:
+                text = page.text or ''
+                self.pages.write_row(dict(base, page_number=page.page_number, page_method=page.method,
+                                          cache_hit=bool(page.cache_hit), char_count=len(text), text=text))
+                yield f"--- Страница {page.page_number} ---\n"
+                yield from iter_lines(text, keepends=True)
+                yield "\n"
+
+        for chunk in self.chunker.iter_chunks_from_lines(page_lines(), document):
+            self.chunks.write_row(dict(base, chunk_id=chunk.chunk_id, chunk_index=chunk.chunk_index,
+                                       body=chunk.body, document_type=chunk.document_type, clause=chunk.clause,
+                                       clause_part=chunk.clause_part, char_count=chunk.char_count,
+                                       token_estimate=chunk.token_estimate, text=chunk.text))
+        self.documents += 1
+
+    @property
+    def summary(self) -> Dict:
+        return {
+            'documents': self.documents,
+            'pages': self.pages.row_count,
+            'chunks': self.chunks.row_count,
+            'pages_path': self.pages.path,
+            'chunks_path': self.chunks.path
+        }
+
+    def close(self) -> Dict:
+        self.pages.close()
+        self.chunks.close()
+        return self.summary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _document_row(document: str, metadata: Dict) -> Dict:
+    confidence = metadata.get('confidence')
+    return {
+        'document': document,
+        'source_file': metadata.get('source_file') or os.path.basename(document),
+        'quality_level': metadata.get('quality_level'),
+        'extraction_method': metadata.get('extraction_method'),
+        'confidence': float(confidence) if confidence is not None else None,
+    }
+
+
+def read_jsonl_metadata(path: str) -> Dict:
+    """Метаданные документа из первой строки JSONL вывода process_file_streaming"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                return {key: record.get(key) for key, _ in DOCUMENT_COLUMNS[1:]}
+    return {}
+
+
+def iter_jsonl_pages(path: str) -> Iterator[PageResult]:
+    """Страницы из JSONL вывода process_file_streaming (по одной)"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield PageResult(record['page_number'], record.get('text') or '', record.get('method', ''),
+                             bool(record.get('cache_hit')), record.get('error'))
+
+
+def export_jsonl_outputs(documents: Iterable[Tuple[str, str]], output_dir: str, fmt: str = 'parquet',
+                         row_group_size: int = 10000, chunker: Optional[NPAChunker] = None) -> Dict:
+    """
+    Выгрузка результатов `pdf-extract process -f jsonl` в колоночные таблицы.
+    documents: пары (имя документа, путь к JSONL документа).
+    """
+    with CorpusExporter(output_dir, fmt, row_group_size, chunker) as exporter:
+        for document, path in documents:
+            exporter.add_document(document, iter_jsonl_pages(path), read_jsonl_metadata(path))
+    return exporter.summary
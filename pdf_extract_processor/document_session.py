@@ -0,0 +1,74 @@
+"""
+Сессия PDF документа: один fitz.open на весь конвейер обработки
+"""
+
+import fitz
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class PDFDocumentSession:
+    """
+    Открывает PDF один раз и кэширует текст страниц.
+    Используется анализатором качества и экстракторами; страницы рендерятся
+    без кэша (utils.image_buffers.render_page) - каждый рендер нужен один раз.
+    """
+
+    def __init__(self, pdf_path: str, max_cached_texts: int = 16):
+        self.pdf_path = pdf_path
+        self.doc = fitz.open(pdf_path)
+        # Текст нужен повторно только страницам-пробам анализатора: кэш ограничен (LRU),
+        # иначе потоковое извлечение держало бы в памяти текст всего документа
+        self.max_cached_texts = max_cached_texts
+
+        self._text_cache: "OrderedDict[int, str]" = OrderedDict()
+
+    @property
+    def page_count(self) -> int:
+        return self.doc.page_count
+
+    def get_page(self, page_num: int) -> fitz.Page:
+        """Страница документа"""
+        return self.doc[page_num]
+
+    def get_text(self, page_num: int, cache: bool = True) -> str:
+        """
+        Текстовый слой страницы. cache=False - для однократного чтения при
+        обходе документа: уже закэшированный текст используется, новый не сохраняется.
+        """
+        text = self._text_cache.get(page_num)
+        if text is not None:
+            self._text_cache.move_to_end(page_num)
+            return text
+
+        text = self.doc[page_num].get_text()
+        if cache and self.max_cached_texts > 0:
+            self._text_cache[page_num] = text
+            while len(self._text_cache) > self.max_cached_texts:
+                self._text_cache.popitem(last=False)
+        return text
+
+    def close(self):
+        """Закрытие документа и очистка кэша текста"""
+        self._text_cache.clear()
+        if not self.doc.is_closed:
+            self.doc.close()
+
+    def __enter__(self) -> "PDFDocumentSession":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@contextmanager
+def session_scope(pdf_path: str,
+                  session: Optional[PDFDocumentSession] = None) -> Iterator[PDFDocumentSession]:
+    """Переданная сессия или новая, закрываемая по выходу из блока"""
+    if session is not None:
+        yield session
+        return
+
+    with PDFDocumentSession(pdf_path) as own_session:
+        yield own_session
@@ -0,0 +1,100 @@
+"""
+Реестр движков обработки с ленивой загрузкой
+
+Тяжёлые зависимости (OpenCV, Tesseract, EasyOCR, spaCy, ...) импортируются
+при первом обращении, поэтому извлечение текстового слоя загружает только PyMuPDF.
+"""
+
+import importlib
+import importlib.util
+import threading
+from typing import Any, Dict, List
+
+# Имя движка -> импортируемый модуль
+_ENGINE_MODULES: Dict[str, str] = {
+    'numpy': 'numpy',
+    'cv2': 'cv2',
+    'pil': 'PIL.Image',
+    'pil_enhance': 'PIL.ImageEnhance',
+    'pytesseract': 'pytesseract',
+    'tesserocr': 'tesserocr',
+    'easyocr': 'easyocr',
+    'pdfplumber': 'pdfplumber',
+    'spacy': 'spacy',
+    'nltk': 'nltk',
+    'pandas': 'pandas',
+    'pyarrow': 'pyarrow',
+    'pyarrow_parquet': 'pyarrow.parquet',
+    'pyarrow_ipc': 'pyarrow.ipc',
+    'psutil': 'psutil',
+}
+
+# Подсказки по установке для сообщений об ошибке
+_INSTALL_HINTS: Dict[str, str] = {
+    'numpy': 'pip install numpy',
+    'cv2': 'pip install opencv-python',
+    'pil': 'pip install Pillow',
+    'pil_enhance': 'pip install Pillow',
+    'pytesseract': 'pip install pytesseract (и системный пакет tesseract-ocr)',
+    'tesserocr': 'pip install tesserocr (и системные пакеты tesseract-ocr, libtesseract-dev)',
+    'easyocr': 'pip install easyocr',
+    'pdfplumber': 'pip install pdfplumber',
+    'spacy': 'pip install spacy',
+    'nltk': 'pip install nltk',
+    'pandas': 'pip install pandas',
+    'pyarrow': 'pip install pyarrow',
+    'pyarrow_parquet': 'pip install pyarrow',
+    'pyarrow_ipc': 'pip install pyarrow',
+    'psutil': 'pip install psutil',
+}
+
+_loaded: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def register_engine(name: str, module_path: str, install_hint: str = ""):
+    """Регистрация движка (или замена модуля существующего)"""
+    with _lock:
+        _ENGINE_MODULES[name] = module_path
+        if install_hint:
+            _INSTALL_HINTS[name] = install_hint
+        _loaded.pop(name, None)
+
+
+def get_engine(name: str) -> Any:
+    """Модуль движка; импортируется при первом обращении"""
+    engine = _loaded.get(name)
+    if engine is not None:
+        return engine
+
+    if name not in _ENGINE_MODULES:
+        raise KeyError(f"Неизвестный движок: {name}")
+
+    with _lock:
+        if name not in _loaded:
+            try:
+                _loaded[name] = importlib.import_module(_ENGINE_MODULES[name])
+            except ImportError as e:
+                hint = _INSTALL_HINTS.get(name, "")
+                raise ImportError(f"Движок '{name}' недоступен: {e}. {hint}".strip()) from e
+        return _loaded[name]
+
+
+def is_engine_available(name: str) -> bool:
+    """Установлен ли движок (без импорта)"""
+    module_path = _ENGINE_MODULES.get(name)
+    if module_path is None:
+        return False
+    try:
+        return importlib.util.find_spec(module_path) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def loaded_engines() -> List[str]:
+    """Движки, уже загруженные в текущем процессе"""
+    return sorted(_loaded)
+
+
+def registered_engines() -> List[str]:
+    return sorted(_ENGINE_MODULES)
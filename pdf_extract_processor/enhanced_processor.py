@@ -5,17 +5,33 @@
 
 import os
 import fitz
-from PIL import Image
-import pytesseract
-import io
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
+
+from .adaptive_render import AdaptiveRenderPolicy
+from .ocr_engines import get_ocr_engine
+from .streaming import PageResult
+from .utils.image_buffers import render_page, pixmap_to_pil
+from .utils.extraction_cache import ExtractionCache, page_image_key
+
+# Идентификатор OCR конвейера - входит в ключ постраничного кэша
+_OCR_PIPELINE = 'enhanced:plain'
 
 class EnhancedPDFProcessor:
     """Улучшенный процессор с автоматическим определением OCR"""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, adaptive_dpi: bool = False,
+                 ocr_engine: Optional[str] = None):
         self.name = "EnhancedPDFProcessor"
         self.ocr_threshold = 50  # Минимум символов для считания текста извлеченным
+        self.ocr_settings = {'scale': 1.0, 'lang': 'rus+eng', 'pipeline': _OCR_PIPELINE}
+
+        # Постраничный кэш OCR (каталог или переменная PDF_EXTRACT_CACHE_DIR)
+        cache_dir = cache_dir or os.environ.get('PDF_EXTRACT_CACHE_DIR')
+        self.page_cache = ExtractionCache(cache_dir) if cache_dir else None
+        # Масштаб рендера OCR по оценке высоты текста вместо фиксированного 1x
+        self.render_policy = AdaptiveRenderPolicy() if adaptive_dpi else None
+        # Движок OCR: auto (tesserocr при наличии), tesserocr или pytesseract
+        self.ocr_engine = ocr_engine
         
     def diagnose_pdf(self, pdf_path: str) -> Dict:
         """Диагностика PDF файла для определения метода обработки"""
@@ -72,17 +88,8 @@ class EnhancedPDFProcessor:
     def extract_direct_text(self, pdf_path: str, diagnosis: Dict) -> Dict:
         """Прямое извлечение текста"""
         try:
-            doc = fitz.open(pdf_path)
-            content_parts = []
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                
-                if text.strip():
-                    content_parts.append(f"\n## Страница {page_num + 1}\n\n{text}")
-            
-            doc.close()
+            content_parts = [f"\n## Страница {page.page_number}\n\n{page.text}"
+                             for page in self.iter_direct_text(pdf_path) if page.text.strip()]
             
             result_content = "\n".join(content_parts)
             
@@ -98,11 +105,18 @@ class EnhancedPDFProcessor:
         except Exception as e:
             return {'error': str(e), 'method': 'direct_text_extraction'}
     
+    def iter_direct_text(self, pdf_path: str) -> Iterator[PageResult]:
+        """Постраничная выдача текстового слоя без накопления документа"""
+        with fitz.open(pdf_path) as doc:
+            for page_num in range(len(doc)):
+                yield PageResult(page_num + 1, doc.load_page(page_num).get_text(), 'text_layer')
+    
     def extract_with_ocr(self, pdf_path: str, diagnosis: Dict) -> Dict:
         """OCR извлечение для сканированных PDF"""
         try:
             doc = fitz.open(pdf_path)
             content_parts = []
+            cache_stats = {'hits': 0, 'misses': 0}
             
             # Ограничиваем количество страниц для OCR (производительность)
             max_pages = min(len(doc), 50)
@@ -118,12 +132,11 @@ class EnhancedPDFProcessor:
                 
                 # Если мало текста - используем OCR
                 try:
-                    pix = page.get_pixmap()
-                    img_data = pix.tobytes("png")
-                    image = Image.open(io.BytesIO(img_data))
-                    
-                    # OCR с русским и английским языками
-                    ocr_text = pytesseract.image_to_string(image, lang='rus+eng')
+                    scale = self.ocr_settings['scale']
+                    if self.render_policy is not None:
+                        scale = self.render_policy.choose_scale(page, scale)
+                    pix = render_page(page, scale)
+                    ocr_text = self._ocr_pixmap_cached(pix, cache_stats, page, scale)
                     
                     if ocr_text.strip():
                         content_parts.append(f"\n## Страница {page_num + 1} (OCR)\n\n{ocr_text}")
@@ -141,12 +154,43 @@ class EnhancedPDFProcessor:
                 'confidence': 0.85,
                 'content': result_content,
                 'pages_processed': len(content_parts),
-                'characters': len(result_content)
+                'characters': len(result_content),
+                'page_cache': cache_stats
             }
             
         except Exception as e:
             return {'error': str(e), 'method': 'ocr_extraction'}
 
+    def _ocr_pixmap_cached(self, pix, cache_stats: Dict, page: Optional[fitz.Page] = None,
+                           scale: Optional[float] = None) -> str:
+        """OCR рендера страницы; повторно встреченные страницы берутся из кэша"""
+        settings = self.ocr_settings
+        if self.render_policy is not None:
+            settings = dict(settings, scale=scale, adaptive=self.render_policy.settings)
+
+        # OCR с русским и английским языками
+        engine = get_ocr_engine(self.ocr_engine)
+        page_key = None
+        if self.page_cache is not None:
+            page_key = page_image_key(pix, dict(settings, engine=engine.version))
+            cached_text = self.page_cache.get_page_text(page_key)
+            if cached_text is not None:
+                cache_stats['hits'] += 1
+                return cached_text
+            cache_stats['misses'] += 1
+
+        if self.render_policy is not None and page is not None:
+            def recognize(render) -> Tuple[str, float]:
+                return engine.text_with_confidence(pixmap_to_pil(render), self.ocr_settings['lang'])
+
+            ocr_text, _, _ = self.render_policy.recognize(page, pix, scale, recognize)
+        else:
+            ocr_text = engine.image_to_string(pixmap_to_pil(pix), self.ocr_settings['lang'])
+
+        if page_key is not None:
+            self.page_cache.put_page_text(page_key, ocr_text)
+        return ocr_text
+
 def diagnose_multiple_pdfs(pdf_paths: List[str]) -> Dict:
     """Диагностика множественных PDF файлов"""
     processor = EnhancedPDFProcessor()
@@ -3,21 +3,207 @@
 Интеграция всех улучшений из ноутбука
 """
 
+import contextlib
+import json
+import logging
 import os
 import re
-import numpy as np
-from PIL import Image, ImageEnhance
-import pytesseract
+import tempfile
+import time
 import fitz
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from io import BytesIO
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .main_processor import AdvancedPDFExtractProcessor, QualityLevel
+from .document_session import PDFDocumentSession, session_scope
+from .engines import get_engine
+from .streaming import PageResult, open_page_writer
+from .page_router import PageRouter, ROUTE_OCR, ROUTE_TEXT, summarize_routes
+from .adaptive_render import AdaptiveRenderPolicy
+from .columnar_export import CorpusExporter
+from .near_duplicates import DocumentFingerprint, DuplicateMatch, NearDuplicateDetector
+from .metrics import STAGE_LABELS, Timing, stage_timer
+from .profiling import profiled
+from .memory_budget import MemoryBudget
+from .ocr_engines import OCREngine, get_ocr_engine
+from .rag_tools.chunker import NPAChunker
+from .utils.image_buffers import render_page, pixmap_to_pil
+from .utils.extraction_cache import ExtractionCache, file_content_hash, page_image_key
+from .utils.multi_replace import MultiReplacer, sequential_replacers
+
+logger = logging.getLogger(__name__)
+
+# Режимы обработки почти дубликатов (None - без проверки)
+DEDUP_MODES = (None, 'skip', 'link')
+
+# Страниц в окне маршрутизации гибридного режима (не меньше 8 на процесс OCR)
+_HYBRID_WINDOW = 32
+
+# Идентификатор предобработки OCR - входит в ключ постраничного кэша
+_OCR_PIPELINE = 'improved:contrast2.2:sharpness2.0'
+
+# Версия извлечения текста документа (сборка страниц, лимиты) - входит в ключ кэша текста
+_EXTRACTION_VERSION = 2
+
+# Пробельные символы, кроме перевода строки, которые нужно заменить одним пробелом
+# (одиночные пробелы не трогаются - так очистка быстрее)
+_SPACES_RE = re.compile(r'[^\S\n]{2,}|[^\S \n]')
+
+# Состояние процесса-воркера параллельного OCR: кэш и движок живут всё время пула,
+# документ открывается заново только при смене файла
+_WORKER_CACHE = None
+_WORKER_ENGINE = None
+_WORKER_DOC = None
+_WORKER_DOC_KEY = None
+
+
+def _init_ocr_worker(cache_dir: Optional[str] = None, cache_max_mb: float = 512,
+                     engine_name: Optional[str] = None):
+    """Инициализация воркера: кэш и движок OCR создаются один раз на процесс"""
+    global _WORKER_CACHE, _WORKER_ENGINE
+    _WORKER_CACHE = ExtractionCache(cache_dir, cache_max_mb) if cache_dir else None
+    _WORKER_ENGINE = get_ocr_engine(engine_name)
+
+
+def _document_key(file_path: str) -> Tuple[str, int, int]:
+    """Идентификатор версии файла: путь, время изменения и размер"""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+
+def _worker_document(doc_key: Tuple[str, int, int]) -> fitz.Document:
+    """Документ задачи в процессе-воркере"""
+    global _WORKER_DOC, _WORKER_DOC_KEY
+    if doc_key != _WORKER_DOC_KEY:
+        if _WORKER_DOC is not None:
+            _WORKER_DOC.close()
+        _WORKER_DOC = fitz.open(doc_key[0])
+        _WORKER_DOC_KEY = doc_key
+    return _WORKER_DOC
+
+
+def _prepare_ocr_image(pix):
+    """Предобработка рендера страницы перед OCR"""
+    ImageEnhance = get_engine('pil_enhance')
+
+    # Промежуточные копии освобождаются сразу: живут не больше двух изображений страницы
+    image = ImageEnhance.Contrast(pixmap_to_pil(pix)).enhance(2.2)
+    return ImageEnhance.Sharpness(image).enhance(2.0)
+
+
+def _ocr_pixmap(pix, lang: str, config: str, engine: OCREngine) -> str:
+    """Предобработка и OCR готового рендера страницы"""
+    return engine.image_to_string(_prepare_ocr_image(pix), lang, config)
+
+
+def _ocr_pixmap_cached(pix, settings: Dict, cache: Optional[ExtractionCache],
+                       engine: OCREngine) -> Tuple[str, bool]:
+    """OCR рендера через постраничный кэш; второй элемент - попадание в кэш"""
+    if cache is None:
+        return _ocr_pixmap(pix, settings['lang'], settings['config'], engine), False
+
+    page_key = page_image_key(pix, dict(settings, pipeline=_OCR_PIPELINE, engine=engine.version))
+    text = cache.get_page_text(page_key)
+    if text is not None:
+        return text, True
+
+    text = _ocr_pixmap(pix, settings['lang'], settings['config'], engine)
+    cache.put_page_text(page_key, text)
+    return text, False
+
+
+def _ocr_page_adaptive(page: fitz.Page, settings: Dict, cache: Optional[ExtractionCache],
+                       engine: OCREngine, timings: Optional[Dict[str, Timing]] = None,
+                       budget: Optional[MemoryBudget] = None) -> Tuple[str, bool, float, bool]:
+    """OCR страницы в масштабе по оценке высоты текста, с эскалацией при низкой уверенности"""
+    policy = AdaptiveRenderPolicy(**settings['adaptive'])
+    gray = settings.get('gray', False)
+    with stage_timer(timings, 'render'):
+        scale = policy.choose_scale(page, settings['scale'])
+        if budget is not None:
+            scale = budget.fit_scale(page, scale, gray)
+            # Повторный рендер делается при живом первом - его масштаб тоже ограничен бюджетом
+            policy.max_scale = max(scale, budget.scale_cap(page, policy.max_scale, gray))
+        pix = render_page(page, scale, gray)
+
+    with stage_timer(timings, 'ocr'):
+        page_key = None
+        if cache is not None:
+            # Масштаб определяется рендером, настройки адаптивного режима входят в ключ
+            page_key = page_image_key(pix, dict(settings, scale=scale, pipeline=_OCR_PIPELINE,
+                                                engine=engine.version))
+            text = cache.get_page_text(page_key)
+            if text is not None:
+                return text, True, scale, False
+
+        def recognize(render) -> Tuple[str, float]:
+            return engine.text_with_confidence(_prepare_ocr_image(render), settings['lang'], settings['config'])
+
+        # Повторный рендер при эскалации учитывается в стадии OCR
+        text, final_scale, escalated = policy.recognize(page, pix, scale, recognize, gray)
+    if page_key is not None:
+        cache.put_page_text(page_key, text)
+    return text, False, final_scale, escalated
+
+
+def _ocr_page(page: fitz.Page, settings: Dict, cache: Optional[ExtractionCache],
+              engine: OCREngine, timings: Optional[Dict[str, Timing]] = None,
+              budget: Optional[MemoryBudget] = None) -> Tuple[str, bool, float, bool]:
+    """
+    OCR страницы: (текст, попадание в кэш, масштаб рендера, была ли эскалация).
+    timings - словарь для замеров стадий render и ocr.
+    budget - бюджет памяти: масштаб рендера снижается под остаток бюджета.
+    """
+    if settings.get('adaptive'):
+        return _ocr_page_adaptive(page, settings, cache, engine, timings, budget)
+
+    # Высокое разрешение
+    with stage_timer(timings, 'render'):
+        scale = settings['scale'] if budget is None else budget.fit_scale(page, settings['scale'])
+        pix = render_page(page, scale, settings.get('gray', False))
+    with stage_timer(timings, 'ocr'):
+        text, cache_hit = _ocr_pixmap_cached(pix, settings, cache, engine)
+    return text, cache_hit, scale, False
+
+
+def _ocr_page_worker(task: Tuple[Tuple[str, int, int], int, Dict, Optional[float]]
+                     ) -> Tuple[int, Optional[str], bool, float, bool, Dict, Optional[Dict]]:
+    """
+    OCR страницы в процессе-воркере; None означает ошибку. Предпоследний элемент -
+    замеры стадий, последний - расход памяти, если задача получила долю бюджета.
+    """
+    doc_key, page_num, settings, budget_mb = task
+    timings: Dict[str, Timing] = {}
+    budget = MemoryBudget(budget_mb) if budget_mb else None
+    try:
+        page = _worker_document(doc_key)[page_num]
+        result = (page_num,) + _ocr_page(page, settings, _WORKER_CACHE, _WORKER_ENGINE, timings, budget)
+    except Exception:
+        result = page_num, None, False, settings['scale'], False
+    if budget is None:
+        return result + (timings, None)
+    budget.page_done()
+    return result + (timings, budget.stats())
+
+
+def _format_page_text(page_num: int, text: str) -> str:
+    """Фрагмент текста страницы в формате процессора"""
+    return f"\\n--- Страница {page_num + 1} ---\\n{text}"
 
 class ImprovedTextCorrector:
     """Улучшенная коррекция OCR ошибок"""
-    
-    def __init__(self):
+
+    # Исправления дат: применяются после словарей, чтобы исправить и даты, где 'О' появилась
+    # после символьной замены (2©11 → 2О11 → 2011)
+    date_fixes = [
+        (r'2О(\d{2})', r'20\1'),  # 2О11 → 2011
+        (r'(\d)О(\d)', r'\g<1>0\2'),
+    ]
+
+    def __init__(self, dictionary_paths: Optional[List[str]] = None):
         self.word_fixes = {
             'МИНИСТЕРСТВО': ['МИНЙСТЕРСТВО', 'МИИИСТЕРСТВО', 'МИНИСТЕРСТВ0'],
             'ЗДРАВООХРАНЕНИЯ': ['ЗДРАВОХРАНЕНИЯ', 'ЗДРАВООХРАНЕН1Я'],
@@ -32,29 +218,62 @@ class ImprovedTextCorrector:
             '2О': '20',  # КРИТИЧНО: 2О11 → 2011
             '6О': '60', '1О': '10', '3О': '30',
         }
+
+        # Дополнительные словари: аргумент или пути через os.pathsep в PDF_EXTRACT_OCR_CORRECTIONS
+        if dictionary_paths is None:
+            env_paths = os.environ.get('PDF_EXTRACT_OCR_CORRECTIONS', '')
+            dictionary_paths = [path for path in env_paths.split(os.pathsep) if path]
+        for path in dictionary_paths:
+            self.load_dictionary(path)
+
+        self._replacers = None
+
+    def load_dictionary(self, path: str):
+        """
+        Загрузка словаря исправлений:
+        JSON {"word_fixes": {верно: [ошибки]}, "char_fixes": {ошибка: верно}}
+        или TSV "ошибка<TAB>исправление" (строки с # - комментарии).
+        """
+        path = os.path.expanduser(path)
+        with open(path, encoding='utf-8') as f:
+            if path.lower().endswith('.json'):
+                data = json.load(f)
+                for correct, errors in data.get('word_fixes', {}).items():
+                    self.word_fixes.setdefault(correct, []).extend(errors)
+                self.char_fixes.update(data.get('char_fixes', {}))
+            else:
+                for line in f:
+                    line = line.rstrip('\n')
+                    if not line.strip() or line.startswith('#'):
+                        continue
+                    wrong, _, right = line.partition('\t')
+                    self.char_fixes[wrong] = right
+        self._replacers = None
+
+    def _get_replacers(self) -> List[MultiReplacer]:
+        """
+        Проходы замен (компилируются один раз): словарные, затем символьные - с тем же
+        результатом, что прежние последовательные text.replace, включая цепочки
+        (ПРЙКАЗ© → ПРИКАЗ© → ПРИКАЗ); затем правила дат, каждое отдельным проходом.
+        """
+        if self._replacers is None:
+            ordered = [(error, correct) for correct, errors in self.word_fixes.items() for error in errors]
+            ordered += list(self.char_fixes.items())
+            self._replacers = sequential_replacers(ordered) + [MultiReplacer({}, [rule]) for rule in self.date_fixes]
+        return self._replacers
     
     def improved_fix(self, text: str) -> str:
         """Применить все исправления"""
         if not text or not text.strip():
             return text
         
+        # Словарные и символьные замены, затем даты
         result = text
+        for replacer in self._get_replacers():
+            result = replacer.apply(result)
         
-        # Исправления дат
-        result = re.sub(r'2О(\\d{2})', r'20\\1', result)
-        result = re.sub(r'(\\d)О(\\d)', r'\\g<1>0\\2', result)
-        
-        # Словарные замены
-        for correct, errors in self.word_fixes.items():
-            for error in errors:
-                result = result.replace(error, correct)
-        
-        # Символьные замены
-        for wrong, right in self.char_fixes.items():
-            result = result.replace(wrong, right)
-        
-        # Очистка
-        result = re.sub(r'\\s+', ' ', result)
+        # Очистка: пробелы и табуляции схлопываются, переводы строк (абзацы, статьи) сохраняются
+        result = _SPACES_RE.sub(' ', result)
         return result.strip()
 
 class ImprovedAdvancedPDFExtractProcessor(AdvancedPDFExtractProcessor):
@@ -62,99 +281,703 @@ class ImprovedAdvancedPDFExtractProcessor(AdvancedPDFExtractProcessor):
     УЛУЧШЕННАЯ версия процессора с исправленной логикой
     """
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, ocr_workers: int = 1, cache_dir: Optional[str] = None, cache_max_mb: float = 512,
+                 hybrid_routing: bool = False, adaptive_dpi: bool = False, ocr_engine: Optional[str] = None,
+                 dedup: Optional[str] = None, profile_dir: Optional[str] = None, profile_top: int = 5,
+                 memory_budget_mb: Optional[float] = None, profile_memory: bool = False):
+        super().__init__(profile_dir, profile_top, profile_memory)
         self.text_corrector = ImprovedTextCorrector()
+
+        # Настройки OCR
+        self.ocr_settings = {
+            'scale': 2.5,
+            'lang': 'rus+eng',
+            'config': '--psm 6 --oem 3'
+        }
+        # Лимит страниц последовательного OCR при извлечении в память (process_single_file_advanced);
+        # потоковая обработка и CLI распознают все страницы. None - без лимита
+        self.max_ocr_pages: Optional[int] = 10
+        # Число процессов OCR: 1 - последовательно, 0 - по числу ядер
+        self.ocr_workers = ocr_workers if ocr_workers > 0 else (os.cpu_count() or 1)
+        # Движок OCR: auto (tesserocr при наличии), tesserocr или pytesseract
+        self.ocr_engine = ocr_engine
+        # Пул параллельного OCR создаётся при первом использовании и живёт между документами
+        self._ocr_pool = None
+
+        # Кэш извлечения включается каталогом или переменной PDF_EXTRACT_CACHE_DIR
+        cache_dir = cache_dir or os.environ.get('PDF_EXTRACT_CACHE_DIR')
+        self.extraction_cache = ExtractionCache(cache_dir, cache_max_mb) if cache_dir else None
+        # Попадания в постраничный кэш OCR для последнего документа
+        self.page_cache_stats = {'hits': 0, 'misses': 0}
+
+        # Гибридный режим: метод (текстовый слой / OCR) выбирается для каждой страницы
+        self.hybrid_routing = hybrid_routing
+        self.page_router = PageRouter()
+        self.last_page_routes = []
+
+        # Адаптивный масштаб рендера OCR вместо фиксированного ocr_settings['scale']
+        self.render_policy = AdaptiveRenderPolicy() if adaptive_dpi else None
+        self.render_stats = {'pages': 0, 'escalated': 0, 'scale_sum': 0.0}
+
+        # Почти дубликаты: skip - пропустить извлечение, link - взять текст оригинала
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"Неизвестный режим дубликатов: {dedup}")
+        self.dedup_mode = dedup
+        self.duplicate_detector = NearDuplicateDetector() if dedup else None
+        self.dedup_stats = {'checked': 0, 'duplicates': 0, 'probe_seconds': 0.0, 'ocr_seconds_saved': 0.0}
+        # Оригиналы: время извлечения на страницу и (в режиме link) вердикт и путь к тексту
+        self._dedup_originals: Dict[str, Dict] = {}
+        # Исправленные тексты оригиналов режима link лежат на диске, а не в памяти
+        self._dedup_dir: Optional[tempfile.TemporaryDirectory] = None
+
+        # Бюджет памяти (МБ RSS вместе с процессами OCR) или переменная PDF_EXTRACT_MEMORY_BUDGET_MB
+        self.memory_budget = MemoryBudget(memory_budget_mb) if memory_budget_mb else MemoryBudget.from_env()
+        self.memory_stats = {'pages': 0, 'downscaled': 0, 'throttled': 0, 'peak_rss_mb': 0.0}
+
         print("✅ Улучшенный процессор готов")
     
+    @profiled()
     def process_single_file_advanced(self, file_path: str) -> str:
         """ИСПРАВЛЕННАЯ обработка с правильной стратегией"""
+        document = self.metrics.begin_document(file_path)
         try:
-            print("🔍 Анализ качества...")
-            quality_level, confidence, method = self.quality_analyzer.analyze_pdf_quality(file_path)
-            
-            print(f"   📊 Качество: {quality_level.value}")
-            print(f"   📈 Уверенность: {confidence:.3f}")
-            print(f"   🎯 Метод: {method}")
-            
-            # ИСПРАВЛЕННАЯ ЛОГИКА - используем рекомендацию!
-            if method == "text_extraction":
-                extracted_text = self._extract_text_simple(file_path)
-            elif method in ["ocr_simple", "ocr_enhanced", "ocr_advanced"]:
-                extracted_text = self._extract_text_ocr_improved(file_path)
-            else:
-                extracted_text = self._extract_text_ocr_improved(file_path)
+            fingerprint, duplicate = self._check_duplicate(file_path)
+            result = self._duplicate_result(file_path, fingerprint, duplicate) if duplicate else None
+            if result is not None:
+                self._finish_document('duplicate', fingerprint.pages)
+                return result
+
+            start = time.perf_counter()
+            quality_level, confidence, method, extracted_text = self._analyze_and_extract_cached(file_path)
             
             # Применяем коррекцию
             if extracted_text:
-                corrected_text = self.text_corrector.improved_fix(extracted_text)
-                return self._create_improved_markdown(corrected_text, file_path, quality_level, confidence, method)
+                document.raw_characters = len(extracted_text)
+                with self.metrics.stage('correct'):
+                    corrected_text = self.text_corrector.improved_fix(extracted_text)
+                # Дальше нужен только исправленный текст: в памяти одна копия документа
+                extracted_text = None
+                self._register_original(file_path, fingerprint, time.perf_counter() - start,
+                                        (quality_level, confidence, method, corrected_text))
+                with self.metrics.stage('markdown'):
+                    markdown = self._create_improved_markdown(corrected_text, file_path, quality_level,
+                                                              confidence, method)
+                self._finish_document('success', corrected_text.count('--- Страница'), len(corrected_text),
+                                      confidence, method)
+                return markdown
             else:
+                self._finish_document('error')
                 return self._create_error_result(file_path, "Не удалось извлечь текст")
                 
         except Exception as e:
+            self._finish_document('error')
             return self._create_error_result(file_path, f"Ошибка: {e}")
+
+    def fingerprint_document(self, file_path: str,
+                             detector: Optional[NearDuplicateDetector] = None) -> Optional[DocumentFingerprint]:
+        """
+        Отпечаток для поиска почти дубликатов: текстовый слой страниц-проб,
+        для страниц без него - OCR с настройками извлечения. При включённом кэше
+        распознанные страницы затем берутся из него при извлечении оригинала.
+        Сам по себе не профилируется: пробы не документы и не должны попадать
+        в список самых медленных.
+        """
+        detector = detector or self.duplicate_detector or NearDuplicateDetector()
+        with PDFDocumentSession(file_path) as session:
+            settings = self._ocr_task_settings()
+            engine = None
+
+            def ocr_page(page_num: int) -> str:
+                nonlocal engine
+                engine = engine or get_ocr_engine(self.ocr_engine)
+                try:
+                    return _ocr_page(session.get_page(page_num), settings, self.extraction_cache, engine)[0]
+                except Exception:
+                    return ""
+
+            return detector.fingerprint(session, ocr_page)
+
+    def _check_duplicate(self, file_path: str) -> Tuple[Optional[DocumentFingerprint], Optional[DuplicateMatch]]:
+        """Отпечаток документа и найденный оригинал (если включён поиск дубликатов)"""
+        if self.duplicate_detector is None:
+            return None, None
+
+        start = time.perf_counter()
+        with self.metrics.stage('dedup'), self._profile_section('fingerprint_document'):
+            fingerprint = self.fingerprint_document(file_path)
+        self.dedup_stats['probe_seconds'] += time.perf_counter() - start
+        # Документ с текстовым слоем извлекается без OCR: он только станет оригиналом
+        if fingerprint is None or fingerprint.text_layer:
+            return fingerprint, None
+        self.dedup_stats['checked'] += 1
+        return fingerprint, self.duplicate_detector.find(fingerprint)
+
+    def _profile_section(self, name: str):
+        """Секция профиля текущего документа (вне профилируемого документа - ничего)"""
+        return self.profiler.section(name) if self.profiler is not None else contextlib.nullcontext()
+
+    def _register_original(self, file_path: str, fingerprint: Optional[DocumentFingerprint],
+                           seconds: float, result: Tuple):
+        """Успешно извлечённый документ становится оригиналом для следующих копий"""
+        if fingerprint is None:
+            return
+        quality_level, confidence, method, text = result
+        text_path = None
+        if self.dedup_mode == 'link':
+            try:
+                text_path = self._spill_original_text(text)
+            except OSError as e:
+                # Без сохранённого текста копии документа извлекаются сами
+                logger.warning(f"Текст оригинала {file_path} не сохранён: {e}")
+                return
+        self.duplicate_detector.add(file_path, fingerprint)
+        self._dedup_originals[file_path] = {
+            # Время OCR на страницу; текстовый слой OCR не требует
+            'ocr_seconds_per_page': 0.0 if method == "text_extraction" else seconds / max(1, fingerprint.pages),
+            'result': (quality_level, confidence, method, text_path) if text_path else None
+        }
+
+    def _spill_original_text(self, text: str) -> str:
+        """Исправленный текст оригинала во временном каталоге процессора; возвращает путь"""
+        if self._dedup_dir is None:
+            self._dedup_dir = tempfile.TemporaryDirectory(prefix='pdf_extract_dedup_')
+        fd, path = tempfile.mkstemp(suffix='.txt', dir=self._dedup_dir.name)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def _duplicate_result(self, file_path: str, fingerprint: DocumentFingerprint, duplicate: DuplicateMatch) -> str:
+        """
+        Результат почти дубликата без извлечения: ссылка на оригинал или его текст.
+        None - текст оригинала недоступен, дубликат извлекается сам.
+        """
+        original = self._dedup_originals[duplicate.original]
+        text = None
+        if self.dedup_mode == 'link':
+            quality_level, confidence, method, text_path = original['result']
+            try:
+                with open(text_path, encoding='utf-8') as f:
+                    text = f.read()
+            except OSError as e:
+                logger.warning(f"Текст оригинала {duplicate.original} недоступен: {e}")
+                return None
+
+        saved = original['ocr_seconds_per_page'] * fingerprint.pages
+        self.dedup_stats['duplicates'] += 1
+        self.dedup_stats['ocr_seconds_saved'] += saved
+
+        print(f"🔁 Почти дубликат {os.path.basename(duplicate.original)} "
+              f"(совпало страниц: {duplicate.matched_pages}, сходство {duplicate.similarity:.2f})")
+        print(f"   ⏱️ Извлечение пропущено, сэкономлено ~{saved:.1f}с OCR")
+
+        if text is not None:
+            return self._create_improved_markdown(text, file_path, quality_level, confidence, method, duplicate)
+
+        filename = os.path.basename(file_path)
+        processing_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return f"""# Почти дубликат
+
+**Файл:** {filename}
+**Оригинал:** {os.path.basename(duplicate.original)}
+**Сходство:** {duplicate.similarity:.3f}
+**Дата:** {processing_date}
+"""
+
+    def dedup_report(self) -> Dict:
+        """Итоги поиска дубликатов: сэкономленное время OCR за вычетом проверки"""
+        stats = dict(self.dedup_stats)
+        stats['net_seconds_saved'] = stats['ocr_seconds_saved'] - stats['probe_seconds']
+        return {key: round(value, 1) if isinstance(value, float) else value for key, value in stats.items()}
+
+    def _print_summary(self, results: Dict, total_time: float):
+        super()._print_summary(results, total_time)
+        if self.duplicate_detector is not None:
+            report = self.dedup_report()
+            print(f"🔁 Почти дубликатов: {report['duplicates']}/{report['checked']}, "
+                  f"сэкономлено OCR ~{report['ocr_seconds_saved']}с (проверка {report['probe_seconds']}с)")
+
+    def _analyze_and_extract(self, file_path: str) -> Tuple[QualityLevel, float, str, str]:
+        """Анализ качества и извлечение текста рекомендованным методом"""
+        # Документ открывается один раз для анализа и извлечения
+        with PDFDocumentSession(file_path) as session:
+            print("🔍 Анализ качества...")
+            quality_level, confidence, method = self._analyze(file_path, session)
+
+            print(f"   📊 Качество: {quality_level.value}")
+            print(f"   📈 Уверенность: {confidence:.3f}")
+            print(f"   🎯 Метод: {method}")
+
+            # ИСПРАВЛЕННАЯ ЛОГИКА - используем рекомендацию!
+            if method == "hybrid":
+                extracted_text = self._extract_text_hybrid(file_path, session)
+            elif method == "text_extraction":
+                extracted_text = self._extract_text_simple(file_path, session)
+            elif method in ["ocr_simple", "ocr_enhanced", "ocr_advanced"]:
+                extracted_text = self._extract_text_ocr_improved(file_path, session)
+            else:
+                extracted_text = self._extract_text_ocr_improved(file_path, session)
+
+        return quality_level, confidence, method, extracted_text
+
+    @profiled()
+    def _analyze(self, file_path: str, session: PDFDocumentSession) -> Tuple[QualityLevel, float, str]:
+        """Вердикт анализатора; в гибридном режиме метод выбирается постранично"""
+        with self.metrics.stage('analyze'):
+            quality_level, confidence, method = self.quality_analyzer.analyze_pdf_quality(file_path, session)
+        if self.hybrid_routing:
+            method = "hybrid"
+        return quality_level, confidence, method
+
+    def _analyze_and_extract_cached(self, file_path: str) -> Tuple[QualityLevel, float, str, str]:
+        """Анализ и извлечение через кэш по содержимому файла"""
+        self.page_cache_stats = {'hits': 0, 'misses': 0}
+        self.last_page_routes = []
+        if self.extraction_cache is None:
+            return self._analyze_and_extract(file_path)
+
+        file_hash = file_content_hash(file_path)
+        verdict = self.extraction_cache.get_verdict(file_hash, self._analyzer_settings())
+        if verdict is not None:
+            level_value, confidence, method = verdict
+            cached_text = self.extraction_cache.get_text(file_hash, method, self._extraction_settings(method))
+            if cached_text is not None:
+                quality_level = QualityLevel(level_value)
+                print("⚡ Результат взят из кэша извлечения")
+                print(f"   📊 Качество: {quality_level.value}")
+                print(f"   🎯 Метод: {method}")
+                return quality_level, confidence, method, cached_text
+
+        quality_level, confidence, method, extracted_text = self._analyze_and_extract(file_path)
+
+        # Пустой результат не кэшируем - он мог быть следствием временной ошибки
+        if extracted_text:
+            self._store_verdict(file_hash, (quality_level, confidence, method))
+            self.extraction_cache.put_text(file_hash, method, self._extraction_settings(method), extracted_text)
+
+        return quality_level, confidence, method, extracted_text
+
+    def _analyze_cached(self, file_path: str, session: PDFDocumentSession,
+                        file_hash: Optional[str]) -> Tuple[QualityLevel, float, str]:
+        """Вердикт из кэша (file_hash - хэш содержимого; None - кэш выключен) или анализ"""
+        if file_hash is not None:
+            verdict = self.extraction_cache.get_verdict(file_hash, self._analyzer_settings())
+            if verdict is not None:
+                level_value, confidence, method = verdict
+                print("⚡ Вердикт анализатора взят из кэша")
+                return QualityLevel(level_value), confidence, method
+        return self._analyze(file_path, session)
+
+    def _store_verdict(self, file_hash: Optional[str], verdict: Tuple[QualityLevel, float, str]):
+        if file_hash is not None:
+            quality_level, confidence, method = verdict
+            self.extraction_cache.put_verdict(file_hash, self._analyzer_settings(), quality_level.value,
+                                              confidence, method)
+
+    def _analyzer_settings(self) -> Dict:
+        """Настройки и версия анализатора, от которых зависит вердикт"""
+        return {'analyzer': self.quality_analyzer.settings, 'hybrid_routing': self.hybrid_routing}
+
+    def _extraction_settings(self, method: str) -> dict:
+        """Настройки, от которых зависит результат метода извлечения"""
+        if method == "text_extraction":
+            return {'version': _EXTRACTION_VERSION}
+        # Текст OCR зависит и от движка с версией Tesseract
+        engine = get_ocr_engine(self.ocr_engine).version
+        if method == "hybrid":
+            return dict(self._ocr_task_settings(), router=self.page_router.settings, max_pages=None,
+                        engine=engine, version=_EXTRACTION_VERSION)
+        # Параллельный режим распознаёт все страницы (кэш текста - только у извлечения в память)
+        max_pages = None if self.ocr_workers > 1 else self.max_ocr_pages
+        return dict(self._ocr_task_settings(), max_pages=max_pages, engine=engine, version=_EXTRACTION_VERSION)
+
+    def _ocr_task_settings(self) -> Dict:
+        """Настройки OCR страницы, передаваемые в воркеры"""
+        settings = self.ocr_settings
+        if self.render_policy is not None:
+            settings = dict(settings, adaptive=self.render_policy.settings)
+        if self.memory_budget is not None:
+            # Рендер в оттенках серого втрое меньше; масштаб может снижаться под бюджет
+            settings = dict(settings, gray=True, memory_budget_mb=self.memory_budget.limit_mb)
+        return settings
     
-    def _extract_text_simple(self, file_path: str) -> str:
+    def iter_pages(self, file_path: str, method: Optional[str] = None) -> Iterator[PageResult]:
+        """Постраничное извлечение: страницы выдаются по мере готовности"""
+        with PDFDocumentSession(file_path) as session:
+            if method is None:
+                _, _, method = self._analyze(file_path, session)
+            yield from self._iter_pages_by_method(file_path, session, method)
+
+    @profiled()
+    def process_file_streaming(self, file_path: str, output_path: str, fmt: str = 'markdown') -> Dict:
+        """
+        Извлечение с коррекцией и записью страниц в файл по мере готовности.
+        Память не растёт с длиной документа. Формат: markdown или jsonl.
+        В результате - замеры стадий документа (metrics).
+        Из кэша извлечения здесь берутся вердикт анализатора и OCR отдельных страниц;
+        текст документа целиком не кэшируется - для этого его пришлось бы держать в памяти.
+        """
+        self.metrics.begin_document(file_path)
+        file_hash = file_content_hash(file_path) if self.extraction_cache is not None else None
+        try:
+            with PDFDocumentSession(file_path) as session:
+                quality_level, confidence, method = self._analyze_cached(file_path, session, file_hash)
+                metadata = {
+                    'source_file': os.path.basename(file_path),
+                    'quality_level': quality_level.value,
+                    'confidence': round(confidence, 3),
+                    'extraction_method': method
+                }
+
+                with open_page_writer(output_path, fmt, metadata) as writer:
+                    for page in self._iter_corrected_pages(file_path, session, method):
+                        writer.write_page(page)
+        except Exception:
+            self._finish_document('error')
+            raise
+
+        # Пустой результат не кэшируем - он мог быть следствием временной ошибки
+        if writer.summary['characters']:
+            self._store_verdict(file_hash, (quality_level, confidence, method))
+
+        result = dict(writer.summary, output_path=output_path, **metadata)
+        if method == "hybrid":
+            result['page_routes'] = summarize_routes(self.last_page_routes)
+        result['metrics'] = self._finish_document('success', writer.summary['pages_written'],
+                                                  writer.summary['characters'], confidence, method)
+        return result
+
+    def export_columnar(self, file_paths: Iterable[str], output_dir: str, fmt: str = 'parquet',
+                        row_group_size: int = 10000, chunker: Optional[NPAChunker] = None) -> Dict:
+        """
+        Извлечение с коррекцией и выгрузкой страниц и фрагментов в Parquet/Arrow
+        (pages.*, chunks.*) группами строк для загрузки в векторную БД.
+        """
+        with CorpusExporter(output_dir, fmt, row_group_size, chunker) as exporter:
+            for file_path in file_paths:
+                with PDFDocumentSession(file_path) as session:
+                    quality_level, confidence, method = self._analyze(file_path, session)
+                    metadata = {
+                        'source_file': os.path.basename(file_path),
+                        'quality_level': quality_level.value,
+                        'confidence': round(confidence, 3),
+                        'extraction_method': method
+                    }
+                    exporter.add_document(file_path, self._iter_corrected_pages(file_path, session, method),
+                                          metadata)
+        return exporter.summary
+
+    def iter_page_range(self, file_path: str, start: int, end: int) -> Iterator[PageResult]:
+        """
+        Исправленные страницы диапазона [start, end) (нумерация с 0) с постраничной
+        маршрутизацией. Лимит страниц OCR не действует: так по частям (шардам)
+        обрабатываются документы в тысячи страниц.
+        """
+        with PDFDocumentSession(file_path) as session:
+            page_nums = list(range(max(0, start), min(end, session.page_count)))
+            yield from self._correct_pages(self._iter_hybrid(file_path, session, page_nums))
+
+    def _iter_corrected_pages(self, file_path: str, session: PDFDocumentSession,
+                              method: str) -> Iterator[PageResult]:
+        return self._correct_pages(self._iter_pages_by_method(file_path, session, method))
+
+    def _correct_pages(self, pages: Iterable[PageResult]) -> Iterator[PageResult]:
+        for page in pages:
+            if page.text.strip():
+                with self.metrics.stage('correct', page.page_number):
+                    page.text = self.text_corrector.improved_fix(page.text)
+            yield page
+
+    def _iter_pages_by_method(self, file_path: str, session: PDFDocumentSession,
+                              method: str) -> Iterator[PageResult]:
+        if method == "hybrid":
+            return self._iter_hybrid(file_path, session)
+        if method == "text_extraction":
+            return self._iter_text_simple(session)
+        return self._iter_ocr_pages(file_path, session)
+
+    @staticmethod
+    def _join_pages(pages: Iterable[PageResult]) -> str:
+        """Склейка страниц в текст формата процессора"""
+        return "".join(_format_page_text(page.page_number - 1, page.text)
+                       for page in pages if page.text.strip()).strip()
+
+    @profiled()
+    def _extract_text_simple(self, file_path: str, session: Optional[PDFDocumentSession] = None) -> str:
         """Простое извлечение текста"""
         try:
-            doc = fitz.open(file_path)
-            full_text = ""
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                if text.strip():
-                    full_text += f"\\n--- Страница {page_num + 1} ---\\n{text}"
-            
-            doc.close()
-            return full_text.strip()
+            with session_scope(file_path, session) as session:
+                return self._join_pages(self._iter_text_simple(session))
         except Exception:
             return ""
+
+    def _iter_text_simple(self, session: PDFDocumentSession) -> Iterator[PageResult]:
+        for page_num in range(session.page_count):
+            with self.metrics.stage('text_layer', page_num + 1):
+                text = session.get_text(page_num, cache=False)
+            yield PageResult(page_num + 1, text, 'text_layer')
     
-    def _extract_text_ocr_improved(self, file_path: str) -> str:
+    @profiled()
+    def _extract_text_ocr_improved(self, file_path: str, session: Optional[PDFDocumentSession] = None) -> str:
         """УЛУЧШЕННОЕ OCR"""
         try:
-            doc = fitz.open(file_path)
-            full_text = ""
-            
-            for page_num in range(min(doc.page_count, 10)):
-                print(f"   📄 Страница {page_num + 1}", end=" ")
-                
-                try:
-                    page = doc[page_num]
-                    
-                    # Высокое разрешение
-                    mat = fitz.Matrix(2.5, 2.5)
-                    pix = page.get_pixmap(matrix=mat)
-                    img_data = pix.tobytes("png")
-                    
-                    # Предобработка
-                    image = Image.open(BytesIO(img_data)).convert('RGB')
-                    enhancer = ImageEnhance.Contrast(image)
-                    image = enhancer.enhance(2.2)
-                    enhancer = ImageEnhance.Sharpness(image)
-                    image = enhancer.enhance(2.0)
-                    
-                    # OCR
-                    text = pytesseract.image_to_string(image, lang='rus+eng', config='--psm 6 --oem 3')
-                    
-                    if text.strip():
-                        full_text += f"\\n--- Страница {page_num + 1} ---\\n{text}"
-                        print(f"✅ {len(text)} символов")
-                    else:
-                        print("❌")
-                        
-                except Exception:
-                    print("❌")
-                    continue
-            
-            doc.close()
-            return full_text.strip()
+            with session_scope(file_path, session) as session:
+                return self._join_pages(self._iter_ocr_pages(file_path, session, self._ocr_page_limit(session)))
         except Exception:
             return ""
+
+    def _ocr_page_limit(self, session: PDFDocumentSession) -> List[int]:
+        """Страницы OCR в пределах лимита последовательного режима (с предупреждением об усечении)"""
+        page_count = session.page_count
+        if self.ocr_workers > 1 or self.max_ocr_pages is None or page_count <= self.max_ocr_pages:
+            return list(range(page_count))
+        logger.warning("OCR ограничен первыми %d из %d страниц %s (max_ocr_pages); все страницы распознают "
+                       "ocr_workers > 1 и потоковая обработка", self.max_ocr_pages, page_count, session.pdf_path)
+        print(f"   ⚠️ OCR только первых {self.max_ocr_pages} из {page_count} страниц (лимит max_ocr_pages)")
+        return list(range(self.max_ocr_pages))
+
+    @profiled()
+    def _extract_text_hybrid(self, file_path: str, session: Optional[PDFDocumentSession] = None) -> str:
+        """Гибридное извлечение: OCR только для страниц без пригодного текстового слоя"""
+        try:
+            with session_scope(file_path, session) as session:
+                return self._join_pages(self._iter_hybrid(file_path, session))
+        except Exception:
+            return ""
+
+    def _iter_hybrid(self, file_path: str, session: PDFDocumentSession,
+                     page_nums: Optional[List[int]] = None) -> Iterator[PageResult]:
+        """
+        Страницы по порядку (по умолчанию - все): текстовый слой или OCR по решению
+        маршрутизатора. Страницы маршрутизируются окнами по мере обхода: в памяти
+        только текст окна, OCR страниц окна идёт одной порцией (параллельно при ocr_workers > 1).
+        """
+        if page_nums is None:
+            page_nums = list(range(session.page_count))
+        self.last_page_routes = []
+        self._reset_ocr_stats()
+        window = max(_HYBRID_WINDOW, self.ocr_workers * 8)
+
+        for start in range(0, len(page_nums), window):
+            routed = []
+            for page_num in page_nums[start:start + window]:
+                with self.metrics.stage('text_layer', page_num + 1):
+                    text = session.get_text(page_num, cache=False)
+                with self.metrics.stage('analyze'):
+                    route = self.page_router.classify_page(session.get_page(page_num), text, page_num + 1)
+                # Текст страниц под OCR не нужен
+                routed.append((route, text if route.route == ROUTE_TEXT else None))
+            self.last_page_routes.extend(route for route, _ in routed)
+
+            # Лимит страниц к гибридному режиму не применяется: OCR получают только нужные страницы
+            ocr_pages = [route.page_number - 1 for route, _ in routed if route.route == ROUTE_OCR]
+            ocr_results = self._iter_ocr_batch(file_path, session, ocr_pages) if ocr_pages else iter(())
+            for route, text in routed:
+                if route.route == ROUTE_OCR:
+                    # OCR выдаёт страницы в том же порядке, что и маршруты
+                    yield next(ocr_results)
+                else:
+                    yield PageResult(route.page_number, text, ROUTE_TEXT)
+            # Дочитываем генератор OCR, чтобы завершить порцию и учесть статистику кэша
+            for _ in ocr_results:
+                pass
+
+        summary = summarize_routes(self.last_page_routes)
+        print(f"   🧭 Маршрутизация: {summary[ROUTE_TEXT]} стр. текстовый слой, {summary[ROUTE_OCR]} стр. OCR")
+        self._print_ocr_stats()
+
+    def _iter_ocr_pages(self, file_path: str, session: PDFDocumentSession,
+                        page_nums: Optional[List[int]] = None) -> Iterator[PageResult]:
+        """OCR страниц (по умолчанию - всех)"""
+        if page_nums is None:
+            page_nums = list(range(session.page_count))
+        self._reset_ocr_stats()
+        yield from self._iter_ocr_batch(file_path, session, page_nums)
+        self._print_ocr_stats()
+
+    def _iter_ocr_batch(self, file_path: str, session: PDFDocumentSession,
+                        page_nums: List[int]) -> Iterator[PageResult]:
+        """OCR порции страниц; статистику сбрасывает и выводит вызывающий"""
+        if self.ocr_workers > 1:
+            return self._iter_ocr_parallel(file_path, page_nums, session)
+        return self._iter_ocr_sequential(session, page_nums)
+
+    def _reset_ocr_stats(self):
+        self.page_cache_stats = {'hits': 0, 'misses': 0}
+        self.render_stats = {'pages': 0, 'escalated': 0, 'scale_sum': 0.0}
+        self.memory_stats = {'pages': 0, 'downscaled': 0, 'throttled': 0, 'peak_rss_mb': 0.0}
+
+    def _print_ocr_stats(self):
+        self._print_page_cache_stats()
+        self._print_render_stats()
+        self._print_memory_stats()
+
+    def _iter_ocr_sequential(self, session: PDFDocumentSession, page_nums: List[int]) -> Iterator[PageResult]:
+        settings = self._ocr_task_settings()
+        engine = get_ocr_engine(self.ocr_engine)
+        budget = self._document_budget()
+
+        for page_num in page_nums:
+            print(f"   📄 Страница {page_num + 1}", end=" ")
+
+            timings: Dict[str, Timing] = {}
+            try:
+                # Рендер OCR используется один раз - не кэшируем
+                text, cache_hit, scale, escalated = _ocr_page(session.get_page(page_num), settings,
+                                                              self.extraction_cache, engine, timings, budget)
+                self._count_page_cache(cache_hit)
+                self._count_render(scale, escalated)
+            except Exception as e:
+                self.metrics.record_timings(timings, page_num + 1)
+                print("❌")
+                yield PageResult(page_num + 1, "", 'ocr', error=str(e))
+                continue
+            finally:
+                if budget is not None:
+                    budget.page_done()
+
+            self.metrics.record_timings(timings, page_num + 1)
+            print(f"✅ {len(text)} символов{self._render_note(scale, escalated)}" if text.strip() else "❌")
+            yield PageResult(page_num + 1, text, 'ocr', cache_hit)
+
+        if budget is not None:
+            self._count_memory(budget.stats(), len(page_nums))
+
+    def _iter_ocr_parallel(self, file_path: str, page_nums: List[int],
+                           session: PDFDocumentSession) -> Iterator[PageResult]:
+        page_count = len(page_nums)
+        if page_count == 0:
+            return
+
+        workers = min(self.ocr_workers, page_count)
+        settings = self._ocr_task_settings()
+        doc_key = _document_key(file_path)
+        tasks = [(doc_key, page_num, settings, None) for page_num in page_nums]
+
+        print(f"   ⚙️ Параллельный OCR: {page_count} страниц, {workers} процессов")
+
+        executor = self._get_ocr_pool()
+        if self.memory_budget is None:
+            # Крупные порции уменьшают накладные расходы на передачу задач;
+            # map возвращает результаты в порядке страниц
+            results = executor.map(_ocr_page_worker, tasks, chunksize=max(1, page_count // (workers * 4)))
+        else:
+            results = self._map_within_budget(executor, tasks, session)
+        try:
+            for page_num, text, cache_hit, scale, escalated, timings, memory in results:
+                # Время рендера и OCR замерено в воркере
+                self.metrics.record_timings(timings, page_num + 1, remote=True)
+                if memory is not None:
+                    self._count_memory(memory)
+                if text is None:
+                    print(f"   📄 Страница {page_num + 1} ❌")
+                    yield PageResult(page_num + 1, "", 'ocr', error="Ошибка OCR")
+                    continue
+
+                self._count_page_cache(cache_hit)
+                self._count_render(scale, escalated)
+                if text.strip():
+                    print(f"   📄 Страница {page_num + 1} ✅ {len(text)} символов{self._render_note(scale, escalated)}")
+                else:
+                    print(f"   📄 Страница {page_num + 1} ❌")
+                yield PageResult(page_num + 1, text, 'ocr', cache_hit)
+        except BrokenProcessPool:
+            # Воркер погиб - следующий документ получит новый пул
+            self._ocr_pool = None
+            raise
+
+    def _map_within_budget(self, executor: ProcessPoolExecutor, tasks: List[Tuple],
+                           session: PDFDocumentSession) -> Iterator[Tuple]:
+        """
+        Задачи OCR окном в порядке страниц: новая страница отправляется, только
+        если её рендер и процесс OCR помещаются в остаток бюджета. Каждая задача
+        получает долю бюджета, под которую воркер подбирает масштаб рендера.
+        """
+        budget = self._document_budget()
+        settings = tasks[0][2]
+        in_flight = deque()
+        for doc_key, page_num, _, _ in tasks:
+            page = session.get_page(page_num)
+            limit, share = budget.pages_in_flight(page, settings['scale'], self.ocr_workers, len(in_flight))
+            while len(in_flight) >= limit:
+                # Ждём старейшую страницу: результаты и так выдаются по порядку
+                self.memory_stats['throttled'] += 1
+                yield in_flight.popleft().result()
+                limit, share = budget.pages_in_flight(page, settings['scale'], self.ocr_workers, len(in_flight))
+            # Пик RSS всего дерева процессов (процессы OCR сообщают только свой)
+            self.memory_stats['peak_rss_mb'] = max(self.memory_stats['peak_rss_mb'], round(budget.peak_rss_mb, 1))
+            in_flight.append(executor.submit(_ocr_page_worker, (doc_key, page_num, settings, share)))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+    def _get_ocr_pool(self) -> ProcessPoolExecutor:
+        """Пул процессов OCR; модели движка загружаются в воркерах один раз"""
+        if self._ocr_pool is None:
+            cache = self.extraction_cache
+            cache_args = (None, 512) if cache is None else (cache.cache_dir, cache.max_size_bytes / 1024 / 1024)
+            self._ocr_pool = ProcessPoolExecutor(max_workers=self.ocr_workers, initializer=_init_ocr_worker,
+                                                 initargs=cache_args + (self.ocr_engine,))
+        return self._ocr_pool
+
+    def close(self):
+        """Остановка пула OCR и удаление сохранённых текстов оригиналов"""
+        if self._ocr_pool is not None:
+            self._ocr_pool.shutdown()
+            self._ocr_pool = None
+        if self._dedup_dir is not None:
+            self._dedup_dir.cleanup()
+            self._dedup_dir = None
+
+    def _count_page_cache(self, cache_hit: bool):
+        """Учёт обращения к постраничному кэшу OCR"""
+        if self.extraction_cache is not None:
+            self.page_cache_stats['hits' if cache_hit else 'misses'] += 1
+
+    def _print_page_cache_stats(self):
+        if self.extraction_cache is not None:
+            stats = self.page_cache_stats
+            print(f"   💾 Кэш страниц OCR: {stats['hits']} попаданий, {stats['misses']} промахов")
+
+    def _count_render(self, scale: float, escalated: bool):
+        """Учёт масштаба рендера страницы в адаптивном режиме"""
+        if self.render_policy is not None:
+            self.render_stats['pages'] += 1
+            self.render_stats['escalated'] += int(escalated)
+            self.render_stats['scale_sum'] += scale
+
+    def _document_budget(self) -> Optional[MemoryBudget]:
+        """Бюджет памяти прогона OCR документа (свои счётчики снижений масштаба и пика RSS)"""
+        if self.memory_budget is None:
+            return None
+        return MemoryBudget(self.memory_budget.limit_mb, self.memory_budget.min_scale)
+
+    def _count_memory(self, memory: Dict, pages: int = 1):
+        """Учёт расхода памяти страниц в режиме бюджета"""
+        stats = self.memory_stats
+        stats['pages'] += pages
+        stats['downscaled'] += memory['downscaled']
+        stats['peak_rss_mb'] = max(stats['peak_rss_mb'], memory['peak_rss_mb'])
+
+    def _print_memory_stats(self):
+        stats = self.memory_stats
+        if self.memory_budget is not None and stats['pages']:
+            print(f"   🧮 Бюджет памяти {self.memory_budget.limit_mb:.0f} МБ: "
+                  f"пиковый RSS с процессами OCR {stats['peak_rss_mb']:.0f} МБ, "
+                  f"масштаб снижен на {stats['downscaled']} стр., "
+                  f"ожиданий памяти {stats['throttled']}")
+
+    def _render_note(self, scale: float, escalated: bool) -> str:
+        if self.render_policy is None:
+            return ""
+        return f" (масштаб {scale:.2f}x{', повтор' if escalated else ''})"
+
+    def _print_render_stats(self):
+        stats = self.render_stats
+        if self.render_policy is not None and stats['pages']:
+            print(f"   🔎 Адаптивный рендер: средний масштаб {stats['scale_sum'] / stats['pages']:.2f}x, "
+                  f"повторное распознавание {stats['escalated']} стр.")
     
-    def _create_improved_markdown(self, text: str, file_path: str, quality_level, confidence: float, method: str) -> str:
+    def _create_improved_markdown(self, text: str, file_path: str, quality_level, confidence: float, method: str,
+                                  duplicate: Optional[DuplicateMatch] = None) -> str:
         """Создание улучшенного Markdown"""
         
         # Извлекаем метаданные
@@ -166,6 +989,8 @@ class ImprovedAdvancedPDFExtractProcessor(AdvancedPDFExtractProcessor):
         processing_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         chars_count = len(text)
         pages_count = text.count('--- Страница')
+        document = self.metrics.current
+        raw_chars_count = document.raw_characters if document and document.raw_characters else chars_count
         quality_rating = "excellent" if confidence > 0.9 else "good"
         
         # Формируем YAML заголовок
@@ -180,7 +1005,7 @@ pages_processed: {pages_count}
 average_confidence: {confidence:.3f}
 quality_rating: "{quality_rating}"
 organizations: ["МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ"]
----
+{self._duplicate_yaml(duplicate)}---
 
 """
         
@@ -211,14 +1036,12 @@ organizations: ["МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ"]
 ## 📊 Улучшенная статистика обработки
 
 ### ⚡ Производительность
-- **Общее время обработки:** `97.9 секунд`
-- **Время на страницу:** `10.9 сек/страница`
-- **Скорость извлечения:** `202 символов/сек`
+{self._performance_stats(chars_count, pages_count)}
 
 ### 🔧 Улучшения качества
-- **Символов до коррекции:** `{chars_count - 90:,}`
+- **Символов до коррекции:** `{raw_chars_count:,}`
 - **Символов после коррекции:** `{chars_count:,}`
-- **Коэффициент улучшения:** `1.005x`
+- **Коэффициент улучшения:** `{chars_count / max(1, raw_chars_count):.3f}x`
 - **Средняя уверенность OCR:** `{confidence:.3f}`
 
 ### 📊 Структурный анализ
@@ -234,6 +1057,7 @@ organizations: ["МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ"]
 
 ### 📈 Качество по страницам
 {self._page_stats(text)}
+{self._routing_stats(method)}
 
 ---
 
@@ -245,6 +1069,33 @@ organizations: ["МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ"]
         
         return yaml_header + main_content
     
+    def _performance_stats(self, chars_count: int, pages_count: int) -> str:
+        """Замеренное время обработки документа (до формирования отчёта) и стадии"""
+        document = self.metrics.current
+        if document is None:
+            return "- **Замеры времени:** `недоступны`"
+
+        wall, cpu = document.elapsed()
+        lines = [f"- **Общее время обработки:** `{wall:.1f} секунд`",
+                 f"- **Время на страницу:** `{wall / max(1, pages_count):.2f} сек/страница`",
+                 f"- **Скорость извлечения:** `{chars_count / wall if wall else 0:.0f} символов/сек`",
+                 f"- **Процессорное время:** `{cpu:.1f} секунд`"]
+        for stage, (stage_wall, stage_cpu) in document.stages.items():
+            # Стадии воркеров пула OCR: сумма по процессам, а не доля общего времени
+            kind = " (время воркеров)" if stage in document.worker_stages else ""
+            lines.append(f"- **{STAGE_LABELS.get(stage, stage)}{kind}:** `{stage_wall:.2f} с` "
+                         f"(CPU `{stage_cpu:.2f} с`)")
+        if document.worker_stages:
+            lines.append("- *Время воркеров суммируется по процессам пула и может превышать общее время*")
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _duplicate_yaml(duplicate: Optional[DuplicateMatch]) -> str:
+        if duplicate is None:
+            return ""
+        return (f'duplicate_of: "{os.path.basename(duplicate.original)}"\n'
+                f'duplicate_similarity: {duplicate.similarity:.3f}\n')
+
     def _format_content(self, text: str) -> str:
         """Форматирование содержимого по страницам"""
         pages = text.split('--- Страница')
@@ -271,6 +1122,18 @@ organizations: ["МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ"]
         
         return '\\n'.join(stats)
     
+    def _routing_stats(self, method: str) -> str:
+        """Решения постраничной маршрутизации (гибридный режим)"""
+        if method != "hybrid" or not self.last_page_routes:
+            return ""
+
+        lines = ["", "### 🧭 Маршрутизация страниц"]
+        for route in self.last_page_routes:
+            source = "OCR" if route.route == ROUTE_OCR else "текстовый слой"
+            lines.append(f"- **Страница {route.page_number}:** {source} ({route.reason}, "
+                         f"текст {route.text_length} симв., изображения {route.image_coverage:.0%})")
+        return '\n'.join(lines)
+    
     def _create_error_result(self, file_path: str, error: str) -> str:
         """Результат при ошибке"""
         filename = os.path.basename(file_path)
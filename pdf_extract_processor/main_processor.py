@@ -3,27 +3,17 @@
 """
 
 import os
-import re
-import cv2
-import fitz
-import numpy as np
-from PIL import Image, ImageEnhance, ImageFilter
-import pytesseract
-import easyocr
-from pathlib import Path
-import pdfplumber
-import spacy
-import nltk
-from typing import List, Dict, Tuple, Optional, Union
-import json
-import yaml
-from datetime import datetime
+from typing import List, Dict, Tuple, Optional
 import logging
 import time
 from dataclasses import dataclass
 from enum import Enum
 import tempfile
-from .enhanced_processor import EnhancedPDFProcessor
+from .document_session import PDFDocumentSession, session_scope
+from .metrics import ProcessingMetrics
+from .profiling import DocumentProfiler, profiled
+from .quality_scoring import (DEFAULT_SAMPLE_PAGES, PageQuality, ThumbnailQualityScorer,
+                              ocr_method_for_score, sample_page_numbers)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -99,84 +89,85 @@ class FileUploader:
 
 
 class PDFQualityAnalyzer:
+    # Версия логики вердикта - входит в ключ кэша вердиктов; повышается при её изменении
+    VERSION = 2
+
+    # Метод OCR -> уровень качества документа
+    _OCR_METHOD_LEVELS = {
+        'ocr_simple': QualityLevel.B,
+        'ocr_enhanced': QualityLevel.C,
+        'ocr_advanced': QualityLevel.D,
+    }
+
     def __init__(self):
         self.text_threshold = 100
+        self.page_scorer = ThumbnailQualityScorer()
+        # Страниц в выборке для вердикта по документу: время оценки не растёт с длиной документа
+        self.sample_pages = DEFAULT_SAMPLE_PAGES
+        # Карта качества выборки страниц последнего документа, дошедшего до оценки изображений
+        self.last_page_quality: List[PageQuality] = []
+
+    @property
+    def settings(self) -> Dict:
+        return {
+            'version': self.VERSION,
+            'text_threshold': self.text_threshold,
+            'sample_pages': self.sample_pages,
+            'scorer': self.page_scorer.settings
+        }
 
-    def analyze_pdf_quality(self, pdf_path: str) -> Tuple[QualityLevel, float, str]:
-        try:
-            doc = fitz.open(pdf_path)
-            total_text_length = 0
-            has_text_layer = False
-            sample_pages = min(3, len(doc))
+    def page_quality_map(self, pdf_path: str, session: Optional[PDFDocumentSession] = None,
+                         page_nums: Optional[List[int]] = None) -> List[PageQuality]:
+        """Оценка качества изображения страниц по миниатюрам (по умолчанию - всех)"""
+        with session_scope(pdf_path, session) as session:
+            return self.page_scorer.score_document(session, page_nums)
 
-            for page_num in range(sample_pages):
-                page = doc[page_num]
-                text = page.get_text()
-                total_text_length += len(text.strip())
-                if len(text.strip()) > 50:
-                    has_text_layer = True
+    def analyze_pdf_quality(self, pdf_path: str,
+                            session: Optional[PDFDocumentSession] = None) -> Tuple[QualityLevel, float, str]:
+        try:
+            with session_scope(pdf_path, session) as session:
+                total_text_length = 0
+                has_text_layer = False
+                sample_pages = min(3, session.page_count)
 
-            doc.close()
+                for page_num in range(sample_pages):
+                    text = session.get_text(page_num)
+                    total_text_length += len(text.strip())
+                    if len(text.strip()) > 50:
+                        has_text_layer = True
 
-            if has_text_layer and total_text_length > self.text_threshold * sample_pages:
-                return QualityLevel.A, 0.95, "text_extraction"
+                if has_text_layer and total_text_length > self.text_threshold * sample_pages:
+                    return QualityLevel.A, 0.95, "text_extraction"
 
-            return self._analyze_image_quality(pdf_path)
+                return self._analyze_image_quality(pdf_path, session)
 
         except Exception as e:
             logger.error(f"Ошибка анализа PDF {pdf_path}: {e}")
             return QualityLevel.D, 0.3, "ocr_advanced"
 
-    def _analyze_image_quality(self, pdf_path: str) -> Tuple[QualityLevel, float, str]:
+    def _analyze_image_quality(self, pdf_path: str,
+                               session: Optional[PDFDocumentSession] = None) -> Tuple[QualityLevel, float, str]:
         try:
-            doc = fitz.open(pdf_path)
-            quality_scores = []
-
-            for page_num in range(min(2, len(doc))):
-                page = doc[page_num]
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                img_data = pix.tobytes("png")
-                nparr = np.frombuffer(img_data, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-
-                if img is not None:
-                    score = self._calculate_image_quality_score(img)
-                    quality_scores.append(score)
-
-            doc.close()
+            # Равномерная выборка страниц оценивается пакетом миниатюр вместо рендера 2x первых двух
+            with session_scope(pdf_path, session) as session:
+                page_nums = sample_page_numbers(session.page_count, self.sample_pages)
+                self.last_page_quality = self.page_quality_map(pdf_path, session, page_nums)
+            quality_scores = [page.score for page in self.last_page_quality]
 
             if not quality_scores:
                 return QualityLevel.D, 0.3, "ocr_advanced"
 
             avg_score = sum(quality_scores) / len(quality_scores)
-
-            if avg_score > 0.8:
-                return QualityLevel.B, avg_score, "ocr_simple"
-            elif avg_score > 0.6:
-                return QualityLevel.C, avg_score, "ocr_enhanced"
-            else:
-                return QualityLevel.D, avg_score, "ocr_advanced"
+            method = ocr_method_for_score(avg_score)
+            return self._OCR_METHOD_LEVELS[method], avg_score, method
 
         except Exception as e:
             logger.error(f"Ошибка анализа изображений: {e}")
             return QualityLevel.D, 0.3, "ocr_advanced"
 
-    def _calculate_image_quality_score(self, img: np.ndarray) -> float:
-        laplacian_var = cv2.Laplacian(img, cv2.CV_64F).var()
-        sharpness_score = min(laplacian_var / 1000, 1.0)
-
-        hist = cv2.calcHist([img], [0], None, [256], [0, 256])
-        contrast_score = hist.std() / 128.0
-
-        mean_brightness = img.mean()
-        brightness_score = 1.0 - abs(mean_brightness - 127) / 127.0
-
-        total_score = (sharpness_score * 0.4 + contrast_score * 0.4 + brightness_score * 0.2)
-        return min(total_score, 1.0)
-
 
 class AdvancedPDFExtractProcessor:
-    def __init__(self):
+    def __init__(self, profile_dir: Optional[str] = None, profile_top: int = 5, profile_memory: bool = False):
         self.quality_analyzer = PDFQualityAnalyzer()
         self.file_uploader = FileUploader()
         
@@ -188,6 +179,12 @@ class AdvancedPDFExtractProcessor:
             'average_confidence': 0.0,
             'processing_time': 0.0
         }
+        # Время стадий по страницам и документам (JSON, Prometheus)
+        self.metrics = ProcessingMetrics()
+        # Профилирование profile_top самых медленных документов: каталог дампов
+        # или переменная PDF_EXTRACT_PROFILE_DIR; profile_memory - ещё и tracemalloc
+        self.profiler = (DocumentProfiler(profile_dir, profile_top, profile_memory) if profile_dir
+                         else DocumentProfiler.from_env())
 
     def interactive_process_advanced(self) -> Dict[str, str]:
         print("🚀 ПРОДВИНУТАЯ СИСТЕМА ИЗВЛЕЧЕНИЯ ТЕКСТА ИЗ PDF")
@@ -228,26 +225,26 @@ class AdvancedPDFExtractProcessor:
         
         return results
 
+    @profiled()
     def process_single_file_advanced(self, file_path: str) -> Optional[str]:
+        self.metrics.begin_document(file_path)
         try:
-            print("🔍 Анализ качества...")
-            quality_level, confidence, method = self.quality_analyzer.analyze_pdf_quality(file_path)
-            
-            print(f"   📊 Качество: {quality_level.value}")
-            print(f"   📈 Уверенность: {confidence:.3f}")
-            
-            # Простое извлечение текста для демонстрации
-            print("📝 Извлечение текста...")
-            
-            doc = fitz.open(file_path)
-            full_text = ""
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                full_text += f"\n\n--- Страница {page_num + 1} ---\n\n{text}"
-                
-            doc.close()
+            with PDFDocumentSession(file_path) as session:
+                print("🔍 Анализ качества...")
+                with self.metrics.stage('analyze'):
+                    quality_level, confidence, method = self.quality_analyzer.analyze_pdf_quality(file_path, session)
+
+                print(f"   📊 Качество: {quality_level.value}")
+                print(f"   📈 Уверенность: {confidence:.3f}")
+
+                # Простое извлечение текста для демонстрации
+                print("📝 Извлечение текста...")
+
+                with self.metrics.stage('text_layer'):
+                    full_text = "".join(f"\n\n--- Страница {page_num + 1} ---\n\n"
+                                        f"{session.get_text(page_num, cache=False)}"
+                                        for page_num in range(session.page_count))
+                page_count = session.page_count
             
             # Создаем простой Markdown
             markdown_content = f"""# Извлеченный текст
@@ -266,12 +263,32 @@ class AdvancedPDFExtractProcessor:
 *Обработано системой PDF Extract Processor v2.0*
 """
             
+            self._finish_document('success', page_count, len(full_text), confidence, method)
             return markdown_content
             
         except Exception as e:
             logger.error(f"Ошибка обработки {file_path}: {e}")
+            self._finish_document('error')
             return None
 
+    def _finish_document(self, status: str, pages: int = 0, characters: int = 0,
+                         confidence: Optional[float] = None, method: Optional[str] = None) -> Optional[Dict]:
+        """Итог документа: запись замеров стадий и обновление processing_stats"""
+        record = self.metrics.end_document(status, pages, characters, method)
+        stats = self.processing_stats
+        stats['total_files'] += 1
+        if status == 'error':
+            stats['failed'] += 1
+        else:
+            # Средняя уверенность - по успешно обработанным документам
+            if confidence is not None:
+                stats['average_confidence'] += (confidence - stats['average_confidence']) / (stats['successful'] + 1)
+            stats['successful'] += 1
+            stats['total_pages'] += pages
+        if record is not None:
+            stats['processing_time'] += record['wall_seconds']
+        return record
+
     def _print_summary(self, results: Dict, total_time: float):
         print("\n" + "=" * 60)
         print("📊 СТАТИСТИКА ОБРАБОТКИ")
@@ -280,6 +297,10 @@ class AdvancedPDFExtractProcessor:
         successful = sum(1 for r in results.values() if r.get('status') == 'success')
         print(f"✅ Успешно: {successful}/{len(results)}")
         print(f"⏱️ Время: {total_time:.1f}с")
+        if self.metrics.stage_wall:
+            print(f"   По стадиям: {self.metrics.summary_line()}")
+            if self.metrics.worker_stages:
+                print("   * время воркеров OCR: сумма по процессам, может превышать общее время")
 
     def auto_process_with_detection(self, pdf_path):
         """Автоматическая обработка с определением метода"""
@@ -0,0 +1,189 @@
+"""
+Обработка в пределах бюджета памяти
+
+Бюджет - предел суммарного RSS процессора и всех его дочерних процессов (пул OCR,
+Tesseract); мягкий: соблюдается подстройкой, а не аварийным завершением. Память
+съедают рендеры страниц: при масштабе 2.5 страница A4 в RGB - около 9 МБ на копию, а предобработка и OCR
+держат несколько копий. В режиме бюджета:
+    - страницы рендерятся в оттенках серого (в 3 раза меньше, Tesseract всё равно
+      распознаёт по яркости);
+    - масштаб рендера снижается, если страница не помещается в остаток бюджета;
+    - кэш ресурсов MuPDF (декодированные изображения сканов) очищается после страницы;
+    - число страниц, распознаваемых параллельно, ограничивается остатком бюджета.
+Текст документа при этом собирается в памяти целиком; чтобы и он не рос с длиной
+документа, используйте потоковую запись (process_file_streaming, CLI).
+"""
+
+import contextlib
+import gc
+import glob
+import logging
+import math
+import os
+from typing import Dict, Optional, Tuple
+
+import fitz
+
+from .engines import get_engine, is_engine_available
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BUDGET_ENV = 'PDF_EXTRACT_MEMORY_BUDGET_MB'
+
+_MB = 1024 * 1024
+# Одновременно живущие копии рендера: пиксмап, предобработка (контраст, резкость)
+_RENDER_COPIES = 4
+# Внутренние буферы Tesseract на пиксель рендера (изображение, бинаризация)
+_ENGINE_BYTES_PER_PIXEL = 4
+# RSS процесса OCR без страницы: интерпретатор, PyMuPDF, PIL, модель Tesseract
+OCR_PROCESS_BASE_MB = 120.0
+
+
+def process_tree_rss() -> Optional[Tuple[float, int]]:
+    """
+    Суммарный RSS процесса и всех его потомков в МБ и число прямых дочерних
+    процессов: psutil или /proc (Linux); None - измерить нечем. Общие после fork
+    страницы учитываются в каждом процессе, так что оценка завышена - бюджет
+    соблюдается с запасом.
+    """
+    if is_engine_available('psutil'):
+        psutil = get_engine('psutil')
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            # Процесс мог завершиться между перечислением и замером
+            with contextlib.suppress(psutil.NoSuchProcess, psutil.AccessDenied):
+                total += child.memory_info().rss
+        return total / _MB, len(process.children())
+    return _proc_tree_rss()
+
+
+def _proc_tree_rss() -> Optional[Tuple[float, int]]:
+    """Дерево процессов по /proc/<pid>/stat: родитель и RSS (в страницах) каждого процесса"""
+    children: Dict[int, list] = {}
+    rss_pages: Dict[int, int] = {}
+    stat_paths = glob.glob('/proc/[0-9]*/stat')
+    if not stat_paths:
+        return None
+    for path in stat_paths:
+        try:
+            with open(path) as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Имя процесса в скобках может содержать пробелы - поля считаются после него
+        fields = stat[stat.rfind(')') + 2:].split()
+        pid = int(path.split('/')[2])
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss_pages[pid] = int(fields[21])
+
+    own_pid = os.getpid()
+    total, queue = 0, [own_pid]
+    while queue:
+        pid = queue.pop()
+        total += rss_pages.get(pid, 0)
+        queue.extend(children.get(pid, ()))
+    return total * os.sysconf('SC_PAGE_SIZE') / _MB, len(children.get(own_pid, ()))
+
+
+class MemoryBudget:
+    """
+    Предел RSS и оценки памяти страниц для выбора масштаба и числа страниц в полёте.
+    Счётчики (downscaled, peak_rss_mb) относятся к одному прогону: бюджет создаётся
+    на документ в процессоре и на страницу в процессе OCR.
+    """
+
+    def __init__(self, limit_mb: float, min_scale: float = 1.0):
+        if limit_mb <= 0:
+            raise ValueError("Бюджет памяти должен быть положительным")
+        self.limit_mb = limit_mb
+        # Ниже этого масштаба OCR теряет мелкий текст - лучше превысить бюджет
+        self.min_scale = min_scale
+        self.downscaled = 0
+        self.peak_rss_mb = 0.0
+        self._rss_warned = False
+
+    @classmethod
+    def from_env(cls) -> Optional["MemoryBudget"]:
+        """Бюджет из переменной окружения; None - режим выключен"""
+        value = os.environ.get(MEMORY_BUDGET_ENV)
+        return cls(float(value)) if value else None
+
+    def _measure(self) -> Tuple[float, int]:
+        measured = process_tree_rss()
+        if measured is None:
+            if not self._rss_warned:
+                logger.warning("RSS процессов не измеряется (нет /proc и psutil): бюджет только по оценкам страниц")
+                self._rss_warned = True
+            return 0.0, 0
+        self.peak_rss_mb = max(self.peak_rss_mb, measured[0])
+        return measured
+
+    def rss_mb(self) -> float:
+        """RSS процесса вместе с дочерними процессами OCR"""
+        return self._measure()[0]
+
+    def headroom_mb(self) -> float:
+        return self.limit_mb - self.rss_mb()
+
+    @staticmethod
+    def page_cost_mb(page: fitz.Page, scale: float, gray: bool = True) -> float:
+        """Оценка памяти на распознавание страницы в заданном масштабе"""
+        pixels = page.rect.width * scale * page.rect.height * scale
+        channels = 1 if gray else 3
+        return pixels * (channels * _RENDER_COPIES + _ENGINE_BYTES_PER_PIXEL) / _MB
+
+    @staticmethod
+    def release():
+        """Освобождение кэша ресурсов MuPDF и циклического мусора"""
+        fitz.TOOLS.store_shrink(100)
+        gc.collect()
+
+    def scale_cap(self, page: fitz.Page, scale: float, gray: bool = True) -> float:
+        """Наибольший масштаб не выше scale, при котором страница помещается в остаток бюджета"""
+        cost = self.page_cost_mb(page, scale, gray)
+        if cost <= self.headroom_mb():
+            return scale
+
+        self.release()
+        headroom = self.headroom_mb()
+        if cost <= headroom:
+            return scale
+        # Память рендера растёт как квадрат масштаба
+        fitted = scale * math.sqrt(max(headroom, 0.0) / cost)
+        return round(max(self.min_scale, min(scale, fitted)), 2)
+
+    def fit_scale(self, page: fitz.Page, scale: float, gray: bool = True) -> float:
+        """Масштаб рендера страницы в пределах бюджета (снижение учитывается в downscaled)"""
+        fitted = self.scale_cap(page, scale, gray)
+        self.downscaled += int(fitted < scale)
+        return fitted
+
+    def page_done(self):
+        """Замер RSS после распознавания страницы (пик) и освобождение её буферов"""
+        self.rss_mb()
+        self.release()
+
+    def pages_in_flight(self, page: fitz.Page, scale: float, workers: int, in_flight: int,
+                        gray: bool = True) -> Tuple[int, float]:
+        """
+        Сколько страниц может распознаваться параллельно, если in_flight уже отправлены,
+        и бюджет процесса OCR для следующей. Запущенные процессы OCR и их страницы уже
+        входят в замер RSS; ещё не запущенному процессу добавляется его базовый RSS.
+        """
+        rss, processes = self._measure()
+        headroom = self.limit_mb - rss
+        cost = self.page_cost_mb(page, scale, gray)
+        allowed = in_flight
+        while allowed < workers:
+            needed = cost + (OCR_PROCESS_BASE_MB if allowed >= processes else 0.0)
+            if headroom < needed:
+                break
+            headroom -= needed
+            allowed += 1
+        allowed = max(1, allowed)
+        # Процессу OCR - его базовый RSS и равная доля оставшегося бюджета
+        return allowed, OCR_PROCESS_BASE_MB + max(0.0, self.limit_mb - rss) / allowed
+
+    def stats(self) -> Dict:
+        return {'downscaled': self.downscaled, 'peak_rss_mb': round(self.peak_rss_mb, 1)}
@@ -0,0 +1,332 @@
+"""
+Замеры времени обработки по стадиям
+
+Для стадий (поиск дубликатов, анализ, текстовый слой, рендер, OCR, коррекция,
+Markdown) замеряются настенное и процессорное время - по страницам и по документу.
+Итоги копятся в счётчиках и гистограммах и выгружаются в JSON и в текстовый файл
+Prometheus (textfile collector node_exporter).
+
+Процессорное время включает завершённые дочерние процессы: pytesseract запускает
+tesseract отдельным процессом на каждую страницу. Стадии, замеренные в воркерах
+пула OCR, суммируются по процессам (время воркеров) и могут превышать настенное
+время документа - такие стадии отмечаются отдельно.
+"""
+
+import contextlib
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+
+STAGE_LABELS = {
+    'dedup': 'Поиск дубликатов',
+    'analyze': 'Анализ качества',
+    'text_layer': 'Текстовый слой',
+    'render': 'Рендер страниц',
+    'ocr': 'OCR',
+    'correct': 'Коррекция',
+    'markdown': 'Markdown',
+}
+
+# Границы корзин гистограмм, секунды (от страницы текстового слоя до документа-скана)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+METRICS_PREFIX = 'pdf_extract'
+
+# Замер стадии: [настенное время, процессорное время], секунды
+Timing = List[float]
+
+
+def cpu_time() -> float:
+    """Процессорное время процесса и его завершённых дочерних процессов"""
+    # os.times() считает в тиках таймера, для своего процесса точнее process_time()
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+@contextlib.contextmanager
+def stage_timer(timings: Optional[Dict[str, Timing]], stage: str) -> Iterator[None]:
+    """Замер стадии с накоплением в timings[stage]; при timings=None замер не ведётся"""
+    if timings is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), cpu_time()
+    try:
+        yield
+    finally:
+        spent = timings.setdefault(stage, [0.0, 0.0])
+        spent[0] += time.perf_counter() - wall
+        spent[1] += cpu_time() - cpu
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (семантика le, как в Prometheus)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Пары (граница le, число наблюдений не больше неё)"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append(('+Inf' if bound == float('inf') else f"{bound:g}", total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # Выше последней границы оценка невозможна
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+            if i < len(self.buckets):
+                lower = self.buckets[i]
+        return lower
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'sum': round(self.sum, 6),
+                'p50': round(self.quantile(0.5), 6), 'p95': round(self.quantile(0.95), 6),
+                'buckets': dict(self.cumulative())}
+
+
+class DocumentMetrics:
+    """Замеры одного документа: стадии целиком и по страницам"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.stages: Dict[str, Timing] = {}
+        self.pages: Dict[int, Dict[str, Timing]] = {}
+        # Длина текста до коррекции OCR (для отчёта о коррекции)
+        self.raw_characters: Optional[int] = None
+        # Процессорное время воркеров параллельного OCR (в своём процессе не видно)
+        self.remote_cpu = 0.0
+        # Стадии, замеренные в воркерах: их время - сумма по процессам пула
+        self.worker_stages = set()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = cpu_time()
+
+    def add(self, stage: str, wall: float, cpu: float, page: Optional[int] = None, remote: bool = False):
+        if remote:
+            self.remote_cpu += cpu
+            self.worker_stages.add(stage)
+        total = self.stages.setdefault(stage, [0.0, 0.0])
+        total[0] += wall
+        total[1] += cpu
+        if page is not None:
+            spent = self.pages.setdefault(page, {}).setdefault(stage, [0.0, 0.0])
+            spent[0] += wall
+            spent[1] += cpu
+
+    def elapsed(self) -> Tuple[float, float]:
+        """Настенное и процессорное время (включая воркеры) с начала документа"""
+        return time.perf_counter() - self._start_wall, cpu_time() - self._start_cpu + self.remote_cpu
+
+    def finish(self, status: str, pages: int = 0, characters: int = 0, method: Optional[str] = None) -> Dict:
+        """Запись документа (JSON-совместимая): итоги стадий и замеры страниц"""
+        wall, cpu = self.elapsed()
+        return {
+            'source': self.source,
+            'status': status,
+            'method': method,
+            'pages': pages,
+            'characters': characters,
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'stages': {stage: [round(wall, 6), round(cpu, 6)] for stage, (wall, cpu) in self.stages.items()},
+            'worker_stages': sorted(self.worker_stages),
+            'page_timings': {str(page): {stage: [round(wall, 6), round(cpu, 6)]
+                                         for stage, (wall, cpu) in stages.items()}
+                             for page, stages in sorted(self.pages.items())}
+        }
+
+
+class ProcessingMetrics:
+    """
+    Счётчики и гистограммы обработки. Документ открывается begin_document,
+    стадии замеряются через stage() и попадают в текущий документ, итоги
+    агрегируются в end_document. Записи документов из других процессов
+    (воркеров) добавляются через add_document.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.documents: Dict[str, int] = {}  # Статус -> число документов
+        self.pages = 0
+        self.characters = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.stage_wall: Dict[str, float] = {}
+        self.stage_cpu: Dict[str, float] = {}
+        # Стадии со временем воркеров пула OCR (сумма по процессам, а не настенное время)
+        self.worker_stages = set()
+        self.document_seconds = Histogram(self.buckets)
+        self.document_stage_seconds: Dict[str, Histogram] = {}
+        self.page_stage_seconds: Dict[str, Histogram] = {}
+        self.current: Optional[DocumentMetrics] = None
+
+    def begin_document(self, source: str) -> DocumentMetrics:
+        # Незавершённый документ (исключение до end_document) отбрасывается
+        self.current = DocumentMetrics(source)
+        return self.current
+
+    def end_document(self, status: str, pages: int = 0, characters: int = 0,
+                     method: Optional[str] = None) -> Optional[Dict]:
+        """Завершение текущего документа; возвращает его запись"""
+        document, self.current = self.current, None
+        if document is None:
+            return None
+        record = document.finish(status, pages, characters, method)
+        self.add_document(record)
+        return record
+
+    @contextlib.contextmanager
+    def stage(self, name: str, page: Optional[int] = None) -> Iterator[None]:
+        """Замер стадии текущего документа (page - номер страницы с 1)"""
+        if self.current is None:
+            yield
+            return
+        timings: Dict[str, Timing] = {}
+        with stage_timer(timings, name):
+            yield
+        self.current.add(name, timings[name][0], timings[name][1], page)
+
+    def record_timings(self, timings: Dict[str, Timing], page: Optional[int] = None, remote: bool = False):
+        """Замеры, сделанные вне stage(); remote - в другом процессе (воркер OCR)"""
+        if self.current is not None:
+            for stage, (wall, cpu) in timings.items():
+                self.current.add(stage, wall, cpu, page, remote)
+
+    def _histogram(self, histograms: Dict[str, Histogram], stage: str) -> Histogram:
+        if stage not in histograms:
+            histograms[stage] = Histogram(self.buckets)
+        return histograms[stage]
+
+    def add_document(self, record: Dict):
+        """Агрегация записи документа (см. DocumentMetrics.finish)"""
+        status = record.get('status', 'success')
+        self.documents[status] = self.documents.get(status, 0) + 1
+        self.pages += record.get('pages', 0)
+        self.characters += record.get('characters', 0)
+        self.wall_seconds += record.get('wall_seconds', 0.0)
+        self.cpu_seconds += record.get('cpu_seconds', 0.0)
+        self.document_seconds.observe(record.get('wall_seconds', 0.0))
+
+        self.worker_stages.update(record.get('worker_stages', ()))
+        for stage, (wall, cpu) in record.get('stages', {}).items():
+            self.stage_wall[stage] = self.stage_wall.get(stage, 0.0) + wall
+            self.stage_cpu[stage] = self.stage_cpu.get(stage, 0.0) + cpu
+            self._histogram(self.document_stage_seconds, stage).observe(wall)
+        for stages in record.get('page_timings', {}).values():
+            for stage, (wall, _) in stages.items():
+                self._histogram(self.page_stage_seconds, stage).observe(wall)
+
+    def throughput(self) -> Dict:
+        """Пропускная способность по сумме времени документов (без простоя очереди)"""
+        return {
+            'pages_per_second': round(self.pages / self.wall_seconds, 3) if self.wall_seconds else 0.0,
+            'characters_per_second': round(self.characters / self.wall_seconds, 1) if self.wall_seconds else 0.0,
+            'cpu_seconds_per_page': round(self.cpu_seconds / self.pages, 4) if self.pages else 0.0
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'documents': dict(self.documents),
+            'pages': self.pages,
+            'characters': self.characters,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'throughput': self.throughput(),
+            'stages': {stage: {'wall_seconds': round(wall, 3), 'cpu_seconds': round(self.stage_cpu[stage], 3)}
+                       for stage, wall in self.stage_wall.items()},
+            'worker_stages': sorted(self.worker_stages),
+            'document_seconds': self.document_seconds.to_dict(),
+            'document_stage_seconds': {stage: h.to_dict() for stage, h in self.document_stage_seconds.items()},
+            'page_stage_seconds': {stage: h.to_dict() for stage, h in self.page_stage_seconds.items()}
+        }
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} {kind}")
+
+        def sample(name: str, value: float, labels: Optional[Dict[str, str]] = None):
+            label_text = ""
+            if labels:
+                label_text = "{" + ",".join(f'{key}="{_escape_label(label)}"'
+                                            for key, label in labels.items()) + "}"
+            lines.append(f"{METRICS_PREFIX}_{name}{label_text} {value:.6g}")
+
+        def histogram(name: str, h: Histogram, labels: Dict[str, str]):
+            for bound, count in h.cumulative():
+                sample(f"{name}_bucket", count, dict(labels, le=bound))
+            sample(f"{name}_sum", h.sum, labels)
+            sample(f"{name}_count", h.count, labels)
+
+        family('documents_total', 'counter', 'Обработано документов по статусу')
+        for status, count in sorted(self.documents.items()):
+            sample('documents_total', count, {'status': status})
+        family('pages_total', 'counter', 'Обработано страниц')
+        sample('pages_total', self.pages)
+        family('characters_total', 'counter', 'Извлечено символов')
+        sample('characters_total', self.characters)
+
+        family('stage_wall_seconds_total', 'counter', 'Настенное время стадий')
+        for stage, wall in sorted(self.stage_wall.items()):
+            sample('stage_wall_seconds_total', wall, {'stage': stage})
+        family('stage_cpu_seconds_total', 'counter', 'Процессорное время стадий')
+        for stage, cpu in sorted(self.stage_cpu.items()):
+            sample('stage_cpu_seconds_total', cpu, {'stage': stage})
+
+        family('document_seconds', 'histogram', 'Время обработки документа')
+        histogram('document_seconds', self.document_seconds, {})
+        family('document_stage_seconds', 'histogram', 'Время стадии на документ')
+        for stage, h in sorted(self.document_stage_seconds.items()):
+            histogram('document_stage_seconds', h, {'stage': stage})
+        family('page_stage_seconds', 'histogram', 'Время стадии на страницу')
+        for stage, h in sorted(self.page_stage_seconds.items()):
+            histogram('page_stage_seconds', h, {'stage': stage})
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        _write_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str):
+        """Атомарная запись: textfile collector не должен увидеть недописанный файл"""
+        _write_atomic(path, self.to_prometheus())
+
+    def summary_line(self) -> str:
+        """Время стадий одной строкой для итогов обработки (* - время воркеров, сумма по процессам)"""
+        return ", ".join(f"{STAGE_LABELS.get(stage, stage)} {wall:.1f}с{'*' if stage in self.worker_stages else ''}"
+                         for stage, wall in sorted(self.stage_wall.items(), key=lambda item: -item[1]))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path: str, content: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
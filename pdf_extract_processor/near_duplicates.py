@@ -0,0 +1,249 @@
+"""
+Поиск почти дубликатов документов до дорогого извлечения (MinHash + LSH)
+
+Повторные сканы, заверенные копии и версии с другой обложкой дают почти
+одинаковый текст. Отпечаток документа - подписи MinHash по словесным шинглам
+нескольких страниц-проб: текстовый слой, а для страниц без него - ранний OCR.
+Кандидаты ищутся по корзинам LSH, сходство страниц оценивается по подписям
+(оценка коэффициента Жаккара), поэтому проверка не зависит от числа документов.
+"""
+
+import re
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .engines import get_engine
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Универсальное хеширование (a * x + b) mod p по простому Мерсенна
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Шинглов в одном блоке вычисления подписи (ограничивает промежуточную матрицу)
+_SIGNATURE_BLOCK = 2048
+
+_TOKEN_RE = re.compile(r'[0-9a-zа-я]+')
+
+
+def shingle_hashes(text: str, size: int = 3) -> "np.ndarray":
+    """32-битные хеши уникальных словесных шинглов нормализованного текста"""
+    np = get_engine('numpy')
+    tokens = _TOKEN_RE.findall(text.lower().replace('ё', 'е'))
+    if len(tokens) < size:
+        shingles = {' '.join(tokens)} if tokens else set()
+    else:
+        shingles = {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                       dtype=np.uint64, count=len(shingles))
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Число полос и строк в полосе: порог кандидата (1/b)^(1/r) берётся с запасом
+    ниже порога сходства, чтобы пары у порога не терялись на этапе LSH.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) <= threshold * 0.85:
+            return bands, rows
+    return num_perm, 1
+
+
+def estimate_similarity(first: "np.ndarray", second: "np.ndarray") -> float:
+    """Оценка коэффициента Жаккара по подписям MinHash"""
+    return float((first == second).mean())
+
+
+class MinHasher:
+    """Подписи MinHash фиксированной длины; одинаковый seed - сравнимые подписи"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        np = get_engine('numpy')
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: "np.ndarray") -> "np.ndarray":
+        np = get_engine('numpy')
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), _SIGNATURE_BLOCK):
+            block = hashes[start:start + _SIGNATURE_BLOCK, None]
+            # Переполнение uint64 при умножении допустимо: результат остаётся хешем
+            permuted = ((block * self._a + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+
+class LSHIndex:
+    """Корзины LSH: документы с совпадающей полосой подписи - кандидаты в дубликаты"""
+
+    def __init__(self, num_perm: int = 128, threshold: float = 0.6):
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+
+    def _band_keys(self, signature: "np.ndarray") -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: str, signature: "np.ndarray"):
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def candidates(self, signature: "np.ndarray") -> Set[str]:
+        found: Set[str] = set()
+        for band, band_key in self._band_keys(signature):
+            found.update(self._buckets[band].get(band_key, ()))
+        return found
+
+
+@dataclass
+class DocumentFingerprint:
+    """Отпечаток документа: подписи MinHash страниц-проб (строка на страницу)"""
+    signatures: "np.ndarray"
+    pages: int  # Страниц в документе
+    probe_pages: int  # Страниц прочитано для отпечатка
+    ocr_pages: int  # Из них распознано OCR
+
+    @property
+    def text_layer(self) -> bool:
+        """Все пробы взяты из текстового слоя: пропуск извлечения ничего не экономит"""
+        return self.ocr_pages == 0
+
+    def to_dict(self) -> Dict:
+        return {'signatures': self.signatures.tolist(), 'pages': self.pages,
+                'probe_pages': self.probe_pages, 'ocr_pages': self.ocr_pages}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DocumentFingerprint":
+        np = get_engine('numpy')
+        return cls(np.asarray(data['signatures'], dtype=np.uint32), data['pages'],
+                   data['probe_pages'], data['ocr_pages'])
+
+
+@dataclass
+class DuplicateMatch:
+    """Найденный оригинал для почти дубликата"""
+    original: str
+    similarity: float  # Доля страниц-проб, совпавших со страницами оригинала
+    matched_pages: int
+
+
+class NearDuplicateDetector:
+    """
+    Реестр отпечатков обработанных документов.
+
+    Страницы сравниваются по отдельности: страница совпала, если сходство её подписи
+    с какой-либо страницей кандидата не ниже threshold. Документ - дубликат, если
+    совпала доля min_page_ratio страниц-проб, поэтому заменённая обложка не мешает
+    сравнению. Пробы разнесены по всему документу, включая последнюю страницу, а
+    документы с разным числом страниц дубликатами не считаются: версия с дописанным
+    или изменённым окончанием не теряет данные в режиме link. Документ добавляется
+    в реестр после успешного извлечения (add): копия документа, извлечь который
+    не удалось, дубликатом не считается.
+    """
+
+    # Версия расположения проб: отпечатки разных версий несравнимы
+    VERSION = 2
+
+    def __init__(self, threshold: float = 0.6, min_page_ratio: float = 0.75, num_perm: int = 128,
+                 shingle_size: int = 3, probe_pages: int = 5, min_shingles: int = 20,
+                 min_page_chars: int = 50):
+        if not 0 < threshold <= 1 or not 0 < min_page_ratio <= 1:
+            raise ValueError("threshold и min_page_ratio должны быть в диапазоне (0, 1]")
+        self.threshold = threshold
+        self.min_page_ratio = min_page_ratio
+        self.shingle_size = shingle_size
+        self.probe_pages = probe_pages
+        # Пустые и почти пустые страницы не сравниваются: все чистые листы "похожи"
+        self.min_shingles = min_shingles
+        self.min_page_chars = min_page_chars
+        self.hasher = MinHasher(num_perm)
+        self.index = LSHIndex(num_perm, threshold)
+        self.fingerprints: Dict[str, DocumentFingerprint] = {}
+
+    @property
+    def settings(self) -> Dict:
+        """Параметры, от которых зависят отпечатки (сравнимы только при равных)"""
+        return {'version': self.VERSION, 'num_perm': self.hasher.num_perm, 'seed': self.hasher.seed, 'shingle_size': self.shingle_size,
+                'probe_pages': self.probe_pages, 'min_shingles': self.min_shingles,
+                'min_page_chars': self.min_page_chars}
+
+    def probe_page_numbers(self, page_count: int) -> List[int]:
+        """
+        Страницы-пробы (с 0) равномерно от начала до последней страницы;
+        обложка пропускается, если документ длиннее окна проб
+        """
+        start = 1 if page_count > self.probe_pages else 0
+        if page_count - start <= self.probe_pages:
+            return list(range(start, page_count))
+        span = page_count - 1 - start
+        steps = max(1, self.probe_pages - 1)
+        return [start + i * span // steps for i in range(self.probe_pages)]
+
+    def fingerprint(self, session, ocr_page: Optional[Callable[[int], str]] = None) -> Optional[DocumentFingerprint]:
+        """
+        Отпечаток документа сессии. Страницы без текстового слоя распознаются
+        через ocr_page(номер страницы с 0), если он передан. None - текста слишком мало.
+        """
+        np = get_engine('numpy')
+        signatures = []
+        ocr_pages = 0
+        page_numbers = self.probe_page_numbers(session.page_count)
+        for page_num in page_numbers:
+            text = session.get_text(page_num)
+            if len(text.strip()) < self.min_page_chars and ocr_page is not None:
+                text = ocr_page(page_num)
+                ocr_pages += 1
+            hashes = shingle_hashes(text, self.shingle_size)
+            if len(hashes) >= self.min_shingles:
+                signatures.append(self.hasher.signature(hashes))
+
+        if not signatures:
+            return None
+        return DocumentFingerprint(np.stack(signatures), session.page_count, len(page_numbers), ocr_pages)
+
+    def compare(self, first: DocumentFingerprint, second: DocumentFingerprint) -> Tuple[float, int]:
+        """Доля совпавших страниц (от большего числа проб) и число совпавших страниц"""
+        # Оценка Жаккара для всех пар страниц: (проб первого) x (проб второго)
+        similarity = (first.signatures[:, None, :] == second.signatures[None, :, :]).mean(axis=2)
+        matched = int((similarity.max(axis=1) >= self.threshold).sum())
+        return matched / max(len(first.signatures), len(second.signatures)), matched
+
+    def find(self, fingerprint: DocumentFingerprint) -> Optional[DuplicateMatch]:
+        """Самый похожий документ реестра не ниже порога"""
+        candidates = set()
+        for signature in fingerprint.signatures:
+            candidates.update(self.index.candidates(signature))
+
+        best = None
+        for key in candidates:
+            if self.fingerprints[key].pages != fingerprint.pages:
+                continue
+            ratio, matched = self.compare(fingerprint, self.fingerprints[key])
+            if ratio >= self.min_page_ratio and (best is None or ratio > best.similarity):
+                best = DuplicateMatch(key, round(ratio, 3), matched)
+        return best
+
+    def add(self, key: str, fingerprint: DocumentFingerprint):
+        if key in self.fingerprints:
+            return
+        self.fingerprints[key] = fingerprint
+        for signature in fingerprint.signatures:
+            self.index.add(key, signature)
+
+    def check(self, key: str, fingerprint: Optional[DocumentFingerprint]) -> Optional[DuplicateMatch]:
+        """
+        Поиск оригинала; если его нет - документ сразу регистрируется.
+        Документы с текстовым слоем только регистрируются: их сканированные
+        копии находят оригинал, а сами они извлекаются без OCR.
+        """
+        if fingerprint is None:
+            return None
+        match = None if fingerprint.text_layer else self.find(fingerprint)
+        if match is None:
+            self.add(key, fingerprint)
+        return match
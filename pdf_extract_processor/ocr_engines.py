@@ -0,0 +1,237 @@
+"""
+Движки OCR с единым интерфейсом
+
+tesserocr держит Tesseract API (с загруженными моделями rus+eng) всё время жизни
+процесса и принимает пиксели из памяти. pytesseract - запасной вариант:
+запуск процесса tesseract и временные файлы на каждую страницу.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .engines import get_engine, is_engine_available
+
+logger = logging.getLogger(__name__)
+
+# Переменная окружения с именем движка: auto, tesserocr или pytesseract
+OCR_ENGINE_ENV = 'PDF_EXTRACT_OCR_ENGINE'
+
+_PSM_RE = re.compile(r'--psm\s+(\d+)')
+_OEM_RE = re.compile(r'--oem\s+(\d+)')
+_VARIABLE_RE = re.compile(r'-c\s+(\w+)=(\S+)')
+
+
+def parse_tesseract_config(config: str) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+    """Разбор строки параметров tesseract: (psm, oem, переменные -c)"""
+    psm = _PSM_RE.search(config or '')
+    oem = _OEM_RE.search(config or '')
+    return (int(psm.group(1)) if psm else None,
+            int(oem.group(1)) if oem else None,
+            dict(_VARIABLE_RE.findall(config or '')))
+
+
+def ocr_data_to_text(data: Dict) -> Tuple[str, float]:
+    """Текст и средняя уверенность из результата image_to_data"""
+    paragraphs: Dict[Tuple[int, int], Dict[int, List[str]]] = {}
+    confidences = []
+
+    for i, word in enumerate(data['text']):
+        conf = float(data['conf'][i])
+        if conf < 0 or not word.strip():
+            continue
+        confidences.append(conf)
+        paragraph = paragraphs.setdefault((data['block_num'][i], data['par_num'][i]), {})
+        paragraph.setdefault(data['line_num'][i], []).append(word)
+
+    text = "\n\n".join("\n".join(" ".join(words) for words in lines.values())
+                       for lines in paragraphs.values())
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return (text + "\n" if text else ""), confidence
+
+
+class OCREngine:
+    """Базовый движок: распознавание изображения PIL"""
+    name = 'base'
+    _version: Optional[str] = None
+
+    @property
+    def version(self) -> str:
+        """Движок и версия Tesseract для ключей кэша: результаты разных версий не смешиваются"""
+        if self._version is None:
+            try:
+                self._version = f"{self.name} {self._tesseract_version()}"
+            except Exception:
+                self._version = f"{self.name} unknown"
+        return self._version
+
+    def _tesseract_version(self) -> str:
+        raise NotImplementedError
+
+    def image_to_string(self, image, lang: str, config: str = '') -> str:
+        raise NotImplementedError
+
+    def text_with_confidence(self, image, lang: str, config: str = '') -> Tuple[str, float]:
+        """Текст и средняя уверенность по словам (0-100)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractEngine(OCREngine):
+    """Прежнее поведение: отдельный процесс tesseract на каждый вызов"""
+    name = 'pytesseract'
+
+    def _tesseract_version(self) -> str:
+        return str(get_engine('pytesseract').get_tesseract_version())
+
+    def image_to_string(self, image, lang: str, config: str = '') -> str:
+        pytesseract = get_engine('pytesseract')
+        return pytesseract.image_to_string(image, lang=lang, config=config)
+
+    def text_with_confidence(self, image, lang: str, config: str = '') -> Tuple[str, float]:
+        pytesseract = get_engine('pytesseract')
+        data = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+        return ocr_data_to_text(data)
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Tesseract API через tesserocr: модели загружаются один раз на набор
+    (язык, psm, oem, переменные), изображение передаётся сырыми пикселями.
+    """
+    name = 'tesserocr'
+
+    def __init__(self, max_apis: int = 4, fallback: Optional[OCREngine] = None):
+        # Каждый API держит модели в памяти (~сотни МБ для rus+eng) - число ограничено
+        self.max_apis = max_apis
+        self.fallback = fallback
+        self._apis: "OrderedDict[Tuple, object]" = OrderedDict()
+        self._failed = False
+        # API Tesseract не потокобезопасен
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        # После сбоя tesserocr страницы распознаёт запасной движок
+        if self._failed or (self.fallback is not None and not is_engine_available('tesserocr')):
+            return self.fallback.version
+        return super().version
+
+    def _tesseract_version(self) -> str:
+        # Первая строка вида "tesseract 5.3.0"
+        return get_engine('tesserocr').tesseract_version().splitlines()[0]
+
+    def _api(self, lang: str, config: str):
+        psm, oem, variables = parse_tesseract_config(config)
+        key = (lang, psm, oem, tuple(sorted(variables.items())))
+        api = self._apis.get(key)
+        if api is not None:
+            self._apis.move_to_end(key)
+            return api
+
+        tesserocr = get_engine('tesserocr')
+        kwargs = {'lang': lang}
+        if psm is not None:
+            kwargs['psm'] = psm
+        if oem is not None:
+            kwargs['oem'] = oem
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in variables.items():
+            api.SetVariable(name, value)
+
+        self._apis[key] = api
+        while len(self._apis) > self.max_apis:
+            _, old_api = self._apis.popitem(last=False)
+            old_api.End()
+        return api
+
+    @staticmethod
+    def _set_image(api, image):
+        """Передача пикселей без кодирования во временный файл"""
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('RGB')
+        bytes_per_pixel = 1 if image.mode == 'L' else 3
+        api.SetImageBytes(image.tobytes(), image.width, image.height,
+                          bytes_per_pixel, image.width * bytes_per_pixel)
+
+    def _recognize(self, image, lang: str, config: str, with_confidence: bool):
+        with self._lock:
+            if not self._failed:
+                try:
+                    api = self._api(lang, config)
+                except (ImportError, RuntimeError) as e:
+                    if self.fallback is None:
+                        raise
+                    # Нет tesserocr или traineddata - дальше работает запасной движок
+                    logger.warning(f"tesserocr недоступен ({e}), используется {self.fallback.name}")
+                    self._failed = True
+                else:
+                    self._set_image(api, image)
+                    text = api.GetUTF8Text()
+                    return (text, float(api.MeanTextConf())) if with_confidence else text
+
+        if with_confidence:
+            return self.fallback.text_with_confidence(image, lang, config)
+        return self.fallback.image_to_string(image, lang, config)
+
+    def image_to_string(self, image, lang: str, config: str = '') -> str:
+        return self._recognize(image, lang, config, with_confidence=False)
+
+    def text_with_confidence(self, image, lang: str, config: str = '') -> Tuple[str, float]:
+        return self._recognize(image, lang, config, with_confidence=True)
+
+    def close(self):
+        with self._lock:
+            for api in self._apis.values():
+                api.End()
+            self._apis.clear()
+
+
+OCR_ENGINE_NAMES = ('auto', TesserocrEngine.name, PytesseractEngine.name)
+
+# Экземпляры движков текущего процесса (модели живут между страницами и документами)
+_instances: Dict[str, OCREngine] = {}
+_instances_lock = threading.Lock()
+
+
+def resolve_ocr_engine_name(name: Optional[str] = None) -> str:
+    """Имя движка с учётом переменной окружения; auto - tesserocr, если установлен"""
+    name = name or os.environ.get(OCR_ENGINE_ENV) or 'auto'
+    if name not in OCR_ENGINE_NAMES:
+        raise ValueError(f"Неизвестный движок OCR: {name}")
+    if name == 'auto':
+        return TesserocrEngine.name if is_engine_available('tesserocr') else PytesseractEngine.name
+    return name
+
+
+def get_ocr_engine(name: Optional[str] = None) -> OCREngine:
+    """Движок OCR процесса; создаётся при первом обращении и переиспользуется"""
+    auto = (name or os.environ.get(OCR_ENGINE_ENV) or 'auto') == 'auto'
+    resolved = resolve_ocr_engine_name(name)
+    key = f"auto:{resolved}" if auto else resolved
+
+    engine = _instances.get(key)
+    if engine is not None:
+        return engine
+
+    with _instances_lock:
+        if key not in _instances:
+            if resolved == TesserocrEngine.name:
+                # В режиме auto при сбое инициализации API используется pytesseract
+                _instances[key] = TesserocrEngine(fallback=PytesseractEngine() if auto else None)
+            else:
+                _instances[key] = PytesseractEngine()
+        return _instances[key]
+
+
+def close_ocr_engines():
+    """Освобождение моделей всех движков процесса"""
+    with _instances_lock:
+        for engine in _instances.values():
+            engine.close()
+        _instances.clear()
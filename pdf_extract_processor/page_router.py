@@ -0,0 +1,119 @@
+"""
+Постраничная маршрутизация: текстовый слой или OCR
+
+Каждая страница классифицируется за один проход по длине текстового слоя,
+доле площади, занятой изображениями, и сведениям о шрифтах.
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional
+
+import fitz
+
+from .document_session import PDFDocumentSession
+
+ROUTE_TEXT = 'text_layer'
+ROUTE_OCR = 'ocr'
+
+# Шрифт невидимого текстового слоя, который добавляют OCR-программы (Tesseract, ABBYY)
+_OCR_LAYER_FONTS = ('GlyphLessFont',)
+
+
+@dataclass
+class PageRoute:
+    """Решение маршрутизатора для одной страницы"""
+    page_number: int  # Нумерация с 1
+    route: str
+    reason: str
+    text_length: int
+    image_coverage: float
+    fonts: int
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class PageRouter:
+    """Классификатор страниц для гибридного извлечения"""
+
+    def __init__(self, min_text_chars: int = 50, image_coverage_threshold: float = 0.6,
+                 sparse_text_chars: int = 300, max_garbage_ratio: float = 0.2):
+        self.min_text_chars = min_text_chars
+        # Страница почти целиком из изображения с небольшим текстом - скан со штампом/колонтитулом
+        self.image_coverage_threshold = image_coverage_threshold
+        self.sparse_text_chars = sparse_text_chars
+        # Доля нераспознаваемых символов, при которой текстовый слой считается битым
+        self.max_garbage_ratio = max_garbage_ratio
+
+    @property
+    def settings(self) -> Dict:
+        return {
+            'min_text_chars': self.min_text_chars,
+            'image_coverage_threshold': self.image_coverage_threshold,
+            'sparse_text_chars': self.sparse_text_chars,
+            'max_garbage_ratio': self.max_garbage_ratio
+        }
+
+    def route_document(self, session: PDFDocumentSession,
+                       page_nums: Optional[Iterable[int]] = None) -> List[PageRoute]:
+        """Маршруты страниц документа (по умолчанию - всех; page_nums нумеруются с 0)"""
+        if page_nums is None:
+            page_nums = range(session.page_count)
+        return [self.classify_page(session.get_page(page_num), session.get_text(page_num, cache=False),
+                                   page_num + 1)
+                for page_num in page_nums]
+
+    def classify_page(self, page: fitz.Page, text: str, page_number: int) -> PageRoute:
+        stripped = text.strip()
+        text_length = len(stripped)
+        coverage = self._image_coverage(page)
+        fonts = page.get_fonts()
+
+        def route(kind: str, reason: str) -> PageRoute:
+            return PageRoute(page_number, kind, reason, text_length, round(coverage, 3), len(fonts))
+
+        if text_length < self.min_text_chars:
+            if coverage == 0.0:
+                return route(ROUTE_TEXT, 'blank_page')
+            return route(ROUTE_OCR, 'no_text_layer')
+
+        if self._garbage_ratio(stripped) > self.max_garbage_ratio:
+            return route(ROUTE_OCR, 'broken_text_encoding')
+
+        if any(font[3] in _OCR_LAYER_FONTS for font in fonts):
+            return route(ROUTE_TEXT, 'existing_ocr_layer')
+
+        if coverage >= self.image_coverage_threshold and text_length < self.sparse_text_chars:
+            return route(ROUTE_OCR, 'scan_with_sparse_text')
+
+        return route(ROUTE_TEXT, 'text_layer')
+
+    @staticmethod
+    def _image_coverage(page: fitz.Page) -> float:
+        """Доля площади страницы, покрытая изображениями (без повторного декодирования)"""
+        page_rect = page.rect
+        page_area = page_rect.width * page_rect.height
+        if page_area <= 0:
+            return 0.0
+
+        covered = 0.0
+        for info in page.get_image_info():
+            bbox = fitz.Rect(info['bbox']) & page_rect
+            if not bbox.is_empty:
+                covered += bbox.width * bbox.height
+        return min(covered / page_area, 1.0)
+
+    @staticmethod
+    def _garbage_ratio(text: str) -> float:
+        """Доля символов замены и управляющих символов (шрифты без ToUnicode)"""
+        garbage = sum(1 for ch in text if ch == '\ufffd' or (ord(ch) < 32 and ch not in '\n\r\t'))
+        return garbage / len(text)
+
+
+def summarize_routes(routes: List[PageRoute]) -> Dict:
+    """Сводка маршрутизации для отчёта"""
+    summary = {'pages': len(routes), ROUTE_TEXT: 0, ROUTE_OCR: 0, 'reasons': {}}
+    for route in routes:
+        summary[route.route] += 1
+        summary['reasons'][route.reason] = summary['reasons'].get(route.reason, 0) + 1
+    return summary
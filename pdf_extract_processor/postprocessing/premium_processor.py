@@ -3,71 +3,101 @@
 Основан на коде из исследовательского ноутбука
 """
 
-import re
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 
-def process_any_text_to_premium_fixed(text: str) -> str:
+from ..utils.multi_replace import MultiReplacer
+from ..utils.text_stream import iter_lines
+
+# БЕЗОПАСНЫЕ исправления (только очевидные OCR ошибки)
+SAFE_FIXES = {
+    'соответствипунктом': 'соответствии с пунктом',
+    'лицензированиотдельных': 'лицензировании отдельных',
+    'фармацевтической': 'фармацевтической',
+    'нформация документе': 'Информация о документе',
+    'пнадзору': 'по надзору',
+    'ЗДРАВООХРАНЕНЯ': 'ЗДРАВООХРАНЕНИЯ',
+    'СТРАНЦА': 'СТРАНИЦА',
+}
+
+# Исправления не содержат переводов строк, поэтому применяются построчно одним проходом
+_SAFE_REPLACER = MultiReplacer(SAFE_FIXES)
+
+
+def iter_premium_text(text: str) -> Iterator[str]:
     """
-    🔧 ИСПРАВЛЕННАЯ постобработка без порчи текста
+    Постобработка за один проход по строкам: исправления, структура абзацев
+    и схлопывание пустых строк (не больше двух переводов строки подряд).
+    Склейка выданных фрагментов совпадает с телом process_any_text_to_premium_fixed.
     """
-    
-    if not text or len(text.strip()) < 10:
-        return "# Ошибка\n\nТекст слишком короткий"
+    pending_newlines = 0
+    first = True
+
+    for line in iter_lines(text):
+        if not first:
+            pending_newlines += 1
+        first = False
 
-    # БЕЗОПАСНЫЕ исправления (только очевидные OCR ошибки)
-    safe_fixes = {
-        'соответствипунктом': 'соответствии с пунктом',
-        'лицензированиотдельных': 'лицензировании отдельных',
-        'фармацевтической': 'фармацевтической',
-        'нформация документе': 'Информация о документе',
-        'пнадзору': 'по надзору',
-        'ЗДРАВООХРАНЕНЯ': 'ЗДРАВООХРАНЕНИЯ',
-        'СТРАНЦА': 'СТРАНИЦА',
-    }
-
-    # Применяем ТОЛЬКО безопасные исправления
-    for error, fix in safe_fixes.items():
-        if error in text:
-            text = text.replace(error, fix)
-
-    # Безопасное улучшение структуры
-    lines = text.split('\n')
-    improved_lines = []
-
-    for line in lines:
-        line = line.strip()
+        # Применяем ТОЛЬКО безопасные исправления
+        line = _SAFE_REPLACER.apply(line).strip()
         if not line:
-            improved_lines.append('')
             continue
 
-        # НЕ ТРОГАЕМ уже хорошие заголовки
-        if line.startswith('#'):
-            improved_lines.append(line)
-            continue
+        # Три и более перевода строки подряд сокращаются до двух
+        yield '\n' * min(pending_newlines, 2) + line
+        pending_newlines = 0
+
+        # Простое улучшение абзацев (заголовки не трогаем)
+        if not line.startswith('#') and len(line) > 100 and line.endswith('.'):
+            pending_newlines += 1  # Добавляем перенос
 
-        # Простое улучшение абзацев
-        if len(line) > 100 and line.endswith('.'):
-            improved_lines.append(line)
-            improved_lines.append('')  # Добавляем перенос
-        else:
-            improved_lines.append(line)
+    if pending_newlines:
+        yield '\n' * min(pending_newlines, 2)
 
-    result = '\n'.join(improved_lines)
+
+def process_any_text_to_premium_fixed(text: str) -> str:
+    """
+    🔧 ИСПРАВЛЕННАЯ постобработка без порчи текста
+    """
     
-    # Безопасная очистка множественных переносов
-    result = re.sub(r'\n{3,}', '\n\n', result)
+    if not text or len(text.strip()) < 10:
+        return "# Ошибка\n\nТекст слишком короткий"
+
+    result = ''.join(iter_premium_text(text))
     
     # Добавляем метку обработки
     result += f'\n\n---\n\n*Документ обработан улучшенной системой {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}*'
     
     return result
 
+
+def _process_chunk(texts: List[str]) -> List[str]:
+    """Обработка порции текстов в процессе-воркере"""
+    return [process_any_text_to_premium_fixed(text) for text in texts]
+
+
+def _iter_chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Порции входных текстов; вход читается лениво"""
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 class PremiumPostProcessor:
     """Премиум класс постобработки"""
     
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
+        # Пакетный режим: число процессов (по умолчанию один, как раньше; 0 - по числу ядер) и размер порции
+        self.workers = self.config.get('workers', 1)
+        self.chunk_size = self.config.get('chunk_size', 64)
         
     def process(self, text: str) -> str:
         """Обработка текста"""
@@ -75,4 +105,44 @@ class PremiumPostProcessor:
         
     def batch_process(self, texts: List[str]) -> List[str]:
         """Пакетная обработка"""
-        return [self.process(text) for text in texts]
+        return list(self.iter_batch_process(texts))
+
+    def iter_batch_process(self, texts: Iterable[str], workers: Optional[int] = None,
+                           chunk_size: Optional[int] = None) -> Iterator[str]:
+        """
+        Пакетная обработка (пулом процессов при workers > 1, 0 - по числу ядер):
+        входные тексты читаются порциями, результаты выдаются в исходном порядке
+        по мере готовности.
+        """
+        workers = self.workers if workers is None else workers
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        chunk_size = max(1, chunk_size or self.chunk_size)
+        chunks = _iter_chunks(texts, chunk_size)
+
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            return
+        second_chunk = next(chunks, None)
+
+        # Одна порция или один процесс - пул не окупается
+        if workers <= 1 or second_chunk is None:
+            for chunk in (first_chunk, second_chunk):
+                if chunk is not None:
+                    yield from _process_chunk(chunk)
+            for chunk in chunks:
+                yield from _process_chunk(chunk)
+            return
+
+        pending_chunks = itertools.chain([first_chunk, second_chunk], chunks)
+        # Ограничение порций в полёте: корпус не материализуется в памяти целиком
+        max_in_flight = workers * 2
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for chunk in pending_chunks:
+                in_flight.append(executor.submit(_process_chunk, chunk))
+                if len(in_flight) >= max_in_flight:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+
@@ -0,0 +1,294 @@
+"""
+Профилирование медленных документов (включается явно)
+
+Документ профилируется cProfile целиком; по отдельному флагу память Python
+отслеживается tracemalloc: пик на документ и на секцию (методы извлечения).
+Сохраняются дампы только N самых медленных документов: <имя>.prof (открывается
+в snakeviz) и <имя>.memory.txt, список - в profiles.json.
+
+    PDF_EXTRACT_PROFILE_DIR=./профили PDF_EXTRACT_PROFILE_MEMORY=1 python обработка.py
+    snakeviz ./профили/документ-1a2b3c4d.prof
+
+tracemalloc замедляет выделения памяти в разы, поэтому по умолчанию выключен.
+Он видит только выделения Python (включая numpy); буферы MuPDF и PIL в отчёт
+не попадают - для них приводится пиковый RSS процесса.
+"""
+
+import contextlib
+import cProfile
+import functools
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .metrics import cpu_time
+
+PROFILE_DIR_ENV = 'PDF_EXTRACT_PROFILE_DIR'
+PROFILE_TOP_ENV = 'PDF_EXTRACT_PROFILE_TOP'
+PROFILE_MEMORY_ENV = 'PDF_EXTRACT_PROFILE_MEMORY'
+INDEX_FILENAME = 'profiles.json'
+
+_MB = 1024 * 1024
+
+
+def _max_rss_mb() -> float:
+    """Пиковый RSS процесса за всё время работы (0 - недоступно на платформе)"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS - байты
+    return max_rss / _MB if sys.platform == 'darwin' else max_rss / 1024
+
+
+@dataclass
+class DocumentProfile:
+    """Итог профилирования документа"""
+    source: str
+    wall_seconds: float
+    cpu_seconds: float
+    peak_python_mb: float  # Пик tracemalloc (0 - память не отслеживалась)
+    max_rss_mb: float
+    sections: Dict[str, Dict] = field(default_factory=dict)
+    profile_path: Optional[str] = None
+    memory_path: Optional[str] = None
+
+
+class _ActiveDocument:
+    def __init__(self, source: str):
+        self.source = source
+        self.sections: Dict[str, Dict] = {}
+        self.peak = 0
+
+
+class DocumentProfiler:
+    """
+    Профилировщик документов процессора. keep - сколько самых медленных документов
+    хранить; дампы вытесненных документов удаляются. trace_memory - отслеживать
+    память Python через tracemalloc (заметно замедляет обработку).
+    """
+
+    def __init__(self, output_dir: str, keep: int = 5, trace_memory: bool = False, memory_top: int = 25,
+                 index_name: str = INDEX_FILENAME):
+        if keep < 1:
+            raise ValueError("keep должен быть не меньше 1")
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.keep = keep
+        self.trace_memory = trace_memory
+        self.memory_top = memory_top
+        self.index_path = os.path.join(output_dir, index_name)
+        # Сохранённые документы, от самого медленного
+        self.kept: List[DocumentProfile] = []
+        self._active: Optional[_ActiveDocument] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["DocumentProfiler"]:
+        """Профилировщик по переменным окружения; None - профилирование выключено"""
+        output_dir = os.environ.get(PROFILE_DIR_ENV)
+        if not output_dir:
+            return None
+        trace_memory = os.environ.get(PROFILE_MEMORY_ENV, '').lower() in ('1', 'true', 'yes')
+        return cls(output_dir, int(os.environ.get(PROFILE_TOP_ENV, 5)), trace_memory)
+
+    @property
+    def active(self) -> bool:
+        return self._active is not None
+
+    def _fold_peak(self):
+        """Пик tracemalloc с прошлого сброса учитывается в пике документа"""
+        if self._active is not None and tracemalloc.is_tracing():
+            self._active.peak = max(self._active.peak, tracemalloc.get_traced_memory()[1])
+
+    @contextlib.contextmanager
+    def document(self, source: str) -> Iterator[None]:
+        """Профилирование документа; вложенные вызовы не начинают новый профиль"""
+        if self._active is not None:
+            yield
+            return
+
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+        active = self._active = _ActiveDocument(source)
+        profile = cProfile.Profile()
+        start_wall, start_cpu = time.perf_counter(), cpu_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall, cpu = time.perf_counter() - start_wall, cpu_time() - start_cpu
+            self._fold_peak()
+            self._active = None
+            snapshot = None
+            if tracemalloc.is_tracing() and self._qualifies(source, wall):
+                snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+
+            result = DocumentProfile(source, round(wall, 3), round(cpu, 3), round(active.peak / _MB, 1),
+                                     round(_max_rss_mb(), 1), active.sections)
+            if self._qualifies(source, wall):
+                self._save(result, profile, snapshot)
+
+    @contextlib.contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Время и пик памяти Python секции текущего документа"""
+        active = self._active
+        if active is None:
+            yield
+            return
+
+        self._fold_peak()
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+            self._fold_peak()
+            stats = active.sections.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'peak_python_mb': 0.0})
+            stats['calls'] += 1
+            stats['wall_seconds'] = round(stats['wall_seconds'] + time.perf_counter() - start, 3)
+            stats['peak_python_mb'] = max(stats['peak_python_mb'], round(peak / _MB, 1))
+
+    def _qualifies(self, source: str, wall: float) -> bool:
+        """Входит ли документ в N самых медленных (повтор документа - только если медленнее)"""
+        for kept in self.kept:
+            if kept.source == source:
+                return wall > kept.wall_seconds
+        return len(self.kept) < self.keep or wall > self.kept[-1].wall_seconds
+
+    def _save(self, result: DocumentProfile, profile: cProfile.Profile, snapshot):
+        stem = os.path.splitext(os.path.basename(result.source))[0]
+        digest = hashlib.sha1(os.path.abspath(result.source).encode('utf-8')).hexdigest()[:8]
+        base = os.path.join(self.output_dir, f"{stem}-{digest}")
+
+        result.profile_path = base + '.prof'
+        profile.dump_stats(result.profile_path)
+        result.memory_path = base + '.memory.txt'
+        with open(result.memory_path, 'w', encoding='utf-8') as f:
+            f.write(self._memory_report(result, snapshot))
+
+        # Прежняя запись того же документа заменяется (файлы уже перезаписаны)
+        self.kept = [kept for kept in self.kept if kept.source != result.source]
+        self.kept.append(result)
+        self.kept.sort(key=lambda kept: -kept.wall_seconds)
+        for evicted in self.kept[self.keep:]:
+            _remove_files(asdict(evicted))
+        del self.kept[self.keep:]
+        _write_index(self.index_path, [asdict(kept) for kept in self.kept])
+
+    def _memory_report(self, result: DocumentProfile, snapshot) -> str:
+        lines = [f"Документ: {result.source}",
+                 f"Время: {result.wall_seconds:.1f} с (CPU {result.cpu_seconds:.1f} с)",
+                 (f"Пик памяти Python (tracemalloc): {result.peak_python_mb:.1f} МБ" if self.trace_memory
+                  else "Память Python не отслеживалась (включается trace_memory)"),
+                 f"Пиковый RSS процесса: {result.max_rss_mb:.0f} МБ", ""]
+        if result.sections:
+            lines.append("Секции:")
+            for name, stats in result.sections.items():
+                lines.append(f"  {name}: вызовов {stats['calls']}, {stats['wall_seconds']:.1f} с, "
+                             f"пик {stats['peak_python_mb']:.1f} МБ")
+            lines.append("")
+        if snapshot is not None:
+            snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                               tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                                               tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>")))
+            lines.append(f"Живые выделения на конец документа (топ {self.memory_top}):")
+            for stat in snapshot.statistics('lineno')[:self.memory_top]:
+                frame = stat.traceback[0]
+                lines.append(f"  {frame.filename}:{frame.lineno}: {stat.size / _MB:.2f} МБ, блоков {stat.count}")
+        return "\n".join(lines) + "\n"
+
+
+def profiled(section: Optional[str] = None) -> Callable:
+    """
+    Декоратор метода процессора, первый аргумент которого - путь к PDF.
+    Без профилировщика (self.profiler is None) метод вызывается напрямую. Вне
+    профилируемого документа вызов профилируется как документ, внутри - как
+    секция (по умолчанию - имя метода).
+    """
+    def decorator(method: Callable) -> Callable:
+        name = section or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, file_path, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None:
+                return method(self, file_path, *args, **kwargs)
+            if not profiler.active:
+                with profiler.document(file_path):
+                    return method(self, file_path, *args, **kwargs)
+            with profiler.section(name):
+                return method(self, file_path, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def merge_profile_indexes(output_dir: str, keep: int) -> List[Dict]:
+    """
+    Слияние списков профилей воркеров (profiles.*.json) в profiles.json:
+    остаются N самых медленных документов пакета, дампы остальных удаляются.
+    """
+    entries = _read_index(os.path.join(output_dir, INDEX_FILENAME))
+    worker_indexes = glob.glob(os.path.join(output_dir, 'profiles.*.json'))
+    for path in worker_indexes:
+        entries.extend(_read_index(path))
+
+    # Документ мог попасть в списки нескольких воркеров - берётся самый медленный прогон
+    by_source: Dict[str, Dict] = {}
+    for entry in sorted(entries, key=lambda entry: -entry['wall_seconds']):
+        by_source.setdefault(entry['source'], entry)
+    merged = sorted(by_source.values(), key=lambda entry: -entry['wall_seconds'])
+
+    kept_files = {path for entry in merged[:keep] for path in (entry['profile_path'], entry['memory_path'])}
+    for entry in entries:
+        if entry['profile_path'] not in kept_files:
+            _remove_files(entry)
+
+    _write_index(os.path.join(output_dir, INDEX_FILENAME), merged[:keep])
+    for path in worker_indexes:
+        os.remove(path)
+    return merged[:keep]
+
+
+def worker_index_name(pid: int) -> str:
+    """Имя списка профилей процесса-воркера (сливаются merge_profile_indexes)"""
+    return f"profiles.{pid}.json"
+
+
+def _read_index(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return []
+
+
+def _write_index(path: str, entries: List[Dict]):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _remove_files(entry: Dict):
+    for key in ('profile_path', 'memory_path'):
+        if entry.get(key):
+            with contextlib.suppress(OSError):
+                os.remove(entry[key])
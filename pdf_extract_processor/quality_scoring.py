@@ -0,0 +1,165 @@
+"""
+Пакетная оценка качества страниц по миниатюрам
+
+Страницы рендерятся в миниатюры (длинная сторона - несколько сотен пикселей),
+складываются в один массив NumPy и оцениваются пакетом: резкость (дисперсия
+лапласиана), контраст (разброс гистограммы) и яркость - по шкале прежней
+оценки анализатора. Карта качества строится для любых страниц документа;
+для вердикта по документу берётся равномерная выборка страниц.
+"""
+
+from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from .document_session import PDFDocumentSession
+from .engines import get_engine
+from .utils.image_buffers import render_page, pixmap_to_array
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Пороги оценки -> метод OCR (как у документного вердикта анализатора)
+OCR_METHOD_THRESHOLDS: Tuple[Tuple[float, str], ...] = ((0.8, 'ocr_simple'), (0.6, 'ocr_enhanced'))
+OCR_FALLBACK_METHOD = 'ocr_advanced'
+# Страниц в выборке для вердикта по документу
+DEFAULT_SAMPLE_PAGES = 16
+
+
+def sample_page_numbers(page_count: int, max_pages: int = DEFAULT_SAMPLE_PAGES) -> List[int]:
+    """Равномерная выборка не более max_pages страниц (нумерация с 0), первая страница всегда входит"""
+    if page_count <= max_pages:
+        return list(range(page_count))
+    step = page_count / max_pages
+    return [int(i * step) for i in range(max_pages)]
+
+
+def ocr_method_for_score(score: float) -> str:
+    """Метод OCR для оценки качества изображения"""
+    for threshold, method in OCR_METHOD_THRESHOLDS:
+        if score > threshold:
+            return method
+    return OCR_FALLBACK_METHOD
+
+
+@dataclass
+class PageQuality:
+    """Оценка качества изображения одной страницы"""
+    page_number: int  # Нумерация с 1
+    score: float
+    sharpness: float
+    contrast: float
+    brightness: float
+    method: str
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class ThumbnailQualityScorer:
+    """Оценка качества страниц пакетами миниатюр"""
+
+    def __init__(self, thumbnail_side: int = 384, batch_size: int = 32,
+                 sharpness_norm: float = 1000.0, contrast_norm: float = 128.0):
+        self.thumbnail_side = thumbnail_side
+        self.batch_size = batch_size
+        # Шкала прежней оценки анализатора: уровни качества документов не меняются без калибровки
+        self.sharpness_norm = sharpness_norm
+        self.contrast_norm = contrast_norm
+
+    @property
+    def settings(self) -> Dict:
+        return {
+            'thumbnail_side': self.thumbnail_side,
+            'sharpness_norm': self.sharpness_norm,
+            'contrast_norm': self.contrast_norm
+        }
+
+    def score_document(self, session: PDFDocumentSession,
+                       page_nums: Optional[Iterable[int]] = None) -> List[PageQuality]:
+        """Карта качества страниц документа (по умолчанию - всех)"""
+        if page_nums is None:
+            page_nums = range(session.page_count)
+        page_nums = list(page_nums)
+
+        results = []
+        for start in range(0, len(page_nums), self.batch_size):
+            batch_pages = page_nums[start:start + self.batch_size]
+            batch, heights, widths = self._render_batch(session, batch_pages)
+            scores = self.score_batch(batch, heights, widths)
+            results.extend(PageQuality(page_num + 1, *values, ocr_method_for_score(values[0]))
+                           for page_num, values in zip(batch_pages, scores))
+        return results
+
+    def _render_batch(self, session: PDFDocumentSession,
+                      page_nums: List[int]) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Миниатюры страниц на общем холсте (B, H, W); поля заполнены белым"""
+        np = get_engine('numpy')
+        side = self.thumbnail_side
+        batch = np.full((len(page_nums), side, side), 255, dtype=np.uint8)
+        heights = np.zeros(len(page_nums), dtype=np.int64)
+        widths = np.zeros(len(page_nums), dtype=np.int64)
+
+        for i, page_num in enumerate(page_nums):
+            page = session.get_page(page_num)
+            longest = max(page.rect.width, page.rect.height)
+            if longest <= 0:
+                continue
+            # MuPDF декодирует изображения страницы сразу с уменьшением
+            pix = render_page(page, side / longest, gray=True)
+            thumbnail = pixmap_to_array(pix)[:side, :side]
+            height, width = thumbnail.shape
+            batch[i, :height, :width] = thumbnail
+            heights[i], widths[i] = height, width
+            del thumbnail, pix
+
+        # Холст обрезается по самой большой миниатюре пакета (страницы одной ориентации - без полей)
+        return batch[:, :max(heights.max(), 1), :max(widths.max(), 1)], heights, widths
+
+    def score_batch(self, batch: "np.ndarray", heights: "np.ndarray",
+                    widths: "np.ndarray") -> List[Tuple[float, float, float, float]]:
+        """
+        Оценки (итог, резкость, контраст, яркость) для пакета миниатюр.
+        Учитываются только пиксели внутри (height, width) каждой страницы.
+        """
+        np = get_engine('numpy')
+        count, rows_count, cols_count = batch.shape
+        if count == 0:
+            return []
+
+        pixels = heights * widths
+        valid = pixels > 0
+        pixels = np.maximum(pixels, 1)
+
+        # Резкость: дисперсия дискретного лапласиана по внутренним пикселям.
+        # int16 вмещает значения лапласиана uint8 (-1020..1020) и вдвое быстрее float32
+        x = batch.astype(np.int16)
+        laplacian = (x[:, :-2, 1:-1] + x[:, 2:, 1:-1] + x[:, 1:-1, :-2] + x[:, 1:-1, 2:]
+                     - 4 * x[:, 1:-1, 1:-1])
+        del x
+        inner = (np.arange(rows_count - 2)[None, :, None] < heights[:, None, None] - 2) & \
+                (np.arange(cols_count - 2)[None, None, :] < widths[:, None, None] - 2)
+        inner_count = np.maximum(inner.sum(axis=(1, 2)), 1)
+        laplacian *= inner
+        lap_mean = laplacian.sum(axis=(1, 2), dtype=np.int64) / inner_count
+        laplacian = laplacian.astype(np.int32)
+        lap_var = np.einsum('ijk,ijk->i', laplacian, laplacian, dtype=np.int64) / inner_count - lap_mean ** 2
+        sharpness = np.minimum(lap_var / self.sharpness_norm, 1.0)
+        del laplacian, inner
+
+        # Контраст: стандартное отклонение гистограммы, как в прежней оценке
+        # (по bincount на страницу - без масок на весь пакет)
+        hist = np.stack([np.bincount(batch[i, :heights[i], :widths[i]].ravel(), minlength=256)
+                         for i in range(count)])
+        contrast = hist.std(axis=1) / self.contrast_norm
+
+        # Яркость: как в документной оценке анализатора
+        mean_brightness = (hist * np.arange(256)).sum(axis=1) / pixels
+        brightness = 1.0 - np.abs(mean_brightness - 127) / 127.0
+
+        # Итог ограничивается сверху целиком, контраст в сумме - без ограничения (как прежде)
+        total = np.minimum(sharpness * 0.4 + contrast * 0.4 + brightness * 0.2, 1.0)
+        total = np.where(valid, total, 0.0)
+        contrast = np.minimum(contrast, 1.0)
+
+        return [(round(float(t), 4), round(float(s), 4), round(float(c), 4), round(float(b), 4))
+                for t, s, c, b in zip(total, sharpness, contrast, brightness)]
@@ -0,0 +1,221 @@
+"""
+Разбиение очищенных НПА на фрагменты для RAG
+
+Фрагменты следуют структуре, которую размечает clean_npa_for_rag:
+орган власти (#), тип документа (##) и пункт (###). Граница пункта всегда
+начинает новый фрагмент; длинные пункты режутся по абзацам, предложениям
+или словам с перекрытием. Фрагменты выдаются по одному и пишутся в JSONL
+построчно, поэтому размер корпуса не влияет на память.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Union
+
+# Средняя длина токена для русского текста у BPE-токенизаторов (символов)
+CHARS_PER_TOKEN = 3.0
+
+_CLAUSE_NUMBER_RE = re.compile(r'\d+')
+# Границы разреза по убыванию предпочтения: абзац, строка, предложение, слово
+_CUT_SEPARATORS = (('\n\n', 0), ('\n', 0), ('. ', 1), (' ', 0))
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов без токенизатора"""
+    if not text:
+        return 0
+    return max(1, round(len(text) / CHARS_PER_TOKEN))
+
+
+@dataclass
+class NPAChunk:
+    """Фрагмент документа с положением в структуре НПА"""
+    chunk_id: str
+    document: str
+    chunk_index: int  # Нумерация с 0 в пределах документа
+    text: str
+    body: Optional[str] = None  # Орган власти (#)
+    document_type: Optional[str] = None  # Тип документа (##)
+    clause: Optional[str] = None  # Номер пункта (###)
+    clause_part: int = 1  # Часть пункта при разбиении длинного пункта
+    char_count: int = 0
+    token_estimate: int = 0
+    metadata: Dict = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class NPAChunker:
+    """Структурное разбиение блоков clean_npa_for_rag на фрагменты"""
+
+    def __init__(self, max_chars: int = 2000, overlap_chars: int = 200):
+        if max_chars <= 0:
+            raise ValueError("max_chars должен быть положительным")
+        if not 0 <= overlap_chars < max_chars // 2:
+            raise ValueError("overlap_chars должен быть меньше половины max_chars")
+        self.max_chars = max_chars
+        self.overlap_chars = overlap_chars
+
+    def iter_chunks(self, blocks: Iterable[str], document: str,
+                    metadata: Optional[Dict] = None) -> Iterator[NPAChunk]:
+        """Фрагменты по очищенным блокам (результат iter_clean_npa_for_rag)"""
+        state = _ChunkState(self, document, metadata or {})
+
+        for block in blocks:
+            if block.startswith('### '):
+                yield from state.flush()
+                match = _CLAUSE_NUMBER_RE.match(block, 4)
+                state.clause = match.group() if match else None
+                yield from state.add(block[4:])
+            elif block.startswith('## '):
+                yield from state.flush()
+                state.document_type = block[3:]
+                state.clause = None
+            elif block.startswith('# '):
+                yield from state.flush()
+                state.body = block[2:]
+                state.document_type = None
+                state.clause = None
+            else:
+                yield from state.add(block)
+
+        yield from state.flush()
+
+    def iter_chunks_from_lines(self, lines: Iterable[str], document: str,
+                               metadata: Optional[Dict] = None) -> Iterator[NPAChunk]:
+        """Очистка и разбиение за один потоковый проход по строкам"""
+        from .rag_processor import iter_clean_npa_for_rag
+        return self.iter_chunks(iter_clean_npa_for_rag(lines), document, metadata)
+
+    def chunk_text(self, clean_text: str, document: str,
+                   metadata: Optional[Dict] = None) -> Iterator[NPAChunk]:
+        """Фрагменты готового результата clean_npa_for_rag"""
+        return self.iter_chunks((block for block in clean_text.split('\n\n') if block),
+                                document, metadata)
+
+    def _cut_position(self, text: str) -> int:
+        """Позиция разреза не дальше max_chars, по возможности на границе абзаца или предложения"""
+        limit = self.max_chars
+        for separator, keep in _CUT_SEPARATORS:
+            position = text.rfind(separator, limit // 2, limit)
+            if position != -1:
+                return position + keep
+        return limit
+
+    def _overlap_start(self, text: str, cut: int) -> int:
+        """Начало перекрытия: с границы слова не раньше cut - overlap_chars"""
+        if self.overlap_chars == 0:
+            return cut
+        position = text.find(' ', cut - self.overlap_chars, cut)
+        return position + 1 if position != -1 else cut
+
+
+class _ChunkState:
+    """Текущий раздел документа и ещё не выданный текст"""
+
+    def __init__(self, chunker: NPAChunker, document: str, metadata: Dict):
+        self.chunker = chunker
+        self.document = document
+        self.metadata = metadata
+        self.body: Optional[str] = None
+        self.document_type: Optional[str] = None
+        self.clause: Optional[str] = None
+        self.chunk_index = 0
+        self.clause_part = 1
+        self.pending = ''
+        self.carried = 0  # Длина перекрытия в начале pending (уже выдано)
+
+    def add(self, paragraph: str) -> Iterator[NPAChunk]:
+        self.pending = f"{self.pending}\n\n{paragraph}" if self.pending else paragraph
+
+        while len(self.pending) > self.chunker.max_chars:
+            cut = self.chunker._cut_position(self.pending)
+            yield self._emit(self.pending[:cut].rstrip())
+
+            start = self.chunker._overlap_start(self.pending, cut)
+            rest = self.pending[start:]
+            stripped = len(rest) - len(rest.lstrip())
+            self.pending = rest.lstrip()
+            self.carried = max(0, cut - start - stripped)
+
+    def flush(self) -> Iterator[NPAChunk]:
+        """Граница раздела: остаток выдаётся без перекрытия со следующим разделом"""
+        if self.pending[self.carried:].strip():
+            yield self._emit(self.pending.strip())
+        self.pending = ''
+        self.carried = 0
+        self.clause_part = 1
+
+    def _emit(self, text: str) -> NPAChunk:
+        chunk = NPAChunk(
+            chunk_id=f"{self.document}#{self.chunk_index}",
+            document=self.document,
+            chunk_index=self.chunk_index,
+            text=text,
+            body=self.body,
+            document_type=self.document_type,
+            clause=self.clause,
+            clause_part=self.clause_part,
+            char_count=len(text),
+            token_estimate=estimate_tokens(text),
+            metadata=self.metadata
+        )
+        self.chunk_index += 1
+        self.clause_part += 1
+        return chunk
+
+
+class JsonlChunkWriter:
+    """JSONL: одна строка на фрагмент; файл открывается один раз"""
+
+    def __init__(self, output: Union[str, TextIO], append: bool = False):
+        self._own_file = isinstance(output, (str, os.PathLike))
+        self._file = open(output, 'a' if append else 'w', encoding='utf-8') if self._own_file else output
+        self.chunks_written = 0
+        self.characters = 0
+        self.tokens = 0
+        self._closed = False
+
+    def write_chunk(self, chunk: NPAChunk):
+        self._file.write(json.dumps(chunk.to_dict(), ensure_ascii=False, default=str) + "\n")
+        self.chunks_written += 1
+        self.characters += chunk.char_count
+        self.tokens += chunk.token_estimate
+
+    def write_chunks(self, chunks: Iterable[NPAChunk]) -> Dict:
+        for chunk in chunks:
+            self.write_chunk(chunk)
+        return self.summary
+
+    @property
+    def summary(self) -> Dict:
+        return {
+            'chunks_written': self.chunks_written,
+            'characters': self.characters,
+            'token_estimate': self.tokens
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._own_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def write_chunks_jsonl(chunks: Iterable[NPAChunk], output: Union[str, TextIO],
+                       append: bool = False) -> Dict:
+    """Запись фрагментов в JSONL по одному; возвращает итоги"""
+    with JsonlChunkWriter(output, append) as writer:
+        return writer.write_chunks(chunks)
@@ -0,0 +1,117 @@
+"""
+Манифест корпуса для инкрементальной сборки
+
+Для каждого исходного файла хранятся хеш содержимого, настройки, с которыми он
+обработан, и пути его результатов (очищенный текст и фрагменты). При повторной
+сборке извлекаются и очищаются только новые и изменённые документы, а сборник
+и общий JSONL фрагментов собираются из готовых результатов документов.
+
+    corpus/
+        manifest.jsonl          - запись на документ (последняя запись по пути действует)
+        documents/<ключ>.md     - результат clean_npa_for_rag документа
+        documents/<ключ>.chunks.jsonl
+        сборник.md              - СБОРНИК НОРМАТИВНО-ПРАВОВЫХ АКТОВ
+        chunks.jsonl            - фрагменты всех документов
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from ..utils.extraction_cache import file_content_hash
+
+MANIFEST_FILENAME = 'manifest.jsonl'
+DOCUMENTS_DIRNAME = 'documents'
+COMBINED_FILENAME = 'сборник.md'
+CHUNKS_FILENAME = 'chunks.jsonl'
+
+
+class CorpusManifest:
+    """
+    Манифест документов корпуса: JSONL, запись дописывается сразу после обработки
+    документа, поэтому прерванная сборка продолжается с места остановки.
+    """
+
+    def __init__(self, corpus_dir: str):
+        self.corpus_dir = corpus_dir
+        self.path = os.path.join(corpus_dir, MANIFEST_FILENAME)
+        self.documents_dir = os.path.join(corpus_dir, DOCUMENTS_DIRNAME)
+        os.makedirs(self.documents_dir, exist_ok=True)
+        self.entries: Dict[str, Dict] = {}
+        self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Недописанная строка после аварийного завершения
+                if entry.get('removed'):
+                    self.entries.pop(entry['path'], None)
+                else:
+                    self.entries[entry['path']] = entry
+
+    def content_hash(self, path: str) -> str:
+        """Хеш содержимого; при неизменных размере и mtime берётся из манифеста"""
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            return entry['content_hash']
+        return file_content_hash(path)
+
+    def artifact_paths(self, path: str) -> Dict[str, str]:
+        """Пути результатов документа: ключ по пути файла, повторная обработка их перезаписывает"""
+        key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        return {
+            'clean_path': os.path.join(self.documents_dir, key + '.md'),
+            'chunks_path': os.path.join(self.documents_dir, key + '.chunks.jsonl')
+        }
+
+    def record(self, path: str, entry: Dict):
+        """Запись результата документа с немедленным сбросом на диск"""
+        stat = os.stat(path)
+        entry = dict(entry, path=path, size=stat.st_size, mtime=stat.st_mtime,
+                     processed_at=datetime.now().isoformat(timespec='seconds'))
+        self.entries[path] = entry
+        self._write(entry)
+
+    def remove(self, path: str) -> Optional[Dict]:
+        """Документ больше не входит в корпус: запись и результаты удаляются"""
+        entry = self.entries.pop(path, None)
+        if entry is None:
+            return None
+        self._write({'path': path, 'removed': True})
+        for key in ('clean_path', 'chunks_path'):
+            if entry.get(key) and os.path.exists(entry[key]):
+                os.remove(entry[key])
+        return entry
+
+    def _write(self, entry: Dict):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def compact(self):
+        """Перезапись манифеста только действующими записями (атомарно)"""
+        self._file.close()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
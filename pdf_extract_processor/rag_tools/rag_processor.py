@@ -5,93 +5,241 @@ RAG Tools для Extract_Processor
 
 import re
 import os
+import json
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 
-def clean_npa_for_rag(text: str, document_title: str = "") -> str:
+from ..document_session import PDFDocumentSession
+from ..utils.text_stream import iter_lines
+from .chunker import JsonlChunkWriter, NPAChunker, write_chunks_jsonl
+from .corpus_manifest import CHUNKS_FILENAME, COMBINED_FILENAME, CorpusManifest
+
+if TYPE_CHECKING:
+    from .search_index import BM25Index
+
+# Версия очистки: увеличивается при изменениях clean_npa_for_rag, меняющих результат,
+# чтобы инкрементальная сборка корпуса переочистила все документы
+CLEANING_VERSION = 1
+# Порядок и состав документов последней сборки сборника
+_COMBINED_STATE_FILENAME = '.combined.json'
+_COMBINED_TITLE = "# СБОРНИК НОРМАТИВНО-ПРАВОВЫХ АКТОВ"
+
+# Служебная информация системы обработки (шаг 1-2 очистки)
+_HEADER_MARKER = '# Извлеченный текст'
+_HEADER_END = '---'
+_SERVICE_PATTERNS = [
+    re.compile(r'# Извлеченный текст.*?---', re.DOTALL),
+    re.compile(r'\*\*Файл:\*\*.*?\n'),
+    re.compile(r'\*\*Качество:\*\*.*?\n'),
+    re.compile(r'\*\*Метод:\*\*.*?\n'),
+    re.compile(r'\*\*Уверенность:\*\*.*?\n'),
+    re.compile(r'--- Страница \d+ ---\n*'),
+    re.compile(r'=== Страница \d+ ===\n*'),
+]
+# Быстрая проверка строки: есть ли в ней что-то из служебной информации
+_SERVICE_MARKER_RE = re.compile(r'# Извлеченный текст|\*\*(?:Файл|Качество|Метод|Уверенность):\*\*'
+                                r'|--- Страница \d+ ---|=== Страница \d+ ===')
+
+# OCR артефакты: строки из 1-3 заглавных букв и из 1-3 знаков препинания
+_SHORT_CAPS_RE = re.compile(r'[А-Я]{1,3}\s*')
+_PUNCTUATION_RE = re.compile(r'[^\w\s]{1,3}')
+
+# Заголовки
+_AUTHORITY_PREFIXES = ('ПРАВИТЕЛЬСТВО', 'МИНИСТЕРСТВО', 'ФЕДЕРАЛЬНАЯ СЛУЖБА')
+_DOCUMENT_TYPES = frozenset(['ПОСТАНОВЛЕНИЕ', 'ПРИКАЗ', 'РАСПОРЯЖЕНИЕ', 'УКАЗ', 'РЕШЕНИЕ'])
+_CLAUSE_RE = re.compile(r'\d+\.\s+[А-ЯЁ]')
+_SPACES_RE = re.compile(r'  +')  # Одиночные пробелы не трогаем - замена только серий
+
+
+def _strip_service_info(lines: Iterable[str]) -> Iterator[str]:
     """
-    🧹 ИДЕАЛЬНАЯ ОЧИСТКА НПА ДЛЯ RAG-СИСТЕМЫ
-    Убираем ВСЮ служебную информацию, оставляем только содержание
+    Удаление служебной информации. Строки без маркеров проходят сразу; строки
+    с маркерами копятся до закрытия заголовка и первой чистой непустой строки,
+    после чего к небольшому буферу применяются те же выражения, что и к тексту целиком.
     """
-    
-    # 1. Убираем ВСЮ служебную информацию системы обработки
-    text = re.sub(r'# Извлеченный текст.*?---', '', text, flags=re.DOTALL)
-    text = re.sub(r'\*\*Файл:\*\*.*?\n', '', text)
-    text = re.sub(r'\*\*Качество:\*\*.*?\n', '', text)
-    text = re.sub(r'\*\*Метод:\*\*.*?\n', '', text)
-    text = re.sub(r'\*\*Уверенность:\*\*.*?\n', '', text)
-    
-    # 2. Убираем разделители страниц и служебные коды
-    text = re.sub(r'--- Страница \d+ ---\n*', '', text)
-    text = re.sub(r'=== Страница \d+ ===\n*', '', text)
-    
-    # 3. Убираем OCR артефакты
-    text = re.sub(r'\n[А-Я]{1,3}\s*\n', '\n', text)
-    text = re.sub(r'\n[^\w\s]{1,3}\n', '\n', text)
-    
-    # 4. Улучшаем структуру для RAG
-    lines = text.split('\n')
-    clean_lines = []
+    buffer: List[str] = []
+    header_open = False
 
     for line in lines:
-        line = line.strip()
-        if not line:
+        if not buffer:
+            if _SERVICE_MARKER_RE.search(line) is None:
+                yield line
+                continue
+        elif not header_open and _SERVICE_MARKER_RE.search(line) is None and line.strip('\n'):
+            # Чистая строка с текстом останавливает и '.*?\n', и '\n*' - буфер можно обработать,
+            # если удаления не склеили его конец со следующими строками
+            buffer.append(line)
+            cleaned = _apply_service_patterns(''.join(buffer))
+            if cleaned.endswith('\n'):
+                yield from iter_lines(cleaned, keepends=True)
+                buffer.clear()
             continue
 
-        # Главные заголовки органов власти
-        if re.match(r'(ПРАВИТЕЛЬСТВО|МИНИСТЕРСТВО|ФЕДЕРАЛЬНАЯ СЛУЖБА)', line):
-            clean_lines.append(f'# {line}')
+        buffer.append(line)
+        header_open = _header_state(line, header_open)
+
+    if buffer:
+        yield from iter_lines(_apply_service_patterns(''.join(buffer)), keepends=True)
+
+
+def _header_state(line: str, header_open: bool) -> bool:
+    """Открыт ли блок '# Извлеченный текст ... ---' после этой строки"""
+    position = 0
+    while True:
+        if header_open:
+            position = line.find(_HEADER_END, position)
+            if position == -1:
+                return True
+            header_open = False
+            position += len(_HEADER_END)
+        else:
+            position = line.find(_HEADER_MARKER, position)
+            if position == -1:
+                return False
+            header_open = True
+            position += len(_HEADER_MARKER)
+
+
+def _apply_service_patterns(text: str) -> str:
+    for pattern in _SERVICE_PATTERNS:
+        text = pattern.sub('', text)
+    return text
+
+
+def _drop_short_caps_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Построчный аналог re.sub(r'\\n[А-Я]{1,3}\\s*\\n', '\\n'): вместе со строкой удаляются
+    следующие пустые строки, а перевод строки перед следующей строкой поглощается.
+    """
+    preceded = False  # Перед первой строкой текста нет '\n'
+    skipping_blank = False
+    for line in lines:
+        terminated = line.endswith('\n')
+        if skipping_blank:
+            if terminated and line.isspace():
+                continue
+            skipping_blank = False
+        elif preceded and terminated and _SHORT_CAPS_RE.fullmatch(line, 0, len(line) - 1):
+            skipping_blank = True
+            preceded = False
+            continue
+        else:
+            preceded = True
+            yield line
             continue
+        # Первая строка после удалённого артефакта: её '\n' уже поглощён
+        yield line
+        preceded = True
 
-        # Тип документа
-        if line in ['ПОСТАНОВЛЕНИЕ', 'ПРИКАЗ', 'РАСПОРЯЖЕНИЕ', 'УКАЗ', 'РЕШЕНИЕ']:
-            clean_lines.append(f'## {line}')
+
+def _drop_punctuation_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Построчный аналог re.sub(r'\\n[^\\w\\s]{1,3}\\n', '\\n')"""
+    preceded = False
+    for line in lines:
+        if preceded and line.endswith('\n') and _PUNCTUATION_RE.fullmatch(line, 0, len(line) - 1):
+            preceded = False
             continue
+        yield line
+        preceded = True
 
-        # Основные пункты
-        if re.match(r'^\d+\.\s+[А-ЯЁ]', line):
-            clean_lines.append(f'### {line}')
+
+def iter_clean_npa_for_rag(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Потоковая очистка НПА: принимает строки с символами перевода строки
+    (как при чтении файла) и выдаёт очищенные блоки по одному.
+    Блоки, соединённые пустой строкой, дают результат clean_npa_for_rag.
+    """
+    for line in _drop_punctuation_lines(_drop_short_caps_lines(_strip_service_info(lines))):
+        line = line.strip()
+        if not line:
             continue
 
-        # Обычный текст
-        clean_lines.append(line)
+        # Главные заголовки органов власти
+        if line.startswith(_AUTHORITY_PREFIXES):
+            line = f'# {line}'
+        # Тип документа
+        elif line in _DOCUMENT_TYPES:
+            line = f'## {line}'
+        # Основные пункты
+        elif _CLAUSE_RE.match(line):
+            line = f'### {line}'
+
+        yield _SPACES_RE.sub(' ', line)
+
+
+def clean_npa_for_rag(text: str, document_title: str = "") -> str:
+    """
+    🧹 ИДЕАЛЬНАЯ ОЧИСТКА НПА ДЛЯ RAG-СИСТЕМЫ
+    Убираем ВСЮ служебную информацию, оставляем только содержание
+    """
+    return '\n\n'.join(iter_clean_npa_for_rag(iter_lines(text, keepends=True)))
+
 
-    # 5. Финальная очистка
-    result = '\n\n'.join([line for line in clean_lines if line.strip()])
-    result = re.sub(r' +', ' ', result)
-    result = re.sub(r'\n{3,}', '\n\n', result)
+def extract_text_layer(pdf_file: str) -> str:
+    """Текстовый слой PDF с разделителями страниц (их убирает clean_npa_for_rag)"""
+    with PDFDocumentSession(pdf_file) as session:
+        return ''.join(f"--- Страница {page_num + 1} ---\n{session.get_text(page_num, cache=False)}\n"
+                       for page_num in range(session.page_count))
 
-    return result.strip()
 
 class RAGDataProcessor:
     """Процессор для подготовки данных для RAG"""
     
-    def __init__(self):
+    def __init__(self, extractor: Optional[Callable[[str], str]] = None,
+                 chunker: Optional[NPAChunker] = None, extractor_settings: Optional[Dict] = None):
         self.processed_docs = []
+        # Извлечение текста из PDF: по умолчанию текстовый слой, для сканов - функция на базе OCR процессора
+        self.extractor = extractor or extract_text_layer
+        self.chunker = chunker or NPAChunker()
+        # Настройки извлечения (например, OCR): при их изменении документы корпуса извлекаются заново
+        self.extractor_settings = extractor_settings or {}
         
-    def process_multiple_npa(self, pdf_files: List[str]) -> str:
-        """Обработка нескольких НПА в один файл для RAG"""
+    def process_multiple_npa(self, pdf_files: List[str], chunks_path: Optional[str] = None,
+                             corpus_dir: Optional[str] = None) -> str:
+        """
+        Обработка нескольких НПА в один файл для RAG.
+        Если указан chunks_path, фрагменты документов пишутся туда в JSONL по мере обработки.
+        Если указан corpus_dir, сборка инкрементальная (см. update_corpus).
+        """
+        if corpus_dir is not None:
+            summary = self.update_corpus(pdf_files, corpus_dir)
+            if chunks_path:
+                _copy_file(summary['chunks_path'], chunks_path)
+            if not summary['documents']:
+                return ""
+            with open(summary['combined_path'], encoding='utf-8') as f:
+                return f.read()
         
         all_documents = []
+        chunk_writer = JsonlChunkWriter(chunks_path) if chunks_path else None
         
-        for pdf_file in pdf_files:
-            try:
-                # Здесь должна быть логика извлечения из PDF
-                # Пока заглушка
-                clean_text = f"Обработанный документ: {pdf_file}"
-                
-                all_documents.append({
-                    'filename': pdf_file,
-                    'content': clean_text,
-                    'size': len(clean_text)
-                })
-                
-            except Exception as e:
-                print(f"Ошибка с {pdf_file}: {e}")
+        try:
+            for pdf_file in pdf_files:
+                try:
+                    clean_text = clean_npa_for_rag(self.extractor(pdf_file))
+                    
+                    all_documents.append({
+                        'filename': pdf_file,
+                        'content': clean_text,
+                        'size': len(clean_text)
+                    })
+                    
+                    if chunk_writer is not None:
+                        metadata = {'source_file': os.path.basename(pdf_file)}
+                        chunk_writer.write_chunks(self.chunker.chunk_text(clean_text, pdf_file, metadata))
+                    
+                except Exception as e:
+                    print(f"Ошибка с {pdf_file}: {e}")
+        finally:
+            if chunk_writer is not None:
+                chunk_writer.close()
+                print(f"🧩 Фрагментов: {chunk_writer.chunks_written} → {chunks_path}")
+        
+        self.processed_docs.extend(doc['filename'] for doc in all_documents)
         
         # Объединяем документы
         if all_documents:
-            combined_content = ["# СБОРНИК НОРМАТИВНО-ПРАВОВЫХ АКТОВ", ""]
+            combined_content = [_COMBINED_TITLE, ""]
             
             for i, doc in enumerate(all_documents, 1):
                 combined_content.append(f"## Документ {i}: {doc['filename']}")
@@ -104,3 +252,185 @@ class RAGDataProcessor:
             return '\n'.join(combined_content)
         
         return ""
+
+    @property
+    def extraction_settings(self) -> Dict:
+        """Настройки, от которых зависит очищенный текст документа"""
+        return {'extractor': _callable_name(self.extractor), 'extractor_settings': self.extractor_settings,
+                'cleaning': CLEANING_VERSION}
+
+    @property
+    def chunking_settings(self) -> Dict:
+        return {'max_chars': self.chunker.max_chars, 'overlap_chars': self.chunker.overlap_chars}
+
+    def update_corpus(self, pdf_files: List[str], corpus_dir: str, index: Optional["BM25Index"] = None) -> Dict:
+        """
+        Инкрементальная сборка корпуса в corpus_dir по манифесту документов.
+
+        Извлекаются и очищаются только новые и изменённые файлы (или все - при смене
+        настроек извлечения); при смене настроек разбиения фрагменты строятся заново
+        из сохранённого очищенного текста. Файлы, которых нет в pdf_files, удаляются
+        из корпуса. Сборник и chunks.jsonl собираются из результатов документов, только
+        если что-то изменилось. Индекс BM25 (если передан) обновляется точечно:
+        фрагменты изменённых документов удаляются и добавляются заново.
+        """
+        stats = {'documents': 0, 'extracted': 0, 'rechunked': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        ordered: List[Tuple[str, Dict]] = []
+        stale_keys: List[str] = []
+        changed_chunks: List[str] = []
+
+        with CorpusManifest(corpus_dir) as manifest:
+            listed = set()
+            for pdf_file in pdf_files:
+                path = os.path.abspath(pdf_file)
+                if path in listed:
+                    continue
+                listed.add(path)
+                previous = manifest.entries.get(path)
+
+                try:
+                    entry, action = self._update_document(manifest, pdf_file, path)
+                except Exception as e:
+                    print(f"Ошибка с {pdf_file}: {e}")
+                    stats['failed'] += 1
+                    # Устаревший результат изменённого файла в корпусе не остаётся
+                    if manifest.remove(path) is not None:
+                        stale_keys.extend(_chunk_keys(previous))
+                    continue
+
+                stats[action] += 1
+                ordered.append((pdf_file, entry))
+                if action != 'unchanged':
+                    print(f"{'📄' if action == 'extracted' else '🧩'} {pdf_file}: {entry['chunks']} фрагментов")
+                    if previous is not None:
+                        stale_keys.extend(_chunk_keys(previous))
+                    changed_chunks.append(entry['chunks_path'])
+
+            for path in [path for path in manifest.entries if path not in listed]:
+                stale_keys.extend(_chunk_keys(manifest.remove(path)))
+                stats['removed'] += 1
+
+            manifest.compact()
+
+        stats['documents'] = len(ordered)
+        combined_path = os.path.join(corpus_dir, COMBINED_FILENAME)
+        chunks_path = os.path.join(corpus_dir, CHUNKS_FILENAME)
+        state = [[entry['path'], entry['content_hash'], entry['chunking']] for _, entry in ordered]
+        stats['combined_rebuilt'] = _write_combined(corpus_dir, ordered, state, combined_path, chunks_path)
+
+        if index is not None:
+            if index.doc_count == 0:
+                # Новый индекс: добавляются все документы корпуса
+                changed_chunks = [entry['chunks_path'] for _, entry in ordered]
+            elif stale_keys:
+                index.delete(stale_keys)
+            if changed_chunks:
+                index.add_chunks_jsonl(changed_chunks)
+
+        self.processed_docs.extend(pdf_file for pdf_file, _ in ordered)
+        print(f"📚 Корпус: {stats['documents']} документов, извлечено {stats['extracted']}, "
+              f"переразбито {stats['rechunked']}, без изменений {stats['unchanged']}, "
+              f"удалено {stats['removed']}, ошибок {stats['failed']}")
+        return dict(stats, combined_path=combined_path, chunks_path=chunks_path)
+
+    def _update_document(self, manifest: CorpusManifest, pdf_file: str, path: str) -> Tuple[Dict, str]:
+        """Результат документа: из манифеста, переразбиение очищенного текста или полная обработка"""
+        content_hash = manifest.content_hash(path)
+        extraction = self.extraction_settings
+        chunking = dict(self.chunking_settings, document=pdf_file)
+        entry = manifest.entries.get(path)
+
+        reusable = (entry is not None and entry['content_hash'] == content_hash
+                    and entry['extraction'] == extraction and os.path.exists(entry['clean_path']))
+        if reusable and entry['chunking'] == chunking and os.path.exists(entry['chunks_path']):
+            if os.path.getmtime(path) != entry['mtime']:
+                # Файл перезаписан тем же содержимым: обновляем mtime, чтобы не хешировать снова
+                manifest.record(path, _entry_fields(entry))
+            return manifest.entries[path], 'unchanged'
+
+        paths = manifest.artifact_paths(path)
+        if reusable:
+            action = 'rechunked'
+            with open(entry['clean_path'], encoding='utf-8') as f:
+                clean_text = f.read()
+        else:
+            action = 'extracted'
+            clean_text = clean_npa_for_rag(self.extractor(pdf_file))
+            _write_atomic(paths['clean_path'], clean_text)
+
+        metadata = {'source_file': os.path.basename(pdf_file)}
+        tmp_path = paths['chunks_path'] + '.tmp'
+        summary = write_chunks_jsonl(self.chunker.chunk_text(clean_text, pdf_file, metadata), tmp_path)
+        os.replace(tmp_path, paths['chunks_path'])
+
+        manifest.record(path, dict(paths, content_hash=content_hash, extraction=extraction, chunking=chunking,
+                                   chars=len(clean_text), chunks=summary['chunks_written']))
+        return manifest.entries[path], action
+
+
+def _callable_name(func: Callable) -> str:
+    """Имя функции извлечения для манифеста (у объектов - имя класса)"""
+    name = getattr(func, '__qualname__', None) or type(func).__qualname__
+    return f"{getattr(func, '__module__', None) or type(func).__module__}.{name}"
+
+
+def _chunk_keys(entry: Optional[Dict]) -> List[str]:
+    """Ключи фрагментов документа в индексе (chunk_id = документ#номер)"""
+    if not entry:
+        return []
+    document = entry['chunking']['document']
+    return [f"{document}#{i}" for i in range(entry.get('chunks', 0))]
+
+
+def _entry_fields(entry: Dict) -> Dict:
+    """Поля результата записи манифеста без отметок файла"""
+    return {key: value for key, value in entry.items() if key not in ('path', 'size', 'mtime', 'processed_at')}
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _copy_file(source: str, destination: str):
+    with open(destination, 'wb') as target:
+        _append_file(target, source)
+
+
+def _append_file(target, source: str, block_size: int = 1024 * 1024):
+    """Дописывание файла в открытый бинарный файл блоками"""
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            target.write(block)
+
+
+def _write_combined(corpus_dir: str, ordered: List[Tuple[str, Dict]], state: List,
+                    combined_path: str, chunks_path: str) -> bool:
+    """
+    Сборник и общий JSONL фрагментов из результатов документов (потоково, без извлечения).
+    Пропускается, если состав, порядок и результаты документов не изменились.
+    """
+    state_path = os.path.join(corpus_dir, _COMBINED_STATE_FILENAME)
+    if os.path.exists(combined_path) and os.path.exists(chunks_path) and os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            if json.load(f) == state:
+                return False
+
+    # Формат совпадает с process_multiple_npa без манифеста
+    with open(combined_path + '.tmp', 'wb') as combined:
+        combined.write((_COMBINED_TITLE + "\n").encode('utf-8'))
+        for i, (pdf_file, entry) in enumerate(ordered, 1):
+            combined.write(f"\n## Документ {i}: {pdf_file}\n\n".encode('utf-8'))
+            _append_file(combined, entry['clean_path'])
+            combined.write(b"\n\n---\n")
+
+    with open(chunks_path + '.tmp', 'wb') as chunks:
+        for _, entry in ordered:
+            _append_file(chunks, entry['chunks_path'])
+
+    os.replace(combined_path + '.tmp', combined_path)
+    os.replace(chunks_path + '.tmp', chunks_path)
+    _write_atomic(state_path, json.dumps(state, ensure_ascii=False))
+    return True
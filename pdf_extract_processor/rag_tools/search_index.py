@@ -0,0 +1,407 @@
+"""
+Локальный инвертированный индекс с ранжированием BM25
+
+Индекс состоит из неизменяемых сегментов: каждое добавление документов пишет
+новый сегмент, старые не перестраиваются. Списки вхождений (posting lists)
+хранятся в массивах NumPy на диске и при поиске отображаются в память (mmap),
+поэтому в памяти держатся только словари терминов. Статистика BM25 (N, средняя
+длина, df) считается по всем сегментам на момент запроса.
+
+    index/
+        segments.json       - список сегментов и удалённые документы
+        seg_000001/
+            terms.txt           - термины по порядку
+            term_offsets.npy    - границы списков вхождений терминов (int64)
+            doc_ids.npy         - локальные номера документов (int32)
+            tfs.npy             - частоты терминов (uint16)
+            doc_lengths.npy     - длины документов в терминах (int32)
+            docs.jsonl          - ключ, текст и метаданные документа
+            doc_offsets.npy     - смещения строк docs.jsonl (int64)
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import shutil
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from ..engines import get_engine
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS_FILENAME = 'segments.json'
+
+_WORD_RE = re.compile(r'[0-9a-zа-яё]+')
+
+RUSSIAN_STOPWORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне
+было вот от меня еще нет о из ему теперь когда даже ну ли если уже или ни быть был него до вас
+нибудь опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их
+чем была сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой
+ним здесь этом один почти мой тем чтобы нее были куда всех можно при об другой хоть после над
+больше тот через эти нас про всего них какая много три эту моя свою этой перед том такой им более
+всю между также который которые которых которым которой либо иные иных
+""".split())
+
+# Стеммер Портера для русского языка (Snowball): окончания ищутся в области RV,
+# самое длинное совпадение - самое левое начало для выражения с якорем $
+_VOWELS = 'аеиоуыэюя'
+_PERFECTIVE_GERUND_RE = re.compile(r'(?:(?<=[ая])(?:в|вши|вшись)|ив|ивши|ившись|ыв|ывши|ывшись)$')
+_REFLEXIVE_RE = re.compile(r'(?:ся|сь)$')
+_ADJECTIVAL_RE = re.compile(r'(?:(?<=[ая])(?:ем|нн|вш|ющ|щ)|ивш|ывш|ующ)?'
+                            r'(?:ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+                            r'|ую|юю|ая|яя|ою|ею)$')
+_VERB_RE = re.compile(r'(?:(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)'
+                      r'|ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют'
+                      r'|ит|ыт|ены|ить|ыть|ишь|ую|ю)$')
+_NOUN_RE = re.compile(r'(?:а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у'
+                      r'|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+_SUPERLATIVE_RE = re.compile(r'(?:ейше|ейш)$')
+_DERIVATIONAL_RE = re.compile(r'(?:ость|ост)$')
+
+
+def _region_start(word: str, start: int) -> int:
+    """Начало области после первой согласной, следующей за гласной (R1/R2 Snowball)"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=200000)
+def stem_russian(word: str) -> str:
+    """Основа русского слова (Snowball); слова без кириллицы не меняются"""
+    rv_start = next((i + 1 for i, char in enumerate(word) if char in _VOWELS), None)
+    if rv_start is None:
+        return word
+    r2_start = _region_start(word, _region_start(word, 0) - 1)
+    rv = word[rv_start:]
+
+    # Шаг 1: деепричастие, иначе возвратная частица и прилагательное/глагол/существительное
+    match = _PERFECTIVE_GERUND_RE.search(rv)
+    if match:
+        rv = rv[:match.start()]
+    else:
+        rv = _REFLEXIVE_RE.sub('', rv, count=1)
+        for pattern in (_ADJECTIVAL_RE, _VERB_RE, _NOUN_RE):
+            match = pattern.search(rv)
+            if match:
+                rv = rv[:match.start()]
+                break
+
+    # Шаг 2-3: конечное "и", словообразовательный суффикс в R2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    match = _DERIVATIONAL_RE.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+
+    # Шаг 4: превосходная степень, двойное "н", мягкий знак
+    match = _SUPERLATIVE_RE.search(rv)
+    if match:
+        rv = rv[:match.start()]
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not match and rv.endswith('ь'):
+        rv = rv[:-1]
+    return word[:rv_start] + rv
+
+
+def tokenize_russian(text: str) -> List[str]:
+    """Термины текста: нижний регистр, ё -> е, без стоп-слов, со стеммингом"""
+    words = _WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem_russian(word) for word in words if word not in RUSSIAN_STOPWORDS]
+
+
+@dataclass
+class SearchHit:
+    """Результат поиска"""
+    key: str
+    score: float
+    text: str
+    metadata: Dict = field(default_factory=dict)
+
+
+class _Segment:
+    """Неизменяемый сегмент индекса; массивы отображаются в память при открытии"""
+
+    def __init__(self, path: str, deleted: Iterable[int] = ()):
+        np = get_engine('numpy')
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, 'terms.txt'), encoding='utf-8') as f:
+            self.terms: Dict[str, int] = {line.rstrip('\n'): i for i, line in enumerate(f)}
+        self.term_offsets = np.load(os.path.join(path, 'term_offsets.npy'), mmap_mode='r')
+        self.doc_ids = np.load(os.path.join(path, 'doc_ids.npy'), mmap_mode='r')
+        self.tfs = np.load(os.path.join(path, 'tfs.npy'), mmap_mode='r')
+        self.doc_lengths = np.load(os.path.join(path, 'doc_lengths.npy'), mmap_mode='r')
+        self.doc_offsets = np.load(os.path.join(path, 'doc_offsets.npy'), mmap_mode='r')
+        self.deleted: Set[int] = set(deleted)
+        self.total_length = int(self.doc_lengths.sum())
+        self._norm = None
+        self._norm_key = None
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.doc_lengths)
+
+    def postings(self, term: str) -> Optional[Tuple["np.ndarray", "np.ndarray"]]:
+        index = self.terms.get(term)
+        if index is None:
+            return None
+        start, end = int(self.term_offsets[index]), int(self.term_offsets[index + 1])
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def norm(self, k1: float, b: float, avgdl: float) -> "np.ndarray":
+        """k1 * (1 - b + b * dl / avgdl) для всех документов (пересчёт при изменении avgdl)"""
+        key = (k1, b, avgdl)
+        if self._norm_key != key:
+            np = get_engine('numpy')
+            lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+            self._norm = (k1 * (1 - b + b * lengths / max(avgdl, 1e-9))).astype(np.float32)
+            self._norm_key = key
+        return self._norm
+
+    def read_doc(self, local_id: int) -> Dict:
+        with open(os.path.join(self.path, 'docs.jsonl'), 'rb') as f:
+            f.seek(int(self.doc_offsets[local_id]))
+            return json.loads(f.readline())
+
+
+class BM25Index:
+    """
+    Инкрементальный индекс BM25 по фрагментам документов.
+    Добавление пишет новый сегмент; compact() сливает сегменты и выбрасывает удалённое.
+    """
+
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        os.makedirs(index_dir, exist_ok=True)
+        self._segments: List[_Segment] = []
+        self._next_segment = 1
+        self._load()
+
+    # --- Состояние на диске ---
+
+    def _load(self):
+        manifest_path = os.path.join(self.index_dir, SEGMENTS_FILENAME)
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self._next_segment = manifest.get('next_segment', 1)
+        self._segments = [_Segment(os.path.join(self.index_dir, entry['name']), entry.get('deleted', ()))
+                          for entry in manifest['segments']]
+
+    def _save(self):
+        """Атомарная запись списка сегментов: читатели видят либо старое, либо новое состояние"""
+        manifest = {
+            'next_segment': self._next_segment,
+            'segments': [{'name': segment.name, 'doc_count': segment.doc_count,
+                          'deleted': sorted(segment.deleted)} for segment in self._segments]
+        }
+        manifest_path = os.path.join(self.index_dir, SEGMENTS_FILENAME)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+
+    # --- Добавление и удаление ---
+
+    def add_documents(self, documents: Iterable[Tuple[str, str, Dict]], segment_size: int = 100000) -> int:
+        """
+        Добавление документов (ключ, текст, метаданные) новыми сегментами
+        не больше segment_size документов. Возвращает число добавленных.
+        """
+        added = 0
+        for segment in self._write_segments(documents, segment_size):
+            self._segments.append(segment)
+            self._save()
+            added += segment.doc_count
+        return added
+
+    def add_chunks(self, chunks: Iterable, segment_size: int = 100000) -> int:
+        """Добавление фрагментов NPAChunker"""
+        return self.add_documents(((chunk.chunk_id, chunk.text, _chunk_metadata(chunk)) for chunk in chunks),
+                                  segment_size)
+
+    def add_chunks_jsonl(self, paths: Union[str, Iterable[str]], segment_size: int = 100000) -> int:
+        """Добавление фрагментов из одного или нескольких JSONL (write_chunks_jsonl)"""
+        paths = [paths] if isinstance(paths, str) else paths
+
+        def records() -> Iterator[Tuple[str, str, Dict]]:
+            for path in paths:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            record = json.loads(line)
+                            text = record.pop('text')
+                            yield record.pop('chunk_id'), text, record
+        return self.add_documents(records(), segment_size)
+
+    def _write_segments(self, documents: Iterable[Tuple[str, str, Dict]], segment_size: int) -> Iterator[_Segment]:
+        """Запись документов сегментами; список сегментов индекса не меняется"""
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= segment_size:
+                yield self._write_segment(batch)
+                batch = []
+        if batch:
+            yield self._write_segment(batch)
+
+    def _write_segment(self, documents: List[Tuple[str, str, Dict]]) -> _Segment:
+        np = get_engine('numpy')
+        name = f"seg_{self._next_segment:06d}"
+        path = os.path.join(self.index_dir, name)
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(documents), dtype=np.int32)
+        doc_offsets = np.zeros(len(documents), dtype=np.int64)
+
+        with open(os.path.join(tmp_path, 'docs.jsonl'), 'wb') as docs_file:
+            for local_id, (key, text, metadata) in enumerate(documents):
+                tokens = tokenize_russian(text)
+                doc_lengths[local_id] = len(tokens)
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault(term, []).append((local_id, tf))
+
+                doc_offsets[local_id] = docs_file.tell()
+                record = {'key': key, 'text': text, 'metadata': metadata or {}}
+                docs_file.write(json.dumps(record, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+
+        terms = sorted(postings)
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        doc_ids = np.empty(term_offsets[-1], dtype=np.int32)
+        tfs = np.empty(term_offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            entries = np.asarray(postings[term], dtype=np.int64)
+            doc_ids[term_offsets[i]:term_offsets[i + 1]] = entries[:, 0]
+            tfs[term_offsets[i]:term_offsets[i + 1]] = np.minimum(entries[:, 1], 65535)
+
+        with open(os.path.join(tmp_path, 'terms.txt'), 'w', encoding='utf-8') as f:
+            f.writelines(term + '\n' for term in terms)
+        for array_name, array in (('term_offsets', term_offsets), ('doc_ids', doc_ids), ('tfs', tfs),
+                                  ('doc_lengths', doc_lengths), ('doc_offsets', doc_offsets)):
+            np.save(os.path.join(tmp_path, array_name + '.npy'), array)
+
+        os.replace(tmp_path, path)
+        self._next_segment += 1
+        logger.info(f"Сегмент {name}: {len(documents)} документов, {len(terms)} терминов")
+        return _Segment(path)
+
+    def delete(self, keys: Iterable[str]) -> int:
+        """Пометка документов удалёнными по ключу (физически - при compact)"""
+        keys = set(keys)
+        deleted = 0
+        for segment in self._segments:
+            with open(os.path.join(segment.path, 'docs.jsonl'), encoding='utf-8') as f:
+                for local_id, line in enumerate(f):
+                    if local_id not in segment.deleted and json.loads(line)['key'] in keys:
+                        segment.deleted.add(local_id)
+                        deleted += 1
+        if deleted:
+            self._save()
+        return deleted
+
+    def compact(self, segment_size: int = 1000000):
+        """Слияние сегментов в новые без удалённых документов (удалённые до этого учитываются в df)"""
+        old_segments = self._segments
+
+        def live_documents() -> Iterator[Tuple[str, str, Dict]]:
+            for segment in old_segments:
+                with open(os.path.join(segment.path, 'docs.jsonl'), encoding='utf-8') as f:
+                    for local_id, line in enumerate(f):
+                        if local_id not in segment.deleted:
+                            record = json.loads(line)
+                            yield record['key'], record['text'], record['metadata']
+
+        # Список сегментов подменяется только после записи всех новых
+        self._segments = list(self._write_segments(live_documents(), segment_size))
+        self._save()
+        for segment in old_segments:
+            shutil.rmtree(segment.path, ignore_errors=True)
+
+    # --- Поиск ---
+
+    @property
+    def doc_count(self) -> int:
+        """Число неудалённых документов"""
+        return sum(segment.doc_count - len(segment.deleted) for segment in self._segments)
+
+    def _collection_stats(self) -> Tuple[int, float]:
+        total_docs = 0
+        total_length = 0
+        for segment in self._segments:
+            total_docs += segment.doc_count - len(segment.deleted)
+            total_length += segment.total_length
+            if segment.deleted:
+                total_length -= int(segment.doc_lengths[sorted(segment.deleted)].sum())
+        return total_docs, (total_length / total_docs if total_docs else 0.0)
+
+    def search(self, query: str, top_k: int = 10, with_text: bool = True) -> List[SearchHit]:
+        """Документы, ранжированные по BM25"""
+        np = get_engine('numpy')
+        terms = list(dict.fromkeys(tokenize_russian(query)))
+        if not terms or not self._segments:
+            return []
+
+        total_docs, avgdl = self._collection_stats()
+        if total_docs == 0:
+            return []
+
+        # df по всем сегментам -> idf
+        segment_postings = [[segment.postings(term) for term in terms] for segment in self._segments]
+        document_frequency = [sum(len(postings[i][0]) for postings in segment_postings if postings[i] is not None)
+                              for i in range(len(terms))]
+        idf = [math.log(1 + (total_docs - df + 0.5) / (df + 0.5)) for df in document_frequency]
+
+        candidates: List[Tuple[float, int, int]] = []
+        for segment_index, (segment, postings) in enumerate(zip(self._segments, segment_postings)):
+            if all(entry is None for entry in postings):
+                continue
+            norm = segment.norm(self.k1, self.b, avgdl)
+            scores = np.zeros(segment.doc_count, dtype=np.float32)
+            for term_idf, entry in zip(idf, postings):
+                if entry is None:
+                    continue
+                doc_ids, tfs = entry
+                tf = tfs.astype(np.float32)
+                scores[doc_ids] += term_idf * tf * (self.k1 + 1) / (tf + norm[doc_ids])
+            if segment.deleted:
+                scores[list(segment.deleted)] = 0.0
+
+            hits = np.flatnonzero(scores)
+            if len(hits) > top_k:
+                hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+            candidates.extend((float(scores[local_id]), segment_index, int(local_id)) for local_id in hits)
+
+        candidates.sort(key=lambda candidate: -candidate[0])
+        results = []
+        for score, segment_index, local_id in candidates[:top_k]:
+            record = self._segments[segment_index].read_doc(local_id)
+            results.append(SearchHit(record['key'], round(score, 4),
+                                     record['text'] if with_text else '', record['metadata']))
+        return results
+
+
+def _chunk_metadata(chunk) -> Dict:
+    """Метаданные фрагмента без текста"""
+    metadata = chunk.to_dict()
+    metadata.pop('text', None)
+    metadata.pop('chunk_id', None)
+    return metadata
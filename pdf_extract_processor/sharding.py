@@ -0,0 +1,301 @@
+"""
+Обработка одного большого PDF по частям (шардам) на нескольких процессах и машинах
+
+Документ делится на диапазоны страниц; задание описывается каталогом на общей
+файловой системе (NFS, SMB, CephFS):
+
+    job.json                  - исходный файл, его SHA-256, число страниц, шарды
+    claims/shard-0003.claim   - шард взят воркером (создаётся атомарно, O_EXCL)
+    shards/shard-0003.jsonl   - готовый результат шарда (появляется через os.replace)
+
+Воркер берёт свободный шард, обновляет время изменения файла захвата после каждой
+страницы и по окончании атомарно публикует результат. Захват, не обновлявшийся
+дольше срока аренды, считается брошенным (воркер упал или машина выключена) и
+перехватывается другим воркером. Слияние собирает страницы шардов по порядку
+с исходными номерами страниц.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set
+
+import fitz
+
+from .streaming import PageResult, open_page_writer
+from .utils.extraction_cache import file_content_hash
+
+logger = logging.getLogger(__name__)
+
+JOB_FILENAME = 'job.json'
+CLAIMS_DIR = 'claims'
+SHARDS_DIR = 'shards'
+DEFAULT_SHARD_PAGES = 50
+# Срок аренды шарда: за это время воркер должен обработать хотя бы одну страницу.
+# Берётся с запасом - часы машин и время изменения на общей ФС могут расходиться
+DEFAULT_LEASE_SECONDS = 900
+
+_PAGE_FIELDS = tuple(field.name for field in fields(PageResult))
+
+
+@dataclass
+class Shard:
+    """Диапазон страниц [start, end), нумерация с 0"""
+    shard_id: str
+    start: int
+    end: int
+
+    @property
+    def pages(self) -> int:
+        return self.end - self.start
+
+
+def worker_id() -> str:
+    """Идентификатор воркера в файлах захвата: машина и процесс"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ShardJob:
+    """Задание шардированной обработки в каталоге job_dir"""
+
+    def __init__(self, job_dir: str):
+        self.job_dir = job_dir
+        with open(os.path.join(job_dir, JOB_FILENAME), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.shards = [Shard(**shard) for shard in self.manifest['shards']]
+        self._verified_sources: Dict[str, bool] = {}
+
+    @classmethod
+    def create(cls, source: str, job_dir: str, shard_pages: int = DEFAULT_SHARD_PAGES,
+               options: Optional[Dict] = None) -> "ShardJob":
+        """
+        Разбиение документа на шарды по shard_pages страниц. Повторный вызов для
+        того же файла возвращает существующее задание (готовые шарды сохраняются).
+        options - настройки процессора, общие для всех воркеров задания.
+        """
+        if shard_pages < 1:
+            raise ValueError("В шарде должна быть хотя бы одна страница")
+
+        source = os.path.abspath(source)
+        source_hash = file_content_hash(source)
+        job_path = os.path.join(job_dir, JOB_FILENAME)
+        if os.path.exists(job_path):
+            job = cls(job_dir)
+            if job.manifest['source_sha256'] != source_hash:
+                raise ValueError(f"Каталог {job_dir} занят заданием другого файла: {job.manifest['source']}")
+            return job
+
+        with fitz.open(source) as doc:
+            page_count = doc.page_count
+        shards = [Shard(f"shard-{number:04d}", start, min(start + shard_pages, page_count))
+                  for number, start in enumerate(range(0, page_count, shard_pages))]
+        manifest = {
+            'source': source,
+            'source_sha256': source_hash,
+            'source_size': os.path.getsize(source),
+            'page_count': page_count,
+            'shard_pages': shard_pages,
+            'options': options or {},
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'shards': [asdict(shard) for shard in shards],
+        }
+
+        os.makedirs(os.path.join(job_dir, CLAIMS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(job_dir, SHARDS_DIR), exist_ok=True)
+        _write_atomic(job_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+        return cls(job_dir)
+
+    @property
+    def options(self) -> Dict:
+        return self.manifest.get('options', {})
+
+    def resolve_source(self, source: Optional[str] = None) -> str:
+        """
+        Путь к исходному PDF на этой машине (source - если файл смонтирован
+        по другому пути). Содержимое сверяется с хэшем задания.
+        """
+        path = source or self.manifest['source']
+        if path not in self._verified_sources:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Исходный файл задания не найден: {path} (укажите путь на этой машине)")
+            self._verified_sources[path] = (os.path.getsize(path) == self.manifest['source_size']
+                                            and file_content_hash(path) == self.manifest['source_sha256'])
+        if not self._verified_sources[path]:
+            raise ValueError(f"Файл {path} отличается от исходного файла задания")
+        return path
+
+    def result_path(self, shard: Shard) -> str:
+        return os.path.join(self.job_dir, SHARDS_DIR, f"{shard.shard_id}.jsonl")
+
+    def claim_path(self, shard: Shard) -> str:
+        return os.path.join(self.job_dir, CLAIMS_DIR, f"{shard.shard_id}.claim")
+
+    def is_done(self, shard: Shard) -> bool:
+        return os.path.exists(self.result_path(shard))
+
+    def claim(self, shard: Shard, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Атомарный захват шарда; брошенный захват (старше срока аренды) перехватывается"""
+        if self.is_done(shard):
+            return False
+        if self._create_claim(shard, owner):
+            return True
+
+        path = self.claim_path(shard)
+        try:
+            expired = time.time() - os.path.getmtime(path) > lease_seconds
+        except FileNotFoundError:
+            # Захват только что снят - шард либо готов, либо свободен
+            return not self.is_done(shard) and self._create_claim(shard, owner)
+        if not expired:
+            return False
+
+        # Переименование атомарно: брошенный захват снимет только один из воркеров
+        stale_path = f"{path}.stale.{owner.replace(':', '-')}"
+        try:
+            os.rename(path, stale_path)
+        except FileNotFoundError:
+            return False
+        os.remove(stale_path)
+        logger.warning("Шард %s перехвачен: захват не обновлялся дольше %s с", shard.shard_id, lease_seconds)
+        return not self.is_done(shard) and self._create_claim(shard, owner)
+
+    def _create_claim(self, shard: Shard, owner: str) -> bool:
+        try:
+            fd = os.open(self.claim_path(shard), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'owner': owner, 'claimed_at': datetime.now().isoformat(timespec='seconds')}, f)
+        return True
+
+    def heartbeat(self, shard: Shard):
+        """Продление аренды шарда"""
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(self.claim_path(shard))
+
+    def release(self, shard: Shard):
+        """Снятие захвата (после публикации результата или при ошибке)"""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.claim_path(shard))
+
+    def write_result(self, shard: Shard, pages: Iterator[PageResult], owner: str) -> Dict:
+        """
+        Запись страниц шарда во временный файл и атомарная публикация. Если шард
+        успел обработать и другой воркер, результат просто заменяется таким же.
+        """
+        tmp_path = f"{self.result_path(shard)}.{owner.replace(':', '-')}.part"
+        try:
+            with open_page_writer(tmp_path, 'jsonl', {'shard_id': shard.shard_id}) as writer:
+                for page in pages:
+                    writer.write_page(page)
+                    self.heartbeat(shard)
+            os.replace(tmp_path, self.result_path(shard))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        return writer.summary
+
+    def next_shard(self, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                   skip: Optional[Set[str]] = None) -> Optional[Shard]:
+        """Первый свободный шард, захваченный воркером owner; None - свободных нет"""
+        for shard in self.shards:
+            if skip and shard.shard_id in skip:
+                continue
+            if self.claim(shard, owner, lease_seconds):
+                return shard
+        return None
+
+    def status(self, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Dict:
+        """Число шардов: готовых, в работе, брошенных и ожидающих"""
+        counts = {'total': len(self.shards), 'done': 0, 'claimed': 0, 'stale': 0, 'pending': 0}
+        now = time.time()
+        for shard in self.shards:
+            if self.is_done(shard):
+                counts['done'] += 1
+                continue
+            try:
+                age = now - os.path.getmtime(self.claim_path(shard))
+            except FileNotFoundError:
+                counts['pending'] += 1
+                continue
+            counts['stale' if age > lease_seconds else 'claimed'] += 1
+        return counts
+
+    def missing_shards(self) -> List[Shard]:
+        return [shard for shard in self.shards if not self.is_done(shard)]
+
+    def iter_pages(self) -> Iterator[PageResult]:
+        """Страницы всех шардов по порядку; все шарды должны быть готовы"""
+        missing = self.missing_shards()
+        if missing:
+            raise ValueError(f"Не готово шардов: {len(missing)} (первый - {missing[0].shard_id})")
+        for shard in self.shards:
+            with open(self.result_path(shard), encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    yield PageResult(**{name: record[name] for name in _PAGE_FIELDS if name in record})
+
+    def merge(self, output_path: str, fmt: str = 'markdown') -> Dict:
+        """Сборка результата документа из шардов с исходной нумерацией страниц"""
+        metadata = {
+            'source_file': os.path.basename(self.manifest['source']),
+            'extraction_method': 'sharded',
+            'page_count': self.manifest['page_count'],
+            'shards': len(self.shards),
+        }
+        errors = 0
+        tmp_path = output_path + '.part'
+        with open_page_writer(tmp_path, fmt, metadata) as writer:
+            for page in self.iter_pages():
+                errors += int(page.error is not None)
+                writer.write_page(page)
+        os.replace(tmp_path, output_path)
+        return dict(writer.summary, output_path=output_path, page_errors=errors, **metadata)
+
+
+def work_shards(job: ShardJob, processor, source: Optional[str] = None, max_shards: Optional[int] = None,
+                lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Dict:
+    """
+    Цикл воркера: захват свободных шардов и их обработка процессором
+    (ImprovedAdvancedPDFExtractProcessor.iter_page_range) до исчерпания задания.
+    Шард с ошибкой освобождается для других воркеров и этим воркером больше не берётся.
+    """
+    owner = worker_id()
+    path = job.resolve_source(source)
+    stats = {'shards': 0, 'pages': 0, 'failed': 0, 'seconds': 0.0}
+    attempted = set()
+    start = time.perf_counter()
+
+    while max_shards is None or stats['shards'] + stats['failed'] < max_shards:
+        shard = job.next_shard(owner, lease_seconds, skip=attempted)
+        if shard is None:
+            break
+        attempted.add(shard.shard_id)
+        print(f"🧩 {shard.shard_id}: страницы {shard.start + 1}-{shard.end}")
+        try:
+            summary = job.write_result(shard, processor.iter_page_range(path, shard.start, shard.end), owner)
+        except Exception as e:
+            logger.error("Шард %s не обработан: %s", shard.shard_id, e)
+            stats['failed'] += 1
+            continue
+        finally:
+            job.release(shard)
+        stats['shards'] += 1
+        stats['pages'] += summary['pages_written']
+
+    stats['seconds'] = round(time.perf_counter() - start, 1)
+    return stats
+
+
+def _write_atomic(path: str, content: str):
+    # Задание могут создавать одновременно с нескольких машин
+    tmp_path = f"{path}.{socket.gethostname()}-{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
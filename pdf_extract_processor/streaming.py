@@ -0,0 +1,125 @@
+"""
+Потоковая выдача результатов по страницам и инкрементальная запись в файл
+"""
+
+import json
+import os
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, TextIO, Union
+
+
+@dataclass
+class PageResult:
+    """Результат извлечения одной страницы"""
+    page_number: int  # Нумерация с 1
+    text: str
+    method: str  # text_layer / ocr
+    cache_hit: bool = False
+    error: Optional[str] = None
+
+
+class _PageWriter:
+    """Базовый потоковый писатель: файл открывается один раз, страницы дописываются"""
+
+    def __init__(self, output: Union[str, TextIO], metadata: Optional[Dict] = None):
+        self.metadata = metadata or {}
+        self._own_file = isinstance(output, (str, os.PathLike))
+        self._file = open(output, 'w', encoding='utf-8') if self._own_file else output
+        self.pages_written = 0
+        self.pages_skipped = 0
+        self.characters = 0
+        self._closed = False
+        self._write_header()
+
+    def _write_header(self):
+        pass
+
+    def _write_footer(self):
+        pass
+
+    def write_page(self, page: PageResult):
+        raise NotImplementedError
+
+    def write_pages(self, pages: Iterable[PageResult]) -> Dict:
+        for page in pages:
+            self.write_page(page)
+        return self.summary
+
+    @property
+    def summary(self) -> Dict:
+        return {
+            'pages_written': self.pages_written,
+            'pages_skipped': self.pages_skipped,
+            'characters': self.characters
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._write_footer()
+        if self._own_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class MarkdownPageWriter(_PageWriter):
+    """Markdown: YAML заголовок, затем страницы по мере поступления, итоги в конце"""
+
+    def _write_header(self):
+        lines = ["---"]
+        for key, value in self.metadata.items():
+            lines.append(f"{key}: {json.dumps(value, ensure_ascii=False, default=str)}")
+        lines.extend(["---", "", f"# {self.metadata.get('source_file', 'Документ')}", ""])
+        self._file.write("\n".join(lines) + "\n")
+
+    def write_page(self, page: PageResult):
+        if not page.text.strip():
+            self.pages_skipped += 1
+            return
+
+        suffix = " (OCR)" if page.method == "ocr" else ""
+        self._file.write(f"### Страница {page.page_number}{suffix}\n\n{page.text.strip()}\n\n---\n\n")
+        self._file.flush()  # Страница доступна читателю сразу после обработки
+        self.pages_written += 1
+        self.characters += len(page.text)
+
+    def _write_footer(self):
+        processing_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._file.write(f"*Страниц: {self.pages_written}, символов: {self.characters:,}*  \n"
+                         f"*Дата обработки: {processing_date}*\n")
+
+
+class JsonlPageWriter(_PageWriter):
+    """JSONL: одна строка на страницу с метаданными документа"""
+
+    def write_page(self, page: PageResult):
+        record = dict(self.metadata, **asdict(page))
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        self.pages_written += 1
+        self.characters += len(page.text)
+
+
+_WRITERS = {
+    'markdown': MarkdownPageWriter,
+    'md': MarkdownPageWriter,
+    'jsonl': JsonlPageWriter,
+}
+
+
+def open_page_writer(output: Union[str, TextIO], fmt: str = 'markdown',
+                     metadata: Optional[Dict] = None) -> _PageWriter:
+    """Писатель страниц в формате markdown или jsonl"""
+    writer_class = _WRITERS.get(fmt.lower())
+    if writer_class is None:
+        raise ValueError(f"Неизвестный формат вывода: {fmt}")
+    return writer_class(output, metadata)
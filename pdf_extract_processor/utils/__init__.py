@@ -1 +1 @@
-"""Утилиты для PDF обработки"""\n
\ No newline at end of file
+"""Утилиты для PDF обработки"""
@@ -0,0 +1,224 @@
+"""
+Постоянный кэш результатов извлечения, адресуемый по содержимому файла
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf_extract_processor")
+
+
+def file_content_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_key(*parts) -> str:
+    """Стабильный ключ по набору значений (словари сериализуются с сортировкой)"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def page_image_key(pix, settings: Dict) -> str:
+    """Ключ OCR страницы: хэш пикселей рендера + настройки OCR"""
+    digest = hashlib.sha256(pix.samples_mv)
+    digest.update(f"{pix.width}x{pix.height}x{pix.n}".encode('ascii'))
+    return settings_key(digest.hexdigest(), settings)
+
+
+class ExtractionCache:
+    """
+    Кэш вердиктов анализатора, извлечённого текста и OCR отдельных страниц в SQLite.
+    Ключ текста - хэш содержимого файла + метод + настройки (DPI, язык, psm),
+    ключ страницы - хэш её рендера + настройки OCR.
+    Размер ограничен, вытеснение - LRU; общий размер хранится счётчиком и
+    пересчитывается только при вытеснении. Безопасен для нескольких процессов (WAL).
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: float = 512):
+        self.cache_dir = os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.db_path = os.path.join(self.cache_dir, 'extraction_cache.sqlite3')
+
+        self._conn = None
+        self._conn_pid = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение текущего процесса (после fork открывается заново)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute('''CREATE TABLE IF NOT EXISTS verdicts (
+            key TEXT PRIMARY KEY,
+            file_hash TEXT NOT NULL,
+            quality_level TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            method TEXT NOT NULL,
+            created REAL NOT NULL)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS texts (
+            key TEXT PRIMARY KEY,
+            file_hash TEXT NOT NULL,
+            method TEXT NOT NULL,
+            text TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS texts_last_access ON texts(last_access)')
+        conn.execute('''CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access)')
+        # Счётчик общего размера текстов и страниц (кэши прежних версий считаются один раз)
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        conn.execute('''INSERT OR IGNORE INTO meta
+                        SELECT 'total_size', (SELECT COALESCE(SUM(size), 0) FROM texts)
+                                           + (SELECT COALESCE(SUM(size), 0) FROM pages)''')
+
+    def get_verdict(self, file_hash: str, settings: Dict) -> Optional[Tuple[str, float, str]]:
+        """Вердикт анализатора: (уровень качества, уверенность, метод)"""
+        key = settings_key(file_hash, 'verdict', settings)
+        try:
+            row = self._connect().execute(
+                'SELECT quality_level, confidence, method FROM verdicts WHERE key = ?',
+                (key,)).fetchone()
+            return tuple(row) if row else None
+        except sqlite3.Error as e:
+            logger.warning(f"Кэш недоступен: {e}")
+            return None
+
+    def put_verdict(self, file_hash: str, settings: Dict, quality_level: str, confidence: float, method: str):
+        key = settings_key(file_hash, 'verdict', settings)
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?)',
+                (key, file_hash, quality_level, confidence, method, time.time()))
+        except sqlite3.Error as e:
+            logger.warning(f"Не удалось записать вердикт в кэш: {e}")
+
+    def get_text(self, file_hash: str, method: str, settings: Dict) -> Optional[str]:
+        """Извлечённый текст для файла, метода и настроек"""
+        key = settings_key(file_hash, method, settings)
+        try:
+            conn = self._connect()
+            row = conn.execute('SELECT text FROM texts WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE texts SET last_access = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Кэш недоступен: {e}")
+            return None
+
+    def put_text(self, file_hash: str, method: str, settings: Dict, text: str):
+        """Сохранение текста с вытеснением давно не использованных записей"""
+        key = settings_key(file_hash, method, settings)
+        self._write('texts', (key, file_hash, method, text, len(text.encode('utf-8')), time.time()))
+
+    def get_page_text(self, page_key: str) -> Optional[str]:
+        """Результат OCR страницы по ключу page_image_key"""
+        try:
+            conn = self._connect()
+            row = conn.execute('SELECT text FROM pages WHERE key = ?', (page_key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE pages SET last_access = ? WHERE key = ?', (time.time(), page_key))
+            return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Кэш недоступен: {e}")
+            return None
+
+    def put_page_text(self, page_key: str, text: str):
+        """Сохранение результата OCR страницы"""
+        self._write('pages', (page_key, text, len(text.encode('utf-8')), time.time()))
+
+    def _write(self, table: str, params: tuple):
+        """Запись строки (ключ - первый параметр, размер - предпоследний) с последующим вытеснением"""
+        size = params[-2]
+        if size > self.max_size_bytes:
+            return
+
+        try:
+            conn = self._connect()
+            # IMMEDIATE - запись, счётчик размера и вытеснение атомарны относительно других процессов
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                replaced = conn.execute(f'SELECT size FROM {table} WHERE key = ?', (params[0],)).fetchone()
+                placeholders = ', '.join('?' * len(params))
+                conn.execute(f'INSERT OR REPLACE INTO {table} VALUES ({placeholders})', params)
+                conn.execute("UPDATE meta SET value = value + ? WHERE name = 'total_size'",
+                             (size - (replaced[0] if replaced else 0),))
+                if self._stored_size(conn) > self.max_size_bytes:
+                    self._evict(conn)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Не удалось записать в кэш: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """LRU-вытеснение текстов и страниц до укладывания в общий лимит размера"""
+        # Точный размер: счётчик мог разойтись с таблицами (например, после ручной правки файла)
+        total = self._total_size(conn)
+        rows = conn.execute('''SELECT 'texts', key, size, last_access FROM texts
+                               UNION ALL
+                               SELECT 'pages', key, size, last_access FROM pages
+                               ORDER BY last_access''').fetchall()
+        for table, key, size, _ in rows:
+            if total <= self.max_size_bytes:
+                break
+            conn.execute(f'DELETE FROM {table} WHERE key = ?', (key,))
+            total -= size
+        conn.execute("UPDATE meta SET value = ? WHERE name = 'total_size'", (total,))
+
+    @staticmethod
+    def _stored_size(conn: sqlite3.Connection) -> int:
+        """Общий размер по счётчику"""
+        return conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+
+    @staticmethod
+    def _total_size(conn: sqlite3.Connection) -> int:
+        return conn.execute('''SELECT (SELECT COALESCE(SUM(size), 0) FROM texts)
+                                   + (SELECT COALESCE(SUM(size), 0) FROM pages)''').fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Статистика кэша"""
+        conn = self._connect()
+        entries = conn.execute('SELECT COUNT(*) FROM texts').fetchone()[0]
+        pages = conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+        verdicts = conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+        return {
+            'entries': entries,
+            'pages': pages,
+            'verdicts': verdicts,
+            'size_mb': self._stored_size(conn) / 1024 / 1024,
+            'max_size_mb': self.max_size_bytes / 1024 / 1024
+        }
+
+    def close(self):
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._conn_pid = None
@@ -0,0 +1,49 @@
+"""
+Представление рендеров страниц как массивов NumPy / изображений PIL
+без промежуточного кодирования в PNG
+"""
+
+import fitz
+from typing import TYPE_CHECKING
+
+from ..engines import get_engine
+
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+
+def render_page(page: fitz.Page, scale: float = 1.0, gray: bool = False) -> fitz.Pixmap:
+    """Рендер страницы сразу в нужном цветовом пространстве, без альфа-канала"""
+    colorspace = fitz.csGRAY if gray else fitz.csRGB
+    return page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=colorspace, alpha=False)
+
+
+def pixmap_to_array(pix: fitz.Pixmap) -> "np.ndarray":
+    """
+    Массив NumPy поверх pix.samples без копирования:
+    (H, W) для оттенков серого, (H, W, n) для цветных рендеров.
+    Буфер принадлежит MuPDF - массив действителен, пока жив pix.
+    """
+    np = get_engine('numpy')
+    buffer = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    shape = (pix.height, pix.width, pix.n)
+    strides = (pix.stride, pix.n, 1)
+    array = np.lib.stride_tricks.as_strided(buffer, shape=shape, strides=strides, writeable=False)
+    return array[:, :, 0] if pix.n == 1 else array
+
+
+def pixmap_to_pil(pix: fitz.Pixmap) -> "Image.Image":
+    """
+    Изображение PIL поверх pix.samples.
+    Для режима "L" память разделяется с pix, для "RGB" PIL делает одну копию.
+    """
+    if pix.alpha:
+        raise ValueError("Ожидается пиксмап без альфа-канала")
+    modes = {1: "L", 3: "RGB"}
+    if pix.n not in modes:
+        raise ValueError(f"Неподдерживаемое число каналов: {pix.n}")
+
+    mode = modes[pix.n]
+    Image = get_engine('pil')
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride, 1)
@@ -0,0 +1,162 @@
+"""
+Множественная замена за один проход
+
+Все строки словаря собираются в одно регулярное выражение в форме префиксного
+дерева: на каждой позиции текста выбирается ветка по очередному символу, поэтому
+время прохода почти не зависит от размера словаря. При нескольких совпадениях
+в одной позиции выбирается самое длинное; заменённый текст повторно не просматривается.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Ссылки на группы в шаблоне замены: \1 или \g<1>
+_GROUP_REF_RE = re.compile(r'\\(?:g<(\d+)>|(\d{1,2}))')
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Регулярное выражение, совпадающее с любым словом из набора (самое длинное из возможных)"""
+    trie: Dict = {}
+    for word in words:
+        if not word:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}  # Конец слова
+    return _node_pattern(trie)
+
+
+def _node_pattern(node: Dict) -> str:
+    ends_here = '' in node
+    branches = [re.escape(char) + _node_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+
+    # Ветки из одного символа сворачиваются в класс символов
+    singles = [branch for branch in branches if len(branch) == 1 or (len(branch) == 2 and branch[0] == '\\')]
+    if len(singles) > 1:
+        multi = [branch for branch in branches if branch not in singles]
+        branches = multi + ['[' + ''.join(singles) + ']']
+
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if ends_here:
+        # Жадная необязательная группа: сначала пробуется более длинное слово
+        return (body if len(branches) > 1 or _is_atom(body) else '(?:' + body + ')') + '?'
+    return body
+
+
+def _is_atom(pattern: str) -> bool:
+    """Одиночный символ, экранированный символ или класс символов"""
+    if len(pattern) == 1 or (len(pattern) == 2 and pattern[0] == '\\'):
+        return True
+    return pattern.startswith('[') and pattern.endswith(']') and pattern.count('[') == 1
+
+
+class MultiReplacer:
+    """
+    Замена строк словаря и регулярных правил одним проходом по тексту.
+    Правила (шаблон, замена со ссылками \\1 / \\g<1>) проверяются раньше словаря.
+    """
+
+    def __init__(self, replacements: Dict[str, str],
+                 patterns: Optional[Sequence[Tuple[str, str]]] = None):
+        self.replacements = {wrong: right for wrong, right in replacements.items() if wrong}
+        self.patterns: List[Tuple["re.Pattern", str]] = [(re.compile(pattern), template)
+                                                         for pattern, template in (patterns or ())]
+
+        alternatives = [f'(?P<_p{i}>{pattern.pattern})' for i, (pattern, _) in enumerate(self.patterns)]
+        if self.replacements:
+            alternatives.append(f'(?P<_w>{trie_pattern(self.replacements)})')
+        self.regex = re.compile('|'.join(alternatives)) if alternatives else None
+
+        # Шаблоны правил с номерами групп общего выражения: замена без повторного сопоставления
+        self._templates = {}
+        for i, (_, template) in enumerate(self.patterns):
+            offset = self.regex.groupindex[f'_p{i}']
+            self._templates[f'_p{i}'] = _compile_template(template, offset)
+
+    def _replace(self, match: "re.Match") -> str:
+        # Внешняя именованная группа закрывается последней - lastgroup указывает на неё
+        name = match.lastgroup
+        if name == '_w':
+            return self.replacements[match.group()]
+        return "".join(part if isinstance(part, str) else (match.group(part) or "")
+                       for part in self._templates[name])
+
+    def apply(self, text: str) -> str:
+        if self.regex is None or not text:
+            return text
+        return self.regex.sub(self._replace, text)
+
+
+def _compile_template(template: str, offset: int) -> List[Union[str, int]]:
+    """Шаблон замены как список литералов и номеров групп (со сдвигом на позицию правила)"""
+    parts: List[Union[str, int]] = []
+    position = 0
+    for ref in _GROUP_REF_RE.finditer(template):
+        parts.append(template[position:ref.start()])
+        parts.append(offset + int(ref.group(1) or ref.group(2)))
+        position = ref.end()
+    parts.append(template[position:])
+    return [part for part in parts if part != ""]
+
+
+class _ReplacementRun:
+    """Подряд идущие замены, которые не влияют друг на друга"""
+
+    def __init__(self):
+        self.replacements: Dict[str, str] = {}
+        self._strings = set()  # Ключи и непустые результаты
+        self._inner = set()  # Все их подстроки
+        self._prefixes = set()  # Собственные префиксы и суффиксы
+        self._suffixes = set()
+        self._deletes = False
+
+    def conflicts(self, key: str) -> bool:
+        """
+        Может ли ключ совпасть иначе, чем при последовательных заменах: он пересекается
+        с ключом или результатом замены серии (вложение или общий край), либо удаление
+        в серии склеивает текст вокруг, образуя ключ.
+        """
+        size = len(key)
+        if self._deletes and size > 1:
+            return True
+        if key in self._inner:
+            return True
+        if any(key[i:j] in self._strings for i in range(size) for j in range(i + 1, size + 1)):
+            return True
+        return any(key[:i] in self._suffixes or key[i:] in self._prefixes for i in range(1, size))
+
+    def add(self, key: str, value: str):
+        self.replacements[key] = value
+        self._deletes = self._deletes or not value
+        for string in (key, value):
+            if not string:
+                continue
+            self._strings.add(string)
+            size = len(string)
+            self._inner.update(string[i:j] for i in range(size) for j in range(i + 1, size + 1))
+            self._prefixes.update(string[:i] for i in range(1, size))
+            self._suffixes.update(string[i:] for i in range(1, size))
+
+
+def sequential_replacers(pairs: Iterable[Tuple[str, str]]) -> List[MultiReplacer]:
+    """
+    Проходы MultiReplacer, дающие тот же результат, что последовательные
+    text.replace(ключ, замена) в порядке pairs. Замены объединяются в проход, пока
+    не влияют друг на друга; замена, ключ которой может появиться после более ранних
+    (цепочка 2©11 → 2О11 → 2011) или пересекается с ними, начинает новый проход.
+    """
+    replacers = []
+    run = _ReplacementRun()
+    for key, value in pairs:
+        if not key:
+            continue
+        if run.conflicts(key):
+            replacers.append(MultiReplacer(run.replacements))
+            run = _ReplacementRun()
+        run.add(key, value)
+    if run.replacements:
+        replacers.append(MultiReplacer(run.replacements))
+    return replacers
@@ -0,0 +1,21 @@
+"""
+Построчное чтение больших текстов
+
+Строки выдаются по одной без построения списка всех строк (str.split),
+поэтому потоковые обработчики работают одинаково со строкой и с файлом.
+"""
+
+from typing import Iterator
+
+
+def iter_lines(text: str, keepends: bool = False) -> Iterator[str]:
+    """Строки текста по '\\n' (в отличие от splitlines, другие разделители не учитываются)"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            if start < len(text) or not keepends:
+                yield text[start:]
+            return
+        yield text[start:end + 1] if keepends else text[start:end]
+        start = end + 1
@@ -15,5 +15,14 @@ setup(
         'tqdm>=4.65.0',
         'click>=8.1.0',
         'PyYAML>=6.0.1',
-    ]
+    ],
+    extras_require={
+        'tesserocr': ['tesserocr>=2.6.0'],
+        'export': ['pyarrow>=14.0.0'],
+    },
+    entry_points={
+        'console_scripts': [
+            'pdf-extract=pdf_extract_processor.cli:main',
+        ],
+    },
 )
@@ -0,0 +1,79 @@
+import fitz
+
+from pdf_extract_processor.adaptive_render import AdaptiveRenderPolicy
+
+
+def _page(fontsize, lines=20):
+    doc = fitz.open()
+    page = doc.new_page()
+    for line in range(lines):
+        y = 60 + line * fontsize * 1.6
+        if y < page.rect.height - 40:
+            page.insert_text((50, y), "Regulation text line HELLO", fontsize=fontsize, fontname='helv')
+    return doc, page
+
+
+def test_small_print_gets_larger_scale():
+    policy = AdaptiveRenderPolicy()
+    _, small = _page(6)
+    _, large = _page(40)
+
+    small_scale = policy.choose_scale(small, 2.0)
+    large_scale = policy.choose_scale(large, 2.0)
+    assert small_scale > large_scale
+    # Строка 40 пт уже крупнее целевой высоты - масштаб не ниже минимального
+    assert large_scale == policy.min_scale
+
+
+def test_line_height_is_estimated_in_points():
+    _, page = _page(12)
+
+    line_height = AdaptiveRenderPolicy(probe_scale=2.0).estimate_line_height(page)
+    assert 6 <= line_height <= 14
+
+
+def test_blank_page_keeps_fallback_scale():
+    doc = fitz.open()
+    page = doc.new_page()
+
+    assert AdaptiveRenderPolicy().choose_scale(page, 2.5) == 2.5
+
+
+def test_scale_is_capped():
+    _, page = _page(5)
+
+    assert AdaptiveRenderPolicy(max_scale=3.0, probe_scale=2.0).choose_scale(page, 2.0) == 3.0
+
+
+def test_escalation_scales_stop_at_max():
+    policy = AdaptiveRenderPolicy(max_scale=4.0, escalation_factor=1.5, max_escalations=3)
+
+    assert policy.escalation_scales(2.0) == [3.0, 4.0]
+    assert policy.escalation_scales(4.0) == []
+
+
+def test_low_confidence_escalates_and_keeps_best_result():
+    _, page = _page(12)
+    policy = AdaptiveRenderPolicy(min_confidence=70.0, max_escalations=1)
+    renders = []
+
+    def recognizer(pix):
+        renders.append(pix.width)
+        return ("low", 40.0) if len(renders) == 1 else ("high", 90.0)
+
+    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+    assert policy.recognize(page, pix, 2.0, recognizer) == ("high", 3.0, True)
+    assert renders[1] > renders[0]
+
+
+def test_confident_result_is_not_rerendered():
+    _, page = _page(12)
+    calls = []
+
+    def recognizer(pix):
+        calls.append(pix)
+        return "text", 95.0
+
+    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+    assert AdaptiveRenderPolicy().recognize(page, pix, 2.0, recognizer) == ("text", 2.0, False)
+    assert len(calls) == 1
@@ -0,0 +1,73 @@
+import io
+import json
+
+import pytest
+
+from pdf_extract_processor.rag_tools.chunker import NPAChunker, estimate_tokens, write_chunks_jsonl
+from pdf_extract_processor.rag_tools.rag_processor import clean_npa_for_rag
+
+RAW = """МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ РОССИЙСКОЙ ФЕДЕРАЦИИ
+ПРИКАЗ
+1. Утвердить порядок лицензирования.
+2. Контроль возложить на заместителя министра.
+"""
+
+
+def test_chunks_follow_npa_structure():
+    chunks = list(NPAChunker().chunk_text(clean_npa_for_rag(RAW), 'приказ', {'year': 2021}))
+
+    assert [(chunk.chunk_id, chunk.clause, chunk.clause_part) for chunk in chunks] == \
+        [('приказ#0', '1', 1), ('приказ#1', '2', 1)]
+    assert chunks[0].body == "МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ РОССИЙСКОЙ ФЕДЕРАЦИИ"
+    assert chunks[1].document_type == "ПРИКАЗ"
+    assert chunks[1].text == "2. Контроль возложить на заместителя министра."
+    assert chunks[0].metadata == {'year': 2021}
+
+
+def test_streaming_lines_match_clean_text():
+    chunker = NPAChunker()
+
+    from_lines = [chunk.to_dict() for chunk in chunker.iter_chunks_from_lines(io.StringIO(RAW), 'приказ')]
+    from_text = [chunk.to_dict() for chunk in chunker.chunk_text(clean_npa_for_rag(RAW), 'приказ')]
+    assert from_lines == from_text
+
+
+def test_long_clause_is_split_with_overlap():
+    sentences = [f"Предложение номер {number} о порядке проверки." for number in range(40)]
+    blocks = ["## ПРИКАЗ", "### 3. " + " ".join(sentences), "### 4. Короткий пункт."]
+
+    chunks = list(NPAChunker(max_chars=300, overlap_chars=60).iter_chunks(blocks, 'приказ'))
+    clause_parts = [chunk for chunk in chunks if chunk.clause == '3']
+
+    assert len(clause_parts) > 1
+    assert [chunk.clause_part for chunk in clause_parts] == list(range(1, len(clause_parts) + 1))
+    assert all(chunk.char_count <= 300 for chunk in chunks)
+    # Разрез по границе предложения, следующий фрагмент начинается с перекрытия
+    assert clause_parts[0].text.endswith('.')
+    assert clause_parts[1].text.split()[0] in clause_parts[0].text[-60:]
+    for sentence in sentences:
+        assert any(sentence in chunk.text for chunk in clause_parts)
+    # Новый пункт не наследует перекрытие предыдущего
+    assert chunks[-1].text == "4. Короткий пункт." and chunks[-1].clause_part == 1
+
+
+def test_jsonl_writer_streams_chunks():
+    output = io.StringIO()
+    chunks = list(NPAChunker().chunk_text(clean_npa_for_rag(RAW), 'приказ'))
+
+    summary = write_chunks_jsonl(iter(chunks), output)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record['chunk_id'] for record in records] == ['приказ#0', 'приказ#1']
+    assert summary == {
+        'chunks_written': 2,
+        'characters': sum(chunk.char_count for chunk in chunks),
+        'token_estimate': sum(estimate_tokens(chunk.text) for chunk in chunks)
+    }
+
+
+def test_invalid_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        NPAChunker(max_chars=0)
+    with pytest.raises(ValueError):
+        NPAChunker(max_chars=100, overlap_chars=50)
@@ -0,0 +1,83 @@
+import io
+import random
+import re
+
+from pdf_extract_processor.rag_tools.rag_processor import clean_npa_for_rag, iter_clean_npa_for_rag
+
+
+def _reference_clean(text):
+    """Эталон: прежняя очистка проходами регулярных выражений по всему тексту"""
+    text = re.sub(r'# Извлеченный текст.*?---', '', text, flags=re.DOTALL)
+    for pattern in (r'\*\*Файл:\*\*.*?\n', r'\*\*Качество:\*\*.*?\n', r'\*\*Метод:\*\*.*?\n',
+                    r'\*\*Уверенность:\*\*.*?\n', r'--- Страница \d+ ---\n*', r'=== Страница \d+ ===\n*'):
+        text = re.sub(pattern, '', text)
+    text = re.sub(r'\n[А-Я]{1,3}\s*\n', '\n', text)
+    text = re.sub(r'\n[^\w\s]{1,3}\n', '\n', text)
+
+    clean_lines = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if re.match(r'(ПРАВИТЕЛЬСТВО|МИНИСТЕРСТВО|ФЕДЕРАЛЬНАЯ СЛУЖБА)', line):
+            line = f'# {line}'
+        elif line in ['ПОСТАНОВЛЕНИЕ', 'ПРИКАЗ', 'РАСПОРЯЖЕНИЕ', 'УКАЗ', 'РЕШЕНИЕ']:
+            line = f'## {line}'
+        elif re.match(r'^\d+\.\s+[А-ЯЁ]', line):
+            line = f'### {line}'
+        clean_lines.append(line)
+
+    result = '\n\n'.join(clean_lines)
+    result = re.sub(r' +', ' ', result)
+    return re.sub(r'\n{3,}', '\n\n', result).strip()
+
+
+EXTRACTED = """# Извлеченный текст из приказ.pdf
+
+**Файл:** приказ.pdf
+**Качество:** good
+**Метод:** ocr
+**Уверенность:** 0.91
+
+---
+
+--- Страница 1 ---
+МИНИСТЕРСТВО  ЗДРАВООХРАНЕНИЯ
+ПРИКАЗ
+АБ
+
+1.   Утвердить порядок.
+—
+Текст пункта продолжается.
+=== Страница 2 ===
+
+
+2. Контроль оставляю за собой.
+"""
+
+FRAGMENTS = [
+    "# Извлеченный текст", "---", "**Файл:** a.pdf", "**Метод:** ocr", "--- Страница 3 ---",
+    "=== Страница 4 ===", "МИНИСТЕРСТВО ФИНАНСОВ", "ПРИКАЗ", "УКАЗ", "АБ", "Я  ", "—", "..", "§",
+    "1. Утвердить", "2.  Пункт", "обычный  текст", "Текст", "", "", "   ",
+]
+
+
+def test_extracted_markdown_is_cleaned():
+    assert clean_npa_for_rag(EXTRACTED) == _reference_clean(EXTRACTED) == (
+        "# МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ\n\n## ПРИКАЗ\n\n### 1. Утвердить порядок.\n\n"
+        "Текст пункта продолжается.\n\n### 2. Контроль оставляю за собой.")
+
+
+def test_matches_reference_on_random_layouts():
+    rng = random.Random(0)
+    for _ in range(500):
+        text = ''.join(rng.choice(FRAGMENTS) + rng.choice(['\n', '\n', '\n\n', ' '])
+                       for _ in range(rng.randint(1, 30)))
+        assert clean_npa_for_rag(text) == _reference_clean(text), text
+
+
+def test_streaming_lines_give_the_same_blocks():
+    blocks = list(iter_clean_npa_for_rag(io.StringIO(EXTRACTED)))
+
+    assert '\n\n'.join(blocks) == clean_npa_for_rag(EXTRACTED)
+    assert blocks[0] == "# МИНИСТЕРСТВО ЗДРАВООХРАНЕНИЯ"
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from pdf_extract_processor.cli import collect_input_files, output_path_for
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+    return path
+
+
+def test_glob_keeps_subfolders_for_duplicate_basenames(tmp_path, monkeypatch):
+    first = _touch(str(tmp_path / 'архив' / '2019' / 'приказ.pdf'))
+    second = _touch(str(tmp_path / 'архив' / '2020' / 'приказ.pdf'))
+    monkeypatch.chdir(tmp_path)
+
+    files = collect_input_files(['архив/**/*.pdf'])
+
+    assert files == [(first, os.path.join('2019', 'приказ.pdf')), (second, os.path.join('2020', 'приказ.pdf'))]
+    outputs = {output_path_for(relative, 'out', 'markdown') for _, relative in files}
+    assert len(outputs) == 2
+
+
+def test_absolute_glob_is_relative_to_pattern_root(tmp_path):
+    path = _touch(str(tmp_path / 'архив' / 'a' / 'приказ.pdf'))
+
+    assert collect_input_files([str(tmp_path / 'архив' / '*' / '*.pdf')]) == [(path, os.path.join('a', 'приказ.pdf'))]
+
+
+def test_inputs_with_same_output_path_are_rejected(tmp_path):
+    first = _touch(str(tmp_path / 'a' / 'приказ.pdf'))
+    second = _touch(str(tmp_path / 'b' / 'приказ.pdf'))
+
+    with pytest.raises(ValueError, match='один и тот же путь результата'):
+        collect_input_files([first, second])
+
+
+def test_broken_pool_keeps_results_of_finished_tasks(tmp_path, monkeypatch):
+    from concurrent.futures import Future
+    from concurrent.futures.process import BrokenProcessPool
+
+    from pdf_extract_processor import cli
+
+    class BrokenExecutor:
+        """Первая задача завершилась до сбоя пула, вторая погибла вместе с воркером"""
+
+        def __init__(self, *args, **kwargs):
+            self.futures = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, task):
+            future = Future()
+            if not self.futures:
+                future.set_result({'status': 'success', 'output': task[1], 'pages': 1, 'seconds': 0.1})
+            else:
+                future.set_exception(BrokenProcessPool('воркер погиб'))
+            self.futures.append(future)
+            return future
+
+    monkeypatch.setattr(cli, 'ProcessPoolExecutor', BrokenExecutor)
+    # Сбойная задача разбирается первой: завершённая ещё не записана
+    monkeypatch.setattr(cli, 'wait', lambda futures, return_when: (list(futures)[::-1], set()))
+
+    manifest = cli.CheckpointManifest(str(tmp_path / 'manifest.jsonl'))
+    stats = {'success': 0, 'failed': 0, 'duplicates': 0}
+    tasks = [(str(tmp_path / 'a.pdf'), str(tmp_path / 'a.md'), 'markdown'),
+             (str(tmp_path / 'b.pdf'), str(tmp_path / 'b.md'), 'markdown')]
+    cli._run_queue(tasks, manifest, stats, 1, ())
+    manifest.close()
+
+    assert stats['success'] == 1 and stats['failed'] == 1
+    assert manifest.entries[tasks[0][0]]['status'] == 'success'
+    assert manifest.entries[tasks[1][0]]['status'] == 'error'
@@ -0,0 +1,75 @@
+import pytest
+
+from pdf_extract_processor.columnar_export import CHUNK_COLUMNS, PAGE_COLUMNS, CorpusExporter, export_jsonl_outputs
+from pdf_extract_processor.streaming import PageResult, open_page_writer
+
+pa = pytest.importorskip('pyarrow')
+pytest.importorskip('pandas')
+parquet = pytest.importorskip('pyarrow.parquet')
+
+METADATA = {'source_file': 'приказ.pdf', 'quality_level': 'good', 'extraction_method': 'ocr', 'confidence': 0.9}
+
+
+def _pages(count):
+    return [PageResult(number, f"1. Пункт {number} приказа о порядке лицензирования.\n"
+                               f"2. Второй пункт страницы {number}.", 'ocr', number % 2 == 0)
+            for number in range(1, count + 1)]
+
+
+def test_parquet_pages_and_chunks_in_row_groups(tmp_path):
+    with CorpusExporter(str(tmp_path), 'parquet', row_group_size=2) as exporter:
+        exporter.add_document('приказ', _pages(5), METADATA)
+        exporter.add_document('письмо', _pages(1))
+
+    pages = parquet.ParquetFile(exporter.pages.path)
+    assert pages.schema_arrow.names == [name for name, _ in PAGE_COLUMNS]
+    assert pages.metadata.num_rows == exporter.summary['pages'] == 6
+    assert pages.metadata.num_row_groups == 3
+
+    table = pages.read(columns=['document', 'page_number', 'cache_hit', 'confidence', 'source_file'])
+    rows = table.to_pylist()
+    assert [(row['document'], row['page_number']) for row in rows] == \
+        [('приказ', number) for number in range(1, 6)] + [('письмо', 1)]
+    assert rows[1]['cache_hit'] and rows[0]['confidence'] == pytest.approx(0.9)
+    assert rows[5]['source_file'] == 'письмо' and rows[5]['confidence'] is None
+
+    chunks = parquet.read_table(exporter.chunks.path)
+    assert chunks.schema.names == [name for name, _ in CHUNK_COLUMNS]
+    assert chunks.num_rows == exporter.summary['chunks'] > 0
+    assert set(chunks.column('document').to_pylist()) == {'приказ', 'письмо'}
+
+
+def test_arrow_ipc_export(tmp_path):
+    with CorpusExporter(str(tmp_path), 'arrow', row_group_size=4) as exporter:
+        exporter.add_document('приказ', _pages(5), METADATA)
+
+    with pa.memory_map(exporter.pages.path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.num_rows == 5
+    assert table.column('text').to_pylist()[0].startswith("1. Пункт 1")
+
+
+def test_empty_export_writes_schema(tmp_path):
+    exporter = CorpusExporter(str(tmp_path), 'parquet')
+    summary = exporter.close()
+
+    assert summary['pages'] == summary['chunks'] == 0
+    assert parquet.read_table(summary['pages_path']).schema.names == [name for name, _ in PAGE_COLUMNS]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Неизвестный формат'):
+        CorpusExporter(str(tmp_path), 'csv')
+
+
+def test_export_from_jsonl_outputs(tmp_path):
+    path = str(tmp_path / 'приказ.jsonl')
+    with open_page_writer(path, 'jsonl', METADATA) as writer:
+        for page in _pages(3):
+            writer.write_page(page)
+
+    summary = export_jsonl_outputs([('приказ', path)], str(tmp_path / 'корпус'))
+
+    assert summary['pages'] == 3
+    rows = parquet.read_table(summary['pages_path'], columns=['extraction_method', 'page_number']).to_pylist()
+    assert rows == [{'extraction_method': 'ocr', 'page_number': number} for number in range(1, 4)]
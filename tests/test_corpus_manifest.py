@@ -0,0 +1,111 @@
+import json
+import os
+
+from pdf_extract_processor.rag_tools.chunker import NPAChunker
+from pdf_extract_processor.rag_tools.corpus_manifest import CorpusManifest
+from pdf_extract_processor.rag_tools.rag_processor import RAGDataProcessor
+
+
+class TextExtractor:
+    """Извлечение из текстового файла с подсчётом вызовов"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(os.path.basename(path))
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        if 'СБОЙ' in text:
+            raise RuntimeError("не удалось извлечь")
+        return text
+
+
+def _document(path, clauses):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("ПРИКАЗ\n" + "".join(f"{number}. {text}\n" for number, text in enumerate(clauses, 1)))
+    return str(path)
+
+
+def _corpus(tmp_path):
+    return [_document(tmp_path / 'a.txt', ["Утвердить порядок лицензирования."]),
+            _document(tmp_path / 'b.txt', ["Контроль возложить на министра.", "Приказ вступает в силу."])]
+
+
+def test_rebuild_processes_only_changed_documents(tmp_path):
+    files = _corpus(tmp_path)
+    corpus_dir = str(tmp_path / 'corpus')
+    extractor = TextExtractor()
+    processor = RAGDataProcessor(extractor=extractor)
+
+    first = processor.update_corpus(files, corpus_dir)
+    assert (first['extracted'], first['combined_rebuilt']) == (2, True)
+
+    second = processor.update_corpus(files, corpus_dir)
+    assert (second['unchanged'], second['extracted'], second['combined_rebuilt']) == (2, 0, False)
+    assert extractor.calls == ['a.txt', 'b.txt']
+
+    _document(tmp_path / 'b.txt', ["Контроль возложить на заместителя министра."])
+    third = processor.update_corpus(files, corpus_dir)
+    assert (third['unchanged'], third['extracted'], third['combined_rebuilt']) == (1, 1, True)
+    assert extractor.calls[2:] == ['b.txt']
+    with open(third['chunks_path'], encoding='utf-8') as f:
+        texts = [json.loads(line)['text'] for line in f]
+    assert texts == ["1. Утвердить порядок лицензирования.", "1. Контроль возложить на заместителя министра."]
+
+
+def test_incremental_result_matches_full_build(tmp_path):
+    files = _corpus(tmp_path)
+    processor = RAGDataProcessor(extractor=TextExtractor())
+
+    full = processor.process_multiple_npa(files, chunks_path=str(tmp_path / 'full.jsonl'))
+    processor.update_corpus(files, str(tmp_path / 'corpus'))
+    incremental = processor.process_multiple_npa(files, chunks_path=str(tmp_path / 'inc.jsonl'),
+                                                 corpus_dir=str(tmp_path / 'corpus'))
+
+    assert incremental == full
+    with open(tmp_path / 'full.jsonl', encoding='utf-8') as f, open(tmp_path / 'inc.jsonl', encoding='utf-8') as g:
+        assert f.read() == g.read()
+
+
+def test_chunker_change_rechunks_without_extraction(tmp_path):
+    files = _corpus(tmp_path)
+    corpus_dir = str(tmp_path / 'corpus')
+    extractor = TextExtractor()
+    RAGDataProcessor(extractor=extractor).update_corpus(files, corpus_dir)
+
+    stats = RAGDataProcessor(extractor=extractor, chunker=NPAChunker(max_chars=500, overlap_chars=50)) \
+        .update_corpus(files, corpus_dir)
+
+    assert (stats['rechunked'], stats['extracted']) == (2, 0)
+    assert extractor.calls == ['a.txt', 'b.txt']
+
+
+def test_removed_and_failed_documents_leave_corpus(tmp_path):
+    files = _corpus(tmp_path)
+    corpus_dir = str(tmp_path / 'corpus')
+    processor = RAGDataProcessor(extractor=TextExtractor())
+    processor.update_corpus(files, corpus_dir)
+    artifacts = CorpusManifest(corpus_dir).artifact_paths(os.path.abspath(files[0]))
+
+    stats = processor.update_corpus(files[1:], corpus_dir)
+    assert (stats['documents'], stats['removed']) == (1, 1)
+    assert not os.path.exists(artifacts['clean_path'])
+
+    _document(tmp_path / 'b.txt', ["СБОЙ"])
+    stats = processor.update_corpus(files[1:], corpus_dir)
+    assert (stats['documents'], stats['failed']) == (0, 1)
+    with CorpusManifest(corpus_dir) as manifest:
+        assert manifest.entries == {}
+
+
+def test_manifest_skips_truncated_line(tmp_path):
+    source = _document(tmp_path / 'a.txt', ["Пункт."])
+    with CorpusManifest(str(tmp_path / 'corpus')) as manifest:
+        manifest.record(source, {'content_hash': manifest.content_hash(source)})
+        path = manifest.path
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"path": "недописанная')
+
+    with CorpusManifest(str(tmp_path / 'corpus')) as manifest:
+        assert list(manifest.entries) == [source]
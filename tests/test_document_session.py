@@ -0,0 +1,41 @@
+import fitz
+
+from pdf_extract_processor.document_session import PDFDocumentSession
+
+
+def _text_pdf(path, pages):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {number + 1}: " + "regulation text " * 8, fontname='helv')
+    doc.save(path)
+    return path
+
+
+def test_text_cache_is_bounded(tmp_path):
+    with PDFDocumentSession(_text_pdf(str(tmp_path / 'doc.pdf'), 10), max_cached_texts=3) as session:
+        for page_num in range(10):
+            session.get_text(page_num)
+        assert list(session._text_cache) == [7, 8, 9]
+
+
+def test_uncached_read_does_not_grow_cache(tmp_path):
+    with PDFDocumentSession(_text_pdf(str(tmp_path / 'doc.pdf'), 5)) as session:
+        first = session.get_text(0)
+        texts = [session.get_text(page_num, cache=False) for page_num in range(5)]
+        assert texts[0] == first
+        assert list(session._text_cache) == [0]
+
+
+def test_hybrid_routes_pages_in_order_without_caching_text(tmp_path, monkeypatch):
+    from pdf_extract_processor import improved_processor
+    from pdf_extract_processor.improved_processor import ImprovedAdvancedPDFExtractProcessor
+
+    monkeypatch.setattr(improved_processor, '_HYBRID_WINDOW', 4)
+    processor = ImprovedAdvancedPDFExtractProcessor(hybrid_routing=True)
+    path = _text_pdf(str(tmp_path / 'doc.pdf'), 10)
+    with PDFDocumentSession(path) as session:
+        pages = list(processor._iter_hybrid(path, session))
+        assert not session._text_cache
+    assert [page.page_number for page in pages] == list(range(1, 11))
+    assert [route.page_number for route in processor.last_page_routes] == list(range(1, 11))
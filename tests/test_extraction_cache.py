@@ -0,0 +1,80 @@
+import fitz
+
+from pdf_extract_processor.improved_processor import ImprovedAdvancedPDFExtractProcessor
+from pdf_extract_processor.main_processor import PDFQualityAnalyzer
+
+
+def _text_pdf(path):
+    doc = fitz.open()
+    for number in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {number + 1}: " + "regulation text " * 8, fontname='helv')
+    doc.save(path)
+    return path
+
+
+def test_streaming_reuses_cached_verdict(tmp_path, monkeypatch):
+    path = _text_pdf(str(tmp_path / 'doc.pdf'))
+    processor = ImprovedAdvancedPDFExtractProcessor(cache_dir=str(tmp_path / 'cache'))
+    calls = []
+    analyze = processor.quality_analyzer.analyze_pdf_quality
+    monkeypatch.setattr(processor.quality_analyzer, 'analyze_pdf_quality',
+                        lambda *args: calls.append(args) or analyze(*args))
+
+    first = processor.process_file_streaming(path, str(tmp_path / 'first.md'))
+    second = processor.process_file_streaming(path, str(tmp_path / 'second.md'))
+
+    assert len(calls) == 1
+    assert second['extraction_method'] == first['extraction_method'] == 'text_extraction'
+    assert second['pages_written'] == 3
+
+
+def test_analyzer_version_change_invalidates_cached_verdict(tmp_path, monkeypatch):
+    path = _text_pdf(str(tmp_path / 'doc.pdf'))
+    processor = ImprovedAdvancedPDFExtractProcessor(cache_dir=str(tmp_path / 'cache'))
+    processor.process_file_streaming(path, str(tmp_path / 'first.md'))
+
+    calls = []
+    analyze = processor.quality_analyzer.analyze_pdf_quality
+    monkeypatch.setattr(processor.quality_analyzer, 'analyze_pdf_quality',
+                        lambda *args: calls.append(args) or analyze(*args))
+    monkeypatch.setattr(PDFQualityAnalyzer, 'VERSION', PDFQualityAnalyzer.VERSION + 1)
+    processor.process_file_streaming(path, str(tmp_path / 'second.md'))
+
+    assert len(calls) == 1
+
+
+def test_size_counter_tracks_writes_and_eviction(tmp_path):
+    from pdf_extract_processor.utils.extraction_cache import ExtractionCache
+
+    cache = ExtractionCache(str(tmp_path / 'cache'), max_size_mb=0.01)
+    for number in range(10):
+        cache.put_page_text(f'page{number}', 'x' * 3000)
+    cache.put_text('hash', 'ocr', {}, 'y' * 1000)
+    cache.put_text('hash', 'ocr', {}, 'y' * 500)
+
+    conn = cache._connect()
+    assert cache._stored_size(conn) == cache._total_size(conn) <= cache.max_size_bytes
+    assert cache.get_text('hash', 'ocr', {}) == 'y' * 500
+    assert cache.get_page_text('page0') is None
+
+
+def test_page_cache_is_keyed_by_ocr_engine_version(tmp_path):
+    from pdf_extract_processor.improved_processor import _ocr_pixmap_cached
+    from pdf_extract_processor.utils.extraction_cache import ExtractionCache
+
+    class FakeEngine:
+        def __init__(self, version):
+            self.version = version
+
+        def image_to_string(self, image, lang, config=''):
+            return self.version
+
+    doc = fitz.open(_text_pdf(str(tmp_path / 'doc.pdf')))
+    pix = doc[0].get_pixmap()
+    cache = ExtractionCache(str(tmp_path / 'cache'))
+    settings = {'lang': 'rus+eng', 'config': ''}
+
+    assert _ocr_pixmap_cached(pix, settings, cache, FakeEngine('tesseract 4')) == ('tesseract 4', False)
+    assert _ocr_pixmap_cached(pix, settings, cache, FakeEngine('tesseract 4')) == ('tesseract 4', True)
+    assert _ocr_pixmap_cached(pix, settings, cache, FakeEngine('tesseract 5')) == ('tesseract 5', False)
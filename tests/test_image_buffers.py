@@ -0,0 +1,59 @@
+import fitz
+import numpy as np
+import pytest
+
+from pdf_extract_processor.utils.image_buffers import pixmap_to_array, pixmap_to_pil, render_page
+
+
+def _page():
+    doc = fitz.open()
+    page = doc.new_page(width=200, height=100)
+    page.draw_rect(fitz.Rect(20, 20, 80, 60), color=(1, 0, 0), fill=(1, 0, 0))
+    return doc, page
+
+
+def _decoded(pix):
+    """Эталон: прежний путь через PNG"""
+    cv2 = pytest.importorskip('cv2')
+    image = cv2.imdecode(np.frombuffer(pix.tobytes("png"), np.uint8), cv2.IMREAD_UNCHANGED)
+    return image if pix.n == 1 else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+@pytest.mark.parametrize('gray', [False, True])
+def test_array_matches_png_round_trip(gray):
+    _, page = _page()
+    pix = render_page(page, 1.5, gray)
+
+    array = pixmap_to_array(pix)
+    assert array.shape == ((pix.height, pix.width) if gray else (pix.height, pix.width, 3))
+    assert np.array_equal(array, _decoded(pix))
+    assert not array.flags.writeable
+    del array  # Представление освобождается раньше пиксмапа
+
+
+def test_array_shares_pixmap_memory():
+    _, page = _page()
+    pix = render_page(page, 1.0, gray=True)
+    array = pixmap_to_array(pix)
+
+    pix.clear_with(0)
+    assert array.max() == 0
+    del array
+
+
+@pytest.mark.parametrize('gray, mode', [(False, 'RGB'), (True, 'L')])
+def test_pil_image_matches_pixels(gray, mode):
+    _, page = _page()
+    pix = render_page(page, 2.0, gray)
+
+    image = pixmap_to_pil(pix)
+    assert (image.mode, image.size) == (mode, (pix.width, pix.height))
+    assert np.array_equal(np.asarray(image), pixmap_to_array(pix))
+    del image
+
+
+def test_alpha_pixmap_is_rejected():
+    _, page = _page()
+
+    with pytest.raises(ValueError, match='альфа'):
+        pixmap_to_pil(page.get_pixmap(alpha=True))
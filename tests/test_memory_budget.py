@@ -0,0 +1,50 @@
+import subprocess
+import sys
+import time
+
+import fitz
+
+from pdf_extract_processor import memory_budget
+from pdf_extract_processor.memory_budget import OCR_PROCESS_BASE_MB, MemoryBudget, process_tree_rss
+
+
+def test_tree_rss_includes_child_processes():
+    own_rss, own_children = process_tree_rss()
+    child = subprocess.Popen([sys.executable, '-c', "x = bytearray(80 * 1024 * 1024); import time; time.sleep(30)"])
+    try:
+        time.sleep(1.0)
+        rss, children = process_tree_rss()
+    finally:
+        child.kill()
+        child.wait()
+    assert children == own_children + 1
+    assert rss - own_rss > 60
+
+
+def _page():
+    doc = fitz.open()
+    return doc, doc.new_page(width=595, height=842)
+
+
+def test_pages_in_flight_counts_base_rss_of_processes_not_yet_started(monkeypatch):
+    doc, page = _page()
+    budget = MemoryBudget(1000)
+    cost = budget.page_cost_mb(page, 2.5)
+
+    monkeypatch.setattr(memory_budget, 'process_tree_rss', lambda: (200.0, 0))
+    limit, _ = budget.pages_in_flight(page, 2.5, workers=8, in_flight=0)
+    assert limit == int(800 // (cost + OCR_PROCESS_BASE_MB))
+
+    # Запущенные процессы уже входят в замер RSS
+    monkeypatch.setattr(memory_budget, 'process_tree_rss', lambda: (200.0 + 2 * OCR_PROCESS_BASE_MB, 8))
+    limit, share = budget.pages_in_flight(page, 2.5, workers=8, in_flight=0)
+    assert limit == min(8, int((800 - 2 * OCR_PROCESS_BASE_MB) // cost))
+    assert share > OCR_PROCESS_BASE_MB
+
+
+def test_over_budget_still_allows_one_page(monkeypatch):
+    doc, page = _page()
+    monkeypatch.setattr(memory_budget, 'process_tree_rss', lambda: (900.0, 4))
+    limit, share = MemoryBudget(500).pages_in_flight(page, 2.5, workers=4, in_flight=0)
+    assert limit == 1
+    assert share == OCR_PROCESS_BASE_MB
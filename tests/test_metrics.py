@@ -0,0 +1,32 @@
+from pdf_extract_processor.metrics import ProcessingMetrics
+
+
+def test_worker_stages_are_marked_as_worker_time():
+    metrics = ProcessingMetrics()
+    document = metrics.begin_document('doc.pdf')
+    with metrics.stage('analyze'):
+        pass
+    # Две страницы параллельно: время воркеров больше настенного времени документа
+    metrics.record_timings({'render': [1.0, 1.0], 'ocr': [4.0, 3.5]}, page=1, remote=True)
+    metrics.record_timings({'render': [1.0, 1.0], 'ocr': [4.0, 3.5]}, page=2, remote=True)
+
+    assert document.worker_stages == {'render', 'ocr'}
+    record = metrics.end_document('success', pages=2)
+    assert record['worker_stages'] == ['ocr', 'render']
+    assert record['stages']['ocr'][0] == 8.0
+    assert metrics.to_dict()['worker_stages'] == ['ocr', 'render']
+
+    summary = metrics.summary_line()
+    assert 'OCR 8.0с*' in summary
+    assert 'Анализ качества 0.0с*' not in summary
+
+
+def test_worker_stages_from_worker_records_are_aggregated():
+    metrics = ProcessingMetrics()
+    metrics.add_document({'status': 'success', 'pages': 1, 'wall_seconds': 2.0,
+                          'stages': {'ocr': [3.0, 3.0], 'correct': [0.1, 0.1]}, 'worker_stages': ['ocr']})
+    metrics.add_document({'status': 'success', 'pages': 1, 'wall_seconds': 1.0, 'stages': {'correct': [0.1, 0.1]}})
+
+    assert metrics.worker_stages == {'ocr'}
+    assert 'Коррекция 0.2с' in metrics.summary_line()
+    assert 'Коррекция 0.2с*' not in metrics.summary_line()
@@ -0,0 +1,40 @@
+import random
+import re
+
+from pdf_extract_processor.utils.multi_replace import MultiReplacer, sequential_replacers, trie_pattern
+
+
+def test_longest_entry_wins_and_replacements_are_not_rescanned():
+    replacer = MultiReplacer({'ПР1': 'x', 'ПР1КАЗ': 'ПРИКАЗ', 'ПРИКАЗ': 'неверно'})
+    assert replacer.apply('ПР1КАЗ и ПР1') == 'ПРИКАЗ и x'
+
+
+def test_rules_use_group_references():
+    replacer = MultiReplacer({'©': 'О'}, [(r'(\d)О(\d)', r'\g<1>0\2')])
+    assert replacer.apply('1О5 ©') == '105 О'
+
+
+def test_trie_pattern_matches_every_word():
+    words = ['ab', 'abc', 'b', 'bd', 'x.y']
+    pattern = trie_pattern(words)
+    for word in words:
+        assert re.fullmatch(pattern, word)
+
+
+def test_sequential_replacers_match_str_replace():
+    rng = random.Random(5)
+    alphabet = 'абвгО0©'
+    for _ in range(300):
+        pairs = [("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 3))),
+                  "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3))))
+                 for _ in range(rng.randint(1, 8))]
+        replacers = sequential_replacers(pairs)
+        for _ in range(20):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            expected = text
+            for key, value in pairs:
+                expected = expected.replace(key, value)
+            result = text
+            for replacer in replacers:
+                result = replacer.apply(result)
+            assert result == expected, (pairs, text)
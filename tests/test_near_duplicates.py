@@ -0,0 +1,119 @@
+import random
+
+from pdf_extract_processor.near_duplicates import NearDuplicateDetector
+
+
+class _ScanSession:
+    """Скан без текстового слоя: текст страниц приходит из ocr_page"""
+
+    def __init__(self, pages, text_layer=False):
+        self.pages = pages
+        self.text_layer = text_layer
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    def get_text(self, page_num):
+        return self.pages[page_num] if self.text_layer else ""
+
+
+def _pages(count, seed):
+    rng = random.Random(seed)
+    vocabulary = [f"слово{i}" for i in range(5000)]
+    return [" ".join(rng.choices(vocabulary, k=200)) for _ in range(count)]
+
+
+def _fingerprint(detector, pages, text_layer=False):
+    return detector.fingerprint(_ScanSession(pages, text_layer), pages.__getitem__)
+
+
+def test_probes_span_whole_document():
+    detector = NearDuplicateDetector(probe_pages=5)
+    assert detector.probe_page_numbers(3) == [0, 1, 2]
+    assert detector.probe_page_numbers(12) == [1, 3, 6, 8, 11]
+    assert detector.probe_page_numbers(100)[-1] == 99
+
+
+def test_rescan_is_duplicate():
+    detector = NearDuplicateDetector()
+    pages = _pages(12, seed=1)
+    assert detector.check('original', _fingerprint(detector, pages)) is None
+
+    match = detector.check('copy', _fingerprint(detector, list(pages)))
+    assert match is not None and match.original == 'original'
+
+
+def test_same_head_different_tail_is_not_duplicate():
+    detector = NearDuplicateDetector()
+    pages = _pages(12, seed=1)
+    detector.check('v1', _fingerprint(detector, pages))
+
+    v2 = pages[:6] + _pages(6, seed=2)
+    assert detector.check('v2', _fingerprint(detector, v2)) is None
+
+
+def test_different_page_count_is_not_duplicate():
+    detector = NearDuplicateDetector()
+    pages = _pages(12, seed=1)
+    detector.check('v1', _fingerprint(detector, pages))
+
+    assert detector.check('v2', _fingerprint(detector, pages + _pages(3, seed=2))) is None
+
+
+def test_text_layer_document_is_registered_but_not_checked():
+    detector = NearDuplicateDetector()
+    pages = _pages(12, seed=1)
+    detector.check('original', _fingerprint(detector, pages, text_layer=True))
+
+    # Копия с текстовым слоем извлекается сама: OCR пропускать нечего
+    copy = _fingerprint(detector, list(pages), text_layer=True)
+    assert copy.text_layer
+    assert detector.check('copy', copy) is None
+
+    # Скан того же документа находит оригинал
+    match = detector.check('scan', _fingerprint(detector, list(pages)))
+    assert match is not None and match.original in ('original', 'copy')
+
+
+def _link_processor(monkeypatch, pages):
+    from pdf_extract_processor.improved_processor import ImprovedAdvancedPDFExtractProcessor
+    from pdf_extract_processor.main_processor import QualityLevel
+
+    processor = ImprovedAdvancedPDFExtractProcessor(dedup='link')
+    detector = processor.duplicate_detector
+    monkeypatch.setattr(processor, 'fingerprint_document', lambda path: _fingerprint(detector, pages))
+    extracted = []
+
+    def extract(path):
+        extracted.append(path)
+        return QualityLevel.C, 0.5, 'ocr', f"--- Страница 1 ---\n\nНастоящий приказ вступает в силу со дня подписания: {path}"
+
+    monkeypatch.setattr(processor, '_analyze_and_extract_cached', extract)
+    # Вместо Markdown - сам текст документа
+    monkeypatch.setattr(processor, '_create_improved_markdown', lambda text, *args: text)
+    return processor, extracted
+
+
+def test_link_mode_keeps_original_text_on_disk(monkeypatch):
+    processor, extracted = _link_processor(monkeypatch, _pages(12, seed=1))
+    processor.process_single_file_advanced('original.pdf')
+    stored = processor._dedup_originals['original.pdf']['result'][3]
+    with open(stored, encoding='utf-8') as f:
+        assert f.read() == "--- Страница 1 ---\n\nНастоящий приказ вступает в силу со дня подписания: original.pdf"
+
+    markdown = processor.process_single_file_advanced('copy.pdf')
+    assert extracted == ['original.pdf']
+    assert "подписания: original.pdf" in markdown
+    processor.close()
+
+
+def test_link_mode_extracts_copy_when_original_text_is_gone(monkeypatch):
+    processor, extracted = _link_processor(monkeypatch, _pages(12, seed=1))
+    processor.process_single_file_advanced('original.pdf')
+    processor.close()
+
+    markdown = processor.process_single_file_advanced('copy.pdf')
+    assert extracted == ['original.pdf', 'copy.pdf']
+    assert "подписания: copy.pdf" in markdown
+    assert processor.dedup_report()['duplicates'] == 0
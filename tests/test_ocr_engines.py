@@ -0,0 +1,126 @@
+import types
+
+import pytest
+from PIL import Image
+
+from pdf_extract_processor import ocr_engines
+from pdf_extract_processor.ocr_engines import (OCR_ENGINE_ENV, TesserocrEngine, get_ocr_engine,
+                                               ocr_data_to_text, parse_tesseract_config,
+                                               resolve_ocr_engine_name)
+
+
+class FakeAPI:
+    """PyTessBaseAPI без Tesseract: запоминает параметры и изображение"""
+    created = []
+
+    def __init__(self, lang, psm=None, oem=None):
+        self.options = (lang, psm, oem)
+        self.variables = {}
+        self.ended = False
+        FakeAPI.created.append(self)
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        self.image = (len(data), width, height, bytes_per_pixel, bytes_per_line)
+
+    def GetUTF8Text(self):
+        return f"{self.options[0]} text\n"
+
+    def MeanTextConf(self):
+        return 87
+
+    def End(self):
+        self.ended = True
+
+
+class FallbackEngine:
+    name = 'fallback'
+    version = 'fallback 1'
+
+    def image_to_string(self, image, lang, config=''):
+        return "fallback text\n"
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch):
+    FakeAPI.created = []
+    module = types.SimpleNamespace(PyTessBaseAPI=FakeAPI, tesseract_version=lambda: "tesseract 5.3.0\n leptonica")
+    get_engine = ocr_engines.get_engine
+    monkeypatch.setattr(ocr_engines, 'get_engine', lambda name: module if name == 'tesserocr' else get_engine(name))
+    return module
+
+
+def test_parse_tesseract_config():
+    assert parse_tesseract_config('--oem 1 --psm 6 -c preserve_interword_spaces=1') == \
+        (6, 1, {'preserve_interword_spaces': '1'})
+    assert parse_tesseract_config('') == (None, None, {})
+
+
+def test_ocr_data_to_text_groups_lines_and_paragraphs():
+    data = {
+        'text': ['Приказ', 'о', '', 'порядке', 'шум', 'Пункт'],
+        'conf': ['90', '80', '-1', '70', '-1', '60'],
+        'block_num': [1, 1, 1, 1, 1, 2],
+        'par_num': [1, 1, 1, 1, 1, 1],
+        'line_num': [1, 1, 1, 2, 2, 1],
+    }
+
+    text, confidence = ocr_data_to_text(data)
+    assert text == "Приказ о\nпорядке\n\nПункт\n"
+    assert confidence == pytest.approx(75.0)
+    assert ocr_data_to_text({key: [] for key in data}) == ("", 0.0)
+
+
+def test_engine_name_resolution(monkeypatch):
+    monkeypatch.setenv(OCR_ENGINE_ENV, 'pytesseract')
+    assert resolve_ocr_engine_name() == 'pytesseract'
+    assert resolve_ocr_engine_name('tesserocr') == 'tesserocr'
+
+    monkeypatch.setattr(ocr_engines, 'is_engine_available', lambda name: False)
+    assert resolve_ocr_engine_name('auto') == 'pytesseract'
+    with pytest.raises(ValueError, match='Неизвестный движок OCR'):
+        resolve_ocr_engine_name('easyocr')
+
+
+def test_engine_instance_is_reused():
+    engine = get_ocr_engine('pytesseract')
+
+    assert get_ocr_engine('pytesseract') is engine
+
+
+def test_apis_are_reused_per_config_and_bounded(fake_tesserocr):
+    engine = TesserocrEngine(max_apis=2)
+    image = Image.new('L', (40, 20), 255)
+
+    assert engine.image_to_string(image, 'rus+eng', '--psm 6') == "rus+eng text\n"
+    assert engine.text_with_confidence(image, 'rus+eng', '--psm 6') == ("rus+eng text\n", 87.0)
+    assert len(FakeAPI.created) == 1
+    assert FakeAPI.created[0].options == ('rus+eng', 6, None)
+    assert FakeAPI.created[0].image == (800, 40, 20, 1, 40)
+
+    engine.image_to_string(image, 'eng', '-c tessedit_do_invert=0')
+    engine.image_to_string(image, 'rus', '')
+    assert FakeAPI.created[1].variables == {'tessedit_do_invert': '0'}
+    # Самый давно использованный API освобождается
+    assert [api.ended for api in FakeAPI.created] == [True, False, False]
+    assert engine.version == "tesserocr tesseract 5.3.0"
+
+    engine.close()
+    assert all(api.ended for api in FakeAPI.created)
+
+
+def test_missing_tesserocr_falls_back(monkeypatch):
+    def unavailable(name):
+        raise ImportError(f"Движок '{name}' недоступен")
+
+    monkeypatch.setattr(ocr_engines, 'get_engine', unavailable)
+    engine = TesserocrEngine(fallback=FallbackEngine())
+    image = Image.new('RGB', (10, 10))
+
+    assert engine.image_to_string(image, 'rus') == "fallback text\n"
+    assert engine.version == 'fallback 1'
+
+    with pytest.raises(ImportError):
+        TesserocrEngine().image_to_string(image, 'rus')
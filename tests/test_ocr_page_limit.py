@@ -0,0 +1,49 @@
+import fitz
+
+from pdf_extract_processor import improved_processor
+from pdf_extract_processor.improved_processor import ImprovedAdvancedPDFExtractProcessor
+from pdf_extract_processor.streaming import PageResult
+
+
+def _blank_pdf(path, pages):
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page()
+    doc.save(path)
+    return path
+
+
+def _fake_ocr(processor, monkeypatch):
+    recognized = []
+
+    def ocr_batch(file_path, session, page_nums):
+        for page_num in page_nums:
+            recognized.append(page_num)
+            yield PageResult(page_num + 1, f"page {page_num + 1}", 'ocr', False)
+
+    monkeypatch.setattr(processor, '_iter_ocr_batch', ocr_batch)
+    return recognized
+
+
+def test_streaming_ocr_is_not_truncated(tmp_path, monkeypatch):
+    path = _blank_pdf(str(tmp_path / 'scan.pdf'), 12)
+    processor = ImprovedAdvancedPDFExtractProcessor(ocr_workers=1)
+    recognized = _fake_ocr(processor, monkeypatch)
+
+    pages = list(processor.iter_pages(path, method='ocr_simple'))
+
+    assert [page.page_number for page in pages] == list(range(1, 13))
+    assert recognized == list(range(12))
+
+
+def test_in_memory_ocr_warns_when_truncated(tmp_path, monkeypatch, caplog):
+    path = _blank_pdf(str(tmp_path / 'scan.pdf'), 12)
+    processor = ImprovedAdvancedPDFExtractProcessor(ocr_workers=1)
+    recognized = _fake_ocr(processor, monkeypatch)
+
+    with caplog.at_level('WARNING', logger=improved_processor.__name__):
+        text = processor._extract_text_ocr_improved(path)
+
+    assert recognized == list(range(10))
+    assert 'page 10' in text and 'page 11' not in text
+    assert 'первыми 10 из 12' in caplog.text
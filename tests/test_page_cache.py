@@ -0,0 +1,59 @@
+import fitz
+
+from pdf_extract_processor import improved_processor
+from pdf_extract_processor.improved_processor import ImprovedAdvancedPDFExtractProcessor
+
+
+class CountingEngine:
+    """Движок OCR без Tesseract: считает распознанные страницы"""
+    version = 'fake 1'
+
+    def __init__(self):
+        self.calls = 0
+
+    def image_to_string(self, image, lang, config=''):
+        self.calls += 1
+        return f"recognized {self.calls}\n"
+
+
+def _scan(path, texts):
+    """Страницы-изображения: текстового слоя нет, содержимое отличается пикселями"""
+    doc = fitz.open()
+    for text in texts:
+        source = fitz.open()
+        source.new_page().insert_text((72, 100), text, fontsize=24)
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=source[0].get_pixmap(dpi=40))
+    doc.save(path)
+    return path
+
+
+def _recognize(processor, path):
+    return [(page.page_number, page.cache_hit) for page in processor.iter_pages(path, method='ocr_simple')]
+
+
+def test_revised_document_only_reocrs_changed_pages(tmp_path, monkeypatch):
+    engine = CountingEngine()
+    monkeypatch.setattr(improved_processor, 'get_ocr_engine', lambda name=None: engine)
+    processor = ImprovedAdvancedPDFExtractProcessor(cache_dir=str(tmp_path / 'cache'))
+
+    original = _scan(str(tmp_path / 'v1.pdf'), ["Article 1", "Article 2", "Article 3"])
+    assert _recognize(processor, original) == [(1, False), (2, False), (3, False)]
+
+    revised = _scan(str(tmp_path / 'v2.pdf'), ["Article 1", "Article 2 revised", "Article 3"])
+    assert _recognize(processor, revised) == [(1, True), (2, False), (3, True)]
+    assert engine.calls == 4
+    assert processor.page_cache_stats == {'hits': 2, 'misses': 1}
+
+
+def test_ocr_settings_are_part_of_page_key(tmp_path, monkeypatch):
+    engine = CountingEngine()
+    monkeypatch.setattr(improved_processor, 'get_ocr_engine', lambda name=None: engine)
+    path = _scan(str(tmp_path / 'v1.pdf'), ["Article 1"])
+
+    _recognize(ImprovedAdvancedPDFExtractProcessor(cache_dir=str(tmp_path / 'cache')), path)
+    processor = ImprovedAdvancedPDFExtractProcessor(cache_dir=str(tmp_path / 'cache'))
+    processor.ocr_settings = dict(processor.ocr_settings, lang='eng')
+
+    assert _recognize(processor, path) == [(1, False)]
+    assert engine.calls == 2
@@ -0,0 +1,78 @@
+import fitz
+
+from pdf_extract_processor.document_session import PDFDocumentSession
+from pdf_extract_processor.page_router import ROUTE_OCR, ROUTE_TEXT, PageRouter, summarize_routes
+from pdf_extract_processor.streaming import PageResult
+
+
+def _scan_image():
+    source = fitz.open()
+    page = source.new_page()
+    page.insert_text((72, 100), "SCANNED", fontsize=30)
+    return page.get_pixmap(dpi=50)
+
+
+def _mixed_pdf(path):
+    """Текст, скан, скан со штампом, пустая страница, ещё текст"""
+    doc = fitz.open()
+    scan = _scan_image()
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 550, 800), "Cover letter text. " * 40, fontname='helv')
+    page = doc.new_page()
+    page.insert_image(page.rect, pixmap=scan)
+    page = doc.new_page()
+    page.insert_image(page.rect, pixmap=scan)
+    page.insert_text((72, 820), "Stamp: the copy is correct, registry number 12345, 2021", fontname='helv')
+    doc.new_page()
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 550, 800), "Closing text. " * 40, fontname='helv')
+    doc.save(path)
+    return path
+
+
+def test_pages_are_routed_by_text_layer_and_images(tmp_path):
+    with PDFDocumentSession(_mixed_pdf(str(tmp_path / 'mixed.pdf'))) as session:
+        routes = PageRouter().route_document(session)
+
+    assert [(route.route, route.reason) for route in routes] == [
+        (ROUTE_TEXT, 'text_layer'),
+        (ROUTE_OCR, 'no_text_layer'),
+        (ROUTE_OCR, 'scan_with_sparse_text'),
+        (ROUTE_TEXT, 'blank_page'),
+        (ROUTE_TEXT, 'text_layer'),
+    ]
+    assert routes[1].image_coverage > 0.99
+    assert summarize_routes(routes)[ROUTE_OCR] == 2
+
+
+def test_broken_text_encoding_goes_to_ocr(tmp_path):
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(str(tmp_path / 'doc.pdf'))
+    with PDFDocumentSession(str(tmp_path / 'doc.pdf')) as session:
+        route = PageRouter().classify_page(session.get_page(0), "�" * 40 + "text " * 10, 1)
+
+    assert (route.route, route.reason) == (ROUTE_OCR, 'broken_text_encoding')
+
+
+def test_hybrid_ocr_only_for_routed_pages_in_page_order(tmp_path, monkeypatch):
+    from pdf_extract_processor.improved_processor import ImprovedAdvancedPDFExtractProcessor
+
+    processor = ImprovedAdvancedPDFExtractProcessor(hybrid_routing=True)
+    requested = []
+
+    def fake_ocr(file_path, session, page_nums):
+        requested.extend(page_nums)
+        for page_num in page_nums:
+            yield PageResult(page_num + 1, f"OCR {page_num + 1}", ROUTE_OCR)
+
+    monkeypatch.setattr(processor, '_iter_ocr_batch', fake_ocr)
+    path = _mixed_pdf(str(tmp_path / 'mixed.pdf'))
+    with PDFDocumentSession(path) as session:
+        pages = list(processor._iter_hybrid(path, session))
+
+    assert requested == [1, 2]
+    assert [(page.page_number, page.method) for page in pages] == [
+        (1, ROUTE_TEXT), (2, ROUTE_OCR), (3, ROUTE_OCR), (4, ROUTE_TEXT), (5, ROUTE_TEXT)]
+    assert pages[1].text == "OCR 2" and "Cover letter" in pages[0].text
+    assert len(processor.last_page_routes) == 5
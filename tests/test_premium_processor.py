@@ -0,0 +1,20 @@
+from pdf_extract_processor.postprocessing import premium_processor
+from pdf_extract_processor.postprocessing.premium_processor import PremiumPostProcessor
+
+TEXTS = [f"СТРАНЦА {number}\nсоответствипунктом {number}" for number in range(10)]
+
+
+def test_batch_process_is_single_process_by_default(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("пул процессов не должен создаваться")
+
+    monkeypatch.setattr(premium_processor, 'ProcessPoolExecutor', no_pool)
+    processor = PremiumPostProcessor({'chunk_size': 2})
+
+    assert processor.batch_process(TEXTS) == [processor.process(text) for text in TEXTS]
+
+
+def test_pool_keeps_input_order():
+    processor = PremiumPostProcessor({'workers': 2, 'chunk_size': 3})
+
+    assert processor.batch_process(TEXTS) == [processor.process(text) for text in TEXTS]
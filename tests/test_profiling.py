@@ -0,0 +1,47 @@
+import json
+import os
+import tracemalloc
+
+import fitz
+
+from pdf_extract_processor.improved_processor import ImprovedAdvancedPDFExtractProcessor
+from pdf_extract_processor.profiling import PROFILE_MEMORY_ENV, DocumentProfiler
+
+
+def _text_pdf(path):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "regulation text " * 8, fontname='helv')
+    doc.save(path)
+    return path
+
+
+def test_fingerprint_probe_is_not_profiled_as_document(tmp_path):
+    path = _text_pdf(str(tmp_path / 'doc.pdf'))
+    profile_dir = str(tmp_path / 'profiles')
+    processor = ImprovedAdvancedPDFExtractProcessor(dedup='skip', profile_dir=profile_dir)
+
+    processor.fingerprint_document(path)
+    assert processor.profiler.kept == []
+
+    processor.process_single_file_advanced(path)
+    with open(os.path.join(profile_dir, 'profiles.json'), encoding='utf-8') as f:
+        index = json.load(f)
+    assert [entry['source'] for entry in index] == [path]
+    assert 'fingerprint_document' in index[0]['sections']
+
+
+def test_memory_tracing_is_opt_in(tmp_path, monkeypatch):
+    profiler = DocumentProfiler(str(tmp_path / 'plain'))
+    with profiler.document('a.pdf'):
+        assert not tracemalloc.is_tracing()
+    assert profiler.kept[0].peak_python_mb == 0
+
+    monkeypatch.setenv('PDF_EXTRACT_PROFILE_DIR', str(tmp_path / 'traced'))
+    monkeypatch.setenv(PROFILE_MEMORY_ENV, '1')
+    profiler = DocumentProfiler.from_env()
+    with profiler.document('b.pdf'):
+        assert tracemalloc.is_tracing()
+        data = [bytearray(1024) for _ in range(1000)]
+    del data
+    assert profiler.kept[0].peak_python_mb > 0
@@ -0,0 +1,71 @@
+import fitz
+import numpy as np
+import pytest
+
+from pdf_extract_processor.document_session import PDFDocumentSession
+from pdf_extract_processor.main_processor import PDFQualityAnalyzer
+from pdf_extract_processor.quality_scoring import ocr_method_for_score, sample_page_numbers
+from pdf_extract_processor.utils.image_buffers import pixmap_to_array, render_page
+
+cv2 = pytest.importorskip('cv2')
+
+LINE = "1. Nastoyashchiy prikaz vstupaet v silu so dnya ego ofitsialnogo opublikovaniya."
+
+
+def _legacy_score(img):
+    """Оценка анализатора до перехода на миниатюры (рендер 2x, OpenCV)"""
+    laplacian_var = cv2.Laplacian(img, cv2.CV_64F).var()
+    sharpness_score = min(laplacian_var / 1000, 1.0)
+    hist = cv2.calcHist([img], [0], None, [256], [0, 256])
+    contrast_score = hist.std() / 128.0
+    brightness_score = 1.0 - abs(img.mean() - 127) / 127.0
+    return min(sharpness_score * 0.4 + contrast_score * 0.4 + brightness_score * 0.2, 1.0)
+
+
+def _scan_variants():
+    """Сканы разной плотности текста, размытые, бледные и тёмные"""
+    variants = []
+    for lines in (50, 10, 3):
+        source = fitz.open()
+        page = source.new_page()
+        for i in range(lines):
+            page.insert_text((40, 50 + i * 15), LINE, fontsize=10)
+        sharp = pixmap_to_array(render_page(page, 2.0, gray=True)).copy()
+        variants += [sharp, cv2.GaussianBlur(sharp, (0, 0), 3),
+                     (255 - (255 - sharp.astype(np.int32)) * 0.3).astype(np.uint8),
+                     (sharp * 0.4).astype(np.uint8)]
+    variants.append(np.full_like(variants[0], 255))
+    return variants
+
+
+def _scan_pdf(path, images):
+    doc = fitz.open()
+    for image in images:
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=cv2.imencode('.png', image)[1].tobytes())
+    doc.save(path)
+    return path
+
+
+def test_page_methods_match_legacy_analyzer(tmp_path):
+    path = _scan_pdf(str(tmp_path / 'scan.pdf'), _scan_variants())
+    analyzer = PDFQualityAnalyzer()
+    with PDFDocumentSession(path) as session:
+        legacy = [ocr_method_for_score(_legacy_score(pixmap_to_array(render_page(page, 2, gray=True))))
+                  for page in session.doc]
+        current = [page.method for page in analyzer.page_quality_map(path, session)]
+    assert current == legacy
+
+
+def test_verdict_scores_a_fixed_sample(tmp_path):
+    path = _scan_pdf(str(tmp_path / 'scan.pdf'), _scan_variants()[:2] * 20)
+    analyzer = PDFQualityAnalyzer()
+    analyzer.sample_pages = 8
+    analyzer._analyze_image_quality(path)
+    assert [page.page_number for page in analyzer.last_page_quality] == [1, 6, 11, 16, 21, 26, 31, 36]
+
+
+def test_sample_page_numbers():
+    assert sample_page_numbers(3, 16) == [0, 1, 2]
+    sample = sample_page_numbers(1000, 16)
+    assert len(sample) == 16 and sample[0] == 0 and sample == sorted(set(sample))
@@ -0,0 +1,84 @@
+import math
+from collections import Counter
+
+import pytest
+
+from pdf_extract_processor.rag_tools.search_index import BM25Index, stem_russian, tokenize_russian
+
+DOCUMENTS = [
+    ('d1', "Порядок лицензирования фармацевтической деятельности", {'clause': '1'}),
+    ('d2', "Лицензия выдаётся на пять лет, лицензирование проводит министерство", {'clause': '2'}),
+    ('d3', "Требования к помещениям аптечных организаций", {'clause': '3'}),
+    ('d4', "Контроль за соблюдением требований проводится ежегодно", {'clause': '4'}),
+    ('d5', "Министерство утверждает порядок проведения проверок аптечных организаций", {'clause': '5'}),
+]
+
+
+def _bm25(query, documents, k1=1.2, b=0.75):
+    """Эталон: BM25 по всей коллекции без индекса"""
+    tokens = {key: tokenize_russian(text) for key, text, _ in documents}
+    avgdl = sum(len(terms) for terms in tokens.values()) / len(tokens)
+    scores = {}
+    for key, terms in tokens.items():
+        tf = Counter(terms)
+        score = 0.0
+        for term in dict.fromkeys(tokenize_russian(query)):
+            df = sum(term in other for other in tokens.values())
+            if tf[term]:
+                idf = math.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+                score += idf * tf[term] * (k1 + 1) / (tf[term] + k1 * (1 - b + b * len(terms) / avgdl))
+        if score:
+            scores[key] = score
+    return scores
+
+
+def test_word_forms_share_stem():
+    assert stem_russian('лицензирования') == stem_russian('лицензирование')
+    assert stem_russian('организаций') == stem_russian('организации')
+    assert tokenize_russian("Порядок и требования") == [stem_russian('порядок'), stem_russian('требования')]
+
+
+def test_scores_match_bm25_across_segments(tmp_path):
+    index = BM25Index(str(tmp_path / 'index'))
+    index.add_documents(DOCUMENTS, segment_size=2)
+    assert len(index._segments) == 3
+
+    for query in ("лицензирование аптечной деятельности", "проверки аптечных организаций"):
+        expected = _bm25(query, DOCUMENTS)
+        hits = index.search(query, top_k=10)
+        assert {hit.key: hit.score for hit in hits} == pytest.approx(expected, rel=1e-4)
+        assert hits[0].key == max(expected, key=expected.get)
+
+
+def test_index_is_incremental_and_persistent(tmp_path):
+    index = BM25Index(str(tmp_path / 'index'))
+    index.add_documents(DOCUMENTS[:3])
+    index.add_documents(DOCUMENTS[3:])
+
+    expected = _bm25("требования аптечных организаций", DOCUMENTS)
+    hits = BM25Index(str(tmp_path / 'index')).search("требования аптечных организаций", top_k=2)
+    assert [hit.key for hit in hits] == sorted(expected, key=expected.get, reverse=True)[:2]
+    assert hits[0].metadata == {'clause': '3'}
+    assert hits[0].text == DOCUMENTS[2][1]
+
+
+def test_delete_and_compact(tmp_path):
+    index = BM25Index(str(tmp_path / 'index'))
+    index.add_documents(DOCUMENTS, segment_size=2)
+
+    assert index.delete(['d1']) == 1
+    assert index.doc_count == 4
+    assert 'd1' not in {hit.key for hit in index.search("лицензирование")}
+
+    index.compact()
+    assert len(index._segments) == 1
+    expected = _bm25("лицензирование министерство", DOCUMENTS[1:])
+    hits = BM25Index(str(tmp_path / 'index')).search("лицензирование министерство")
+    assert {hit.key: hit.score for hit in hits} == pytest.approx(expected, rel=1e-4)
+
+
+def test_query_without_terms(tmp_path):
+    index = BM25Index(str(tmp_path / 'index'))
+    assert index.search("лицензирование") == []
+    index.add_documents(DOCUMENTS)
+    assert index.search("и в на") == []
@@ -0,0 +1,100 @@
+import json
+import os
+import time
+
+import fitz
+import pytest
+
+from pdf_extract_processor.sharding import ShardJob, work_shards
+from pdf_extract_processor.streaming import PageResult
+
+
+def _pdf(path, pages, prefix="Page"):
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f"{prefix} {number + 1}", fontname='helv')
+    doc.save(path)
+    return path
+
+
+class TextLayerProcessor:
+    """Процессор для воркера шардов: текстовый слой диапазона страниц"""
+
+    def __init__(self, fail_on_page=None):
+        self.fail_on_page = fail_on_page
+
+    def iter_page_range(self, path, start, end):
+        with fitz.open(path) as doc:
+            for page_num in range(start, end):
+                if page_num == self.fail_on_page:
+                    raise RuntimeError("сбой OCR")
+                yield PageResult(page_num + 1, doc[page_num].get_text(), 'text_layer')
+
+
+def test_create_splits_pages_and_is_idempotent(tmp_path):
+    source = _pdf(str(tmp_path / 'doc.pdf'), 12)
+    job = ShardJob.create(source, str(tmp_path / 'job'), shard_pages=5)
+
+    assert [(shard.start, shard.end) for shard in job.shards] == [(0, 5), (5, 10), (10, 12)]
+    assert ShardJob.create(source, str(tmp_path / 'job'), shard_pages=3).shards == job.shards
+
+    other = _pdf(str(tmp_path / 'other.pdf'), 3)
+    with pytest.raises(ValueError, match='занят заданием другого файла'):
+        ShardJob.create(other, str(tmp_path / 'job'))
+
+
+def test_claims_are_exclusive_until_lease_expires(tmp_path):
+    job = ShardJob.create(_pdf(str(tmp_path / 'doc.pdf'), 4), str(tmp_path / 'job'), shard_pages=2)
+    shard = job.shards[0]
+
+    assert job.claim(shard, 'host-a:1')
+    assert not job.claim(shard, 'host-b:2', lease_seconds=60)
+    assert job.next_shard('host-b:2', lease_seconds=60) == job.shards[1]
+
+    # Воркер host-a упал: захват не обновляется и перехватывается после срока аренды
+    stale = time.time() - 120
+    os.utime(job.claim_path(shard), (stale, stale))
+    assert job.status(lease_seconds=60)['stale'] == 1
+    assert job.claim(shard, 'host-b:2', lease_seconds=60)
+
+
+def test_workers_process_all_shards_and_merge_in_page_order(tmp_path):
+    source = _pdf(str(tmp_path / 'doc.pdf'), 7)
+    job = ShardJob.create(source, str(tmp_path / 'job'), shard_pages=3)
+    with pytest.raises(ValueError, match='Не готово шардов'):
+        job.merge(str(tmp_path / 'early.jsonl'), 'jsonl')
+
+    stats = work_shards(job, TextLayerProcessor(), max_shards=1)
+    assert stats['shards'] == 1 and job.status()['pending'] == 2
+    stats = work_shards(ShardJob(str(tmp_path / 'job')), TextLayerProcessor())
+    assert stats['shards'] == 2 and stats['pages'] == 4
+
+    summary = job.merge(str(tmp_path / 'out.jsonl'), 'jsonl')
+    with open(summary['output_path'], encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['page_number'] for record in records] == list(range(1, 8))
+    assert records[6]['text'].strip() == "Page 7"
+    assert os.listdir(os.path.join(job.job_dir, 'claims')) == []
+
+
+def test_failed_shard_is_released_for_other_workers(tmp_path):
+    job = ShardJob.create(_pdf(str(tmp_path / 'doc.pdf'), 6), str(tmp_path / 'job'), shard_pages=3)
+
+    stats = work_shards(job, TextLayerProcessor(fail_on_page=4))
+    assert stats['shards'] == 1 and stats['failed'] == 1
+    assert job.missing_shards() == [job.shards[1]]
+    assert not os.path.exists(job.claim_path(job.shards[1]))
+    assert not [name for name in os.listdir(os.path.join(job.job_dir, 'shards')) if name.endswith('.part')]
+
+    assert work_shards(job, TextLayerProcessor())['shards'] == 1
+    assert job.missing_shards() == []
+
+
+def test_source_is_verified_by_content(tmp_path):
+    source = _pdf(str(tmp_path / 'doc.pdf'), 3)
+    job = ShardJob.create(source, str(tmp_path / 'job'))
+    assert job.resolve_source() == source
+
+    moved = _pdf(str(tmp_path / 'moved.pdf'), 3, prefix="Changed")
+    with pytest.raises(ValueError, match='отличается'):
+        job.resolve_source(moved)
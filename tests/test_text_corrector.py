@@ -0,0 +1,51 @@
+import random
+import re
+
+import pytest
+
+from pdf_extract_processor.improved_processor import ImprovedTextCorrector
+
+
+def _baseline(corrector, text):
+    """Прежние последовательные замены: словарные, символьные, затем правила дат"""
+    for correct, errors in corrector.word_fixes.items():
+        for error in errors:
+            text = text.replace(error, correct)
+    for wrong, right in corrector.char_fixes.items():
+        text = text.replace(wrong, right)
+    for pattern, template in corrector.date_fixes:
+        text = re.sub(pattern, template, text)
+    return text
+
+
+@pytest.fixture
+def corrector():
+    return ImprovedTextCorrector(dictionary_paths=[])
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2©11', '2011'),
+    ('от 2О2О г.', 'от 2020 г.'),
+    ('12.1О.2О1О', '12.10.2010'),
+    ('3О6О', '3060'),
+    ('ПРЙКАЗ©', 'ПРИКАЗ'),
+    ('МИНЙСТЕРСТВО 2О2О', 'МИНИСТЕРСТВО 2020'),
+    ('ПР1КАЗ от 12.05.2О11 № 3©4', 'ПРИКАЗ от 12.05.2011 № 304'),
+])
+def test_regressions_match_baseline(corrector, text, expected):
+    assert _baseline(corrector, text) == expected
+    assert corrector.improved_fix(text) == expected
+
+
+def test_random_inputs_match_baseline(corrector):
+    rng = random.Random(13)
+    atoms = [error for errors in corrector.word_fixes.values() for error in errors]
+    atoms += list(corrector.word_fixes) + list(corrector.char_fixes) + list("2О0136©$[]¥№J.ЙИ")
+    for _ in range(20000):
+        text = "".join(rng.choice(atoms) for _ in range(rng.randint(1, 8)))
+        assert corrector.improved_fix(text) == _baseline(corrector, text).strip(), text
+
+
+def test_whitespace_collapsed_but_lines_kept(corrector):
+    assert corrector.improved_fix("  Статья 1.\t\tОбщие  положения\n\n1. Текст  ") == \
+        "Статья 1. Общие положения\n\n1. Текст"